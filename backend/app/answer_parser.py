@@ -0,0 +1,121 @@
+from typing import List, Optional, Tuple
+
+HEADER_LIMIT = 500  # Header characters without "Answer:" before the whole output is treated as the answer
+
+_STATUS = "Status:"
+_MISSING = "Missing_Info:"
+_ANSWER = "Answer:"
+
+class AnswerStreamParser:
+    """
+    Incremental parser for the Status / Missing_Info / Answer protocol of the answer prompt.
+    Every delta is scanned once: header text is handled line by line (markers may be split
+    across chunks) and, once "Answer:" is seen, deltas pass straight through as answer events.
+
+    feed() returns a list of events:
+      ("status", "sufficient" | "insufficient")  when the Status line is complete
+      ("missing_info", text)                      when the header ends, if it had a Missing_Info line
+      ("answer", text)                            for each piece of answer text
+    """
+    def __init__(self):
+        self.status = "sufficient"  # Default assumption
+        self.status_seen = False
+        self.missing_info: Optional[str] = None
+        self.in_answer = False
+        self._marked = False  # Whether the answer began at an "Answer:" marker (vs. the header limit)
+        self._lines: List[str] = []  # Complete header lines
+        self._line: List[str] = []  # Pieces of the current header line
+        self._line_len = 0
+        self._tail = ""  # Last few characters of the current line
+        self._header_len = 0
+        self._missing: Optional[List[str]] = None
+        self._answer: List[str] = []
+
+    def feed(self, delta: str) -> List[Tuple[str, str]]:
+        if self.in_answer:
+            self._answer.append(delta)
+            return [("answer", delta)]
+
+        events = []
+        start = 0
+        while start < len(delta):
+            newline = delta.find("\n", start)
+            end = len(delta) if newline == -1 else newline
+            rest = self._add_to_line(delta[start:end], events)
+            if rest is not None:
+                # "Answer:" found; everything after it is answer text
+                rest += delta[end:]
+                if rest:
+                    self._answer.append(rest)
+                    events.append(("answer", rest))
+                return events
+            if newline == -1:
+                break
+            self._end_line(events)
+            start = newline + 1
+
+        if not self.in_answer and self._header_len > HEADER_LIMIT:
+            # The model didn't follow the format; treat everything as the answer
+            header = "\n".join(self._lines + ["".join(self._line)])
+            self._start_answer(events)
+            self._answer.append(header)
+            events.append(("answer", header))
+        return events
+
+    def _add_to_line(self, piece: str, events: List) -> Optional[str]:
+        """Appends text (no newlines) to the current header line; returns the text after "Answer:" once it appears."""
+        if not piece:
+            return None
+        # Only the new text is searched, plus the tail of the line to catch a marker split across chunks
+        window = self._tail + piece
+        index = window.find(_ANSWER)
+        if index == -1:
+            self._line.append(piece)
+            self._line_len += len(piece)
+            self._header_len += len(piece)
+            self._tail = window[-(len(_ANSWER) - 1):]
+            return None
+
+        line = "".join(self._line) + piece
+        position = self._line_len - len(self._tail) + index
+        self._line = [line[:position]]
+        self._end_line(events)
+        self._marked = True
+        self._start_answer(events)
+        return line[position + len(_ANSWER):]
+
+    def _end_line(self, events: List):
+        line = "".join(self._line)
+        self._line, self._line_len, self._tail = [], 0, ""
+        self._header_len += 1
+        self._lines.append(line)
+        stripped = line.strip()
+        if _STATUS in line and not self.status_seen:
+            self.status_seen = True
+            self.status = "insufficient" if "insufficient" in line.lower() else "sufficient"
+            events.append(("status", self.status))
+            self._missing = None
+        elif stripped.startswith(_MISSING):
+            self._missing = [stripped[len(_MISSING):].strip()]
+        elif self._missing is not None and stripped:
+            self._missing.append(stripped)
+
+    def _start_answer(self, events: List):
+        self.in_answer = True
+        if self._missing is not None:
+            self.missing_info = "\n".join(p for p in self._missing if p)
+            events.append(("missing_info", self.missing_info))
+
+    def answer(self) -> str:
+        """The final answer text, with the protocol header removed."""
+        if not self.in_answer:
+            # Stream ended inside the header
+            text = "\n".join(self._lines + ["".join(self._line)])
+        else:
+            text = "".join(self._answer)
+            if self._marked:
+                return text.strip()
+        if self.status_seen:
+            # Fallback if Answer: tag missing but Status present
+            text = "\n".join(l for l in text.split("\n") if not l.startswith(_STATUS) and not l.startswith(_MISSING))
+        return text.strip()
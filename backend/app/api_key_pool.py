@@ -0,0 +1,177 @@
+import os
+import time
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+
+KEY_MAX_CONCURRENCY = int(os.getenv("LLM_KEY_MAX_CONCURRENCY", "8"))  # In-flight calls per key
+MAX_COOLDOWN = 60.0  # Seconds; cap for backoff and Retry-After
+AUTH_COOLDOWN = 600.0  # Seconds a key rejected as invalid (401) sits out
+MAX_WAIT = 30.0  # Seconds a call waits for any key to have capacity before using the least bad one
+
+def mask_key(key: str) -> str:
+    return f"...{key[-4:]}" if len(key) > 8 else "***"
+
+def split_keys(api_keys: str) -> List[str]:
+    """Comma-separated keys from settings, in order, without blanks or duplicates."""
+    keys = []
+    for key in (api_keys or "").split(","):
+        key = key.strip()
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+class KeyState:
+    """Health of one API key on one endpoint, shared by every workflow using it."""
+    def __init__(self, key: str):
+        self.key = key
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.error_rate = 0.0  # Moving average over recent calls, 1.0 = every call failing
+
+    @property
+    def cooling(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+
+    @property
+    def has_capacity(self) -> bool:
+        return not self.cooling and self.in_flight < KEY_MAX_CONCURRENCY
+
+    def load(self) -> float:
+        """Lower is better: recent failures dominate, then current load."""
+        return self.error_rate * 2 + self.in_flight / KEY_MAX_CONCURRENCY
+
+    def record(self, success: bool):
+        self.error_rate = self.error_rate * 0.8 + (0.0 if success else 0.2)
+        if success:
+            self.consecutive_failures = 0
+
+    def back_off(self, retry_after: Optional[float] = None, throttled: bool = False, cool: bool = True) -> float:
+        """Records the failure and returns the delay before the key should be used again."""
+        self.consecutive_failures += 1
+        if throttled:
+            self.throttled += 1
+        else:
+            self.errors += 1
+        delay = min(MAX_COOLDOWN, retry_after if retry_after is not None else 2 ** self.consecutive_failures)
+        if cool:
+            self.cooldown_until = max(self.cooldown_until, time.monotonic() + delay)
+        self.record(False)
+        return delay
+
+    def disable(self, cool: bool = True):
+        self.errors += 1
+        if cool:
+            self.cooldown_until = time.monotonic() + AUTH_COOLDOWN
+        self.record(False)
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate, 3),
+            "cooldown": max(0, round(self.cooldown_until - time.monotonic(), 1)),
+        }
+
+class KeyLease:
+    """One call's hold on a key; release() exactly once with the outcome."""
+    def __init__(self, pool: "KeyPool", state: KeyState):
+        self.pool = pool
+        self.state = state
+        self._released = False
+
+    @property
+    def key(self) -> str:
+        return self.state.key
+
+    def release(self, success: bool = True):
+        if self._released:
+            return
+        self._released = True
+        self.state.in_flight -= 1
+        if success:
+            self.state.record(True)
+        self.pool.notify()
+
+class KeyPool:
+    """
+    Hands out the healthiest key with spare capacity for each LLM call: keys in cooldown
+    (after 429/5xx/connection errors, honoring Retry-After, or 401) are skipped and load is
+    spread by in-flight count, so throughput grows with the number of keys.
+    The last usable key is never benched; its failures only lower its health.
+    """
+    def __init__(self, states: List[KeyState], changed: asyncio.Event):
+        self.states = states
+        # Shared by every pool on the endpoint, since pools over overlapping key sets share KeyStates
+        self._changed = changed
+
+    @property
+    def size(self) -> int:
+        return len(self.states)
+
+    def notify(self):
+        self._changed.set()
+
+    def _others_usable(self, state: KeyState) -> bool:
+        return any(s is not state and not s.cooling for s in self.states)
+
+    def back_off(self, state: KeyState, retry_after: Optional[float] = None, throttled: bool = False) -> float:
+        """Benches the key if another can take over (returns 0), else returns how long to wait before reusing it."""
+        others = self._others_usable(state)
+        delay = state.back_off(retry_after, throttled, cool=others)
+        return 0.0 if others else delay
+
+    def disable(self, state: KeyState):
+        state.disable(cool=self._others_usable(state))
+
+    def _pick(self, exclude: Set[str]) -> Optional[KeyState]:
+        ready = [s for s in self.states if s.has_capacity]
+        # Prefer keys this call hasn't failed on yet
+        fresh = [s for s in ready if s.key not in exclude] or ready
+        return min(fresh, key=KeyState.load) if fresh else None
+
+    async def acquire(self, exclude: Optional[Set[str]] = None) -> KeyLease:
+        exclude = exclude or set()
+        deadline = time.monotonic() + MAX_WAIT
+        while True:
+            state = self._pick(exclude)
+            now = time.monotonic()
+            # Waiting only helps if a key can free up in time: a release, or a cooldown ending before the deadline
+            hopeless = all(s.cooling and s.cooldown_until >= deadline for s in self.states)
+            if state is None and (now >= deadline or hopeless):
+                # The least bad key beats failing outright
+                state = min(self.states, key=lambda s: (s.cooldown_until, s.load()))
+            if state is not None:
+                state.in_flight += 1
+                state.requests += 1
+                return KeyLease(self, state)
+            # Wake on a release, or when the first cooldown ends
+            cooldowns = [s.cooldown_until - now for s in self.states if s.cooling]
+            timeout = min([deadline - now] + [c for c in cooldowns if c > 0])
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), max(0.05, timeout))
+            except asyncio.TimeoutError:
+                pass
+
+# (base_url, key) -> state, so every pool built over the same key sees the same health
+_KEY_STATES: Dict[Tuple[str, str], KeyState] = {}
+_KEY_POOLS: Dict[Tuple[str, Tuple[str, ...]], KeyPool] = {}
+_KEY_EVENTS: Dict[str, asyncio.Event] = {}  # base_url -> wake event of its pools
+
+def get_key_pool(base_url: str, api_keys: str) -> KeyPool:
+    keys = tuple(split_keys(api_keys)) or ("",)
+    pool = _KEY_POOLS.get((base_url, keys))
+    if pool is None:
+        states = [_KEY_STATES.setdefault((base_url, key), KeyState(key)) for key in keys]
+        changed = _KEY_EVENTS.setdefault(base_url, asyncio.Event())
+        pool = _KEY_POOLS[(base_url, keys)] = KeyPool(states, changed)
+    return pool
+
+def get_key_pool_stats() -> Dict[str, Dict]:
+    return {f"{base_url} {mask_key(key)}": state.stats() for (base_url, key), state in _KEY_STATES.items()}
@@ -2,20 +2,50 @@ import asyncio
 import os
 import random
 import urllib.parse
-import base64
 import time
 import json
+import shutil
+from collections import deque
 from playwright.async_api import async_playwright, Page
 from playwright_stealth import Stealth
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+from .rate_limiter import get_engine_limiter
+from .resource_blocker import ResourceBlocker, select_resource_profile
+from .content_extractor import MAIN_CONTENT_JS, MAX_CONTENT_CHARS
+from .crawl_cache import get_crawl_cache
+from .search_cache import get_search_cache
+from .crawl_scheduler import crawl_priority, get_crawl_scheduler
+from .engine_stats import get_engine_stats
+from .search_adapters import get_static_adapters
+from .url_normalizer import canonicalize_url, unwrap_redirect, url_key
+from .github_fetcher import get_github_fetcher, parse_github_url
+from .document_extractor import looks_like_document, render_document
+from .click_policy import click_grew, get_click_policy
+from .http_fetcher import HTTP_FETCH_ENABLED, configure_http_client, fetch_page_text, preferred_tier, record_tier
 
 # Global browser state
 _GLOBAL_PLAYWRIGHT = None
 _GLOBAL_CONTEXT = None
+_GLOBAL_FLEET: List["BrowserWorker"] = []  # _GLOBAL_CONTEXT is the context of worker 0
+_WORKER_REPLACEMENTS: Dict[int, asyncio.Task] = {}  # worker index -> pending restart
 _CURRENT_HEADLESS_MODE = True
-_SEARCH_LOCK = asyncio.Lock()
-_LAST_REQUEST_TIME = 0
-_MIN_SEARCH_INTERVAL = 4.0  # Minimum seconds between search requests
+_BROWSER_FLEET_SIZE = int(os.getenv("BROWSER_FLEET_SIZE", "1"))  # Chromium processes to run
+_TAB_POOL_MIN = int(os.getenv("TAB_POOL_MIN", "2"))  # Tabs pre-warmed at startup (per worker)
+_TAB_POOL_MAX = int(os.getenv("TAB_POOL_MAX", "8"))  # Hard cap on concurrently open tabs (per worker)
+_CRAWL_DEBUG = os.getenv("CRAWL_DEBUG", "false").lower() == "true"  # Dump crawled text to stdout/crawled_debug.txt
+
+# Fleet start/stop/restart is single-flight; the generation tells queued restarts that one already happened
+_BROWSER_LOCK = asyncio.Lock()
+_BROWSER_GENERATION = 0
+_RECYCLE_COUNT = 0
+
+# Watchdog: workers are recycled (drained, then restarted) once any limit is crossed
+_WATCHDOG_TASK: Optional[asyncio.Task] = None
+_WATCHDOG_INTERVAL = float(os.getenv("BROWSER_WATCHDOG_INTERVAL", "30"))  # Seconds between health checks, 0 disables
+_RECYCLE_AFTER_PAGES = int(os.getenv("BROWSER_RECYCLE_PAGES", "500"))  # Tabs leased since the worker started
+_RECYCLE_RSS_MB = int(os.getenv("BROWSER_RECYCLE_RSS_MB", "1500"))  # Resident memory of Chromium and its renderers
+_RECYCLE_MAX_TABS = int(os.getenv("BROWSER_RECYCLE_MAX_TABS", str(_TAB_POOL_MAX * 2)))  # Open tabs, leaked ones included
+_DRAIN_TIMEOUT = float(os.getenv("BROWSER_DRAIN_TIMEOUT", "60"))  # Seconds to wait for leased tabs before closing anyway
 
 # Store pages that need user interaction: session_id -> { "page": page, "event": asyncio.Event() }
 _INTERACTION_SESSIONS = {}
@@ -23,6 +53,11 @@ _INTERACTION_SESSIONS = {}
 def get_interaction_session(session_id: str):
     return _INTERACTION_SESSIONS.get(session_id)
 
+def _in_interaction(session_id: Optional[str], engine: str, query: str) -> bool:
+    """Whether the search for (engine, query) is waiting on the user to solve a CAPTCHA."""
+    session = _INTERACTION_SESSIONS.get(session_id) if session_id else None
+    return bool(session) and session.get("engine") == engine and session.get("query") == query
+
 async def mark_interaction_completed(session_id: str):
     if session_id in _INTERACTION_SESSIONS:
         _INTERACTION_SESSIONS[session_id]["event"].set()
@@ -69,38 +104,309 @@ def get_browser_config(user_data_dir: str) -> Dict:
         
     return config
 
-async def init_global_browser(headless_override: bool = None):
-    """Initializes the global browser instance."""
-    global _GLOBAL_PLAYWRIGHT, _GLOBAL_CONTEXT, _CURRENT_HEADLESS_MODE
-    
-    if _GLOBAL_CONTEXT:
-        return
+# Resolves once the target subtree has gone quiet_ms without DOM/text mutations, or after timeout_ms.
+# Attribute changes are ignored so spinners and hover effects don't keep the page "busy".
+_DOM_SETTLE_JS = """([selector, quietMs, timeoutMs]) => new Promise(resolve => {
+    const target = (selector && document.querySelector(selector)) || document.body || document.documentElement;
+    const start = performance.now();
+    if (!target) return resolve({settled: false, mutations: 0, elapsed: 0});
+    let mutations = 0, quietTimer = null, capTimer = null;
+    const finish = (settled) => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(capTimer);
+        resolve({settled, mutations, elapsed: Math.round(performance.now() - start)});
+    };
+    const observer = new MutationObserver(records => {
+        mutations += records.length;
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => finish(true), quietMs);
+    });
+    observer.observe(target, {childList: true, subtree: true, characterData: true});
+    quietTimer = setTimeout(() => finish(true), quietMs);
+    capTimer = setTimeout(() => finish(false), timeoutMs);
+})"""
 
-    _GLOBAL_PLAYWRIGHT = await async_playwright().start()
-    
+async def wait_for_dom_settle(page: Page, selector: str = None, quiet_ms: int = 500, timeout_ms: int = 5000) -> Dict:
+    """
+    Waits until the page (or the element matching selector) stops changing.
+    Returns {"settled", "mutations", "elapsed"}; never raises.
+    """
+    try:
+        return await page.evaluate(_DOM_SETTLE_JS, [selector, quiet_ms, timeout_ms])
+    except Exception:
+        # Navigation destroyed the context, or the page closed
+        return {"settled": False, "mutations": 0, "elapsed": 0}
+
+# Visible buttons/links worth offering to the click decision. Each gets a temp ID to click it by
+# and a structural selector (tag, id or stable classes) the click policy can recognize it by later.
+_CLICKABLES_JS = """() => {
+    const items = [];
+    let idCounter = 0;
+
+    // Helper to check if element is visible
+    function isVisible(elem) {
+        if (!elem.getBoundingClientRect || !elem.checkVisibility) return false;
+        const rect = elem.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0 && elem.checkVisibility();
+    }
+
+    // Generated ids/classes (hashes, counters) differ between pages and aren't worth remembering
+    function stable(name) {
+        return name.length < 40 && !/\\d{3,}|[a-z0-9]{8,}-|^css-|^sc-|^jsx-/i.test(name);
+    }
+
+    function selectorOf(el) {
+        const tag = el.tagName.toLowerCase();
+        if (el.id && stable(el.id)) return tag + "#" + CSS.escape(el.id);
+        const classes = Array.from(el.classList).filter(stable).slice(0, 2);
+        return tag + classes.map(c => "." + CSS.escape(c)).join("");
+    }
+
+    // Collect buttons and links
+    const candidates = document.querySelectorAll('button, a[href], [role="button"]');
+
+    for (const el of candidates) {
+        if (!isVisible(el)) continue;
+
+        const text = el.innerText.trim();
+        if (text.length < 2 || text.length > 50) continue; // Filter too short/long
+
+        // Filter common noise
+        if (/^(home|login|sign in|sign up|menu|privacy|terms)$/i.test(text)) continue;
+
+        // Assign a temp ID attribute to locate it later
+        const tempId = "js-interact-" + idCounter++;
+        el.setAttribute("data-js-interact-id", tempId);
+
+        items.push({
+            id: tempId,
+            text: text,
+            tag: el.tagName.toLowerCase(),
+            selector: selectorOf(el)
+        });
+
+        if (items.length >= 50) break; // Limit count
+    }
+    return items;
+}"""
+
+_TEXT_LENGTH_JS = "() => document.body ? document.body.innerText.length : 0"
+
+class TabPool:
+    """
+    Pool of pre-warmed, stealth-patched tabs on a browser context.
+    Tabs are leased with acquire() and handed back with release(), which resets
+    them to about:blank. When all max_size tabs are leased, callers wait in FIFO order.
+    """
+    def __init__(self, context, min_size: int = 2, max_size: int = 8):
+        self.context = context
+        self.max_size = max(1, max_size)
+        self.min_size = max(0, min(min_size, self.max_size))
+        self.stealth = Stealth()
+        self._idle: List[Page] = []
+        self._leased = set()
+        self._waiters = deque()
+        self._creating = 0
+        self._closed = False
+        self._drained: Optional[asyncio.Event] = None
+
+    @property
+    def size(self) -> int:
+        return len(self._idle) + len(self._leased) + self._creating
+
+    @property
+    def in_use(self) -> int:
+        return len(self._leased)
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for fut in self._waiters if not fut.done())
+
+    def owns(self, page: Page) -> bool:
+        return page in self._leased
+
+    async def _create_tab(self) -> Page:
+        page = await self.context.new_page()
+        try:
+            # Stealth scripts are registered as init scripts, so they survive navigations
+            await self.stealth.apply_stealth_async(page)
+        except Exception:
+            await page.close()
+            raise
+        return page
+
+    async def warm(self):
+        """Pre-creates tabs until the pool holds at least min_size."""
+        needed = self.min_size - self.size
+        if needed <= 0:
+            return
+        self._creating += needed
+        try:
+            pages = await asyncio.gather(*[self._create_tab() for _ in range(needed)], return_exceptions=True)
+        finally:
+            self._creating -= needed
+        for page in pages:
+            if isinstance(page, Exception):
+                print(f"Tab pool: failed to pre-warm tab: {page}")
+            else:
+                self._hand_off(page)
+
+    async def acquire(self) -> Page:
+        """Leases a tab, waiting in line when the pool is exhausted."""
+        if self._closed:
+            raise RuntimeError("Tab pool is closed")
+
+        # Only take the fast path if nobody is queued ahead of us
+        if not self.waiting:
+            while self._idle:
+                page = self._idle.pop()
+                if page.is_closed():
+                    continue
+                self._leased.add(page)
+                return page
+
+            if self.size < self.max_size:
+                self._creating += 1
+                try:
+                    page = await self._create_tab()
+                finally:
+                    self._creating -= 1
+                self._leased.add(page)
+                return page
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            return await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # A tab was handed to us just as we were cancelled; pass it on
+                page = fut.result()
+                self._leased.discard(page)
+                self._hand_off(page)
+            else:
+                try:
+                    self._waiters.remove(fut)
+                except ValueError:
+                    pass
+            raise
+
+    async def release(self, page: Page):
+        """Resets a leased tab and returns it to the pool (or to the next waiter)."""
+        self._leased.discard(page)
+        if not self._leased and self._drained is not None:
+            self._drained.set()
+        if not self._closed and await self._reset_tab(page):
+            self._hand_off(page)
+            return
+
+        try:
+            if not page.is_closed():
+                await page.close()
+        except Exception:
+            pass
+        self._refill_for_waiters()
+
+    async def _reset_tab(self, page: Page) -> bool:
+        if page.is_closed():
+            return False
+        try:
+            # sessionStorage is per-tab; localStorage and cookies are context-wide
+            # and carry login state, so they are left alone like with a fresh tab.
+            await page.evaluate("() => { try { sessionStorage.clear(); } catch (e) {} }")
+            # Drop request interceptors installed by the previous lease
+            await page.unroute_all(behavior="ignoreErrors")
+            await page.goto("about:blank", timeout=5000)
+            return True
+        except Exception as e:
+            print(f"Tab pool: discarding tab that failed to reset: {e}")
+            return False
+
+    def _hand_off(self, page: Page):
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                self._leased.add(page)
+                fut.set_result(page)
+                return
+        self._idle.append(page)
+
+    def _refill_for_waiters(self):
+        # A discarded tab frees a slot; open a replacement for whoever is waiting
+        if self._closed or not self.waiting or self.size >= self.max_size:
+            return
+
+        async def refill():
+            try:
+                page = await self._create_tab()
+            except Exception as e:
+                print(f"Tab pool: failed to create replacement tab: {e}")
+                for fut in self._waiters:
+                    if not fut.done():
+                        fut.set_exception(e)
+                        break
+                return
+            finally:
+                self._creating -= 1
+            self._hand_off(page)
+
+        self._creating += 1
+        asyncio.create_task(refill())
+
+    async def drain(self, timeout: float) -> bool:
+        """
+        Closes the pool to new leases (queued callers fail over to another worker)
+        and waits for leased tabs to come back. Returns False if some are still out after timeout.
+        """
+        self._drained = asyncio.Event()
+        await self.close()
+        if not self._leased:
+            return True
+        try:
+            await asyncio.wait_for(self._drained.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def close(self):
+        """Closes idle tabs and fails pending waiters. Leased tabs close on release."""
+        self._closed = True
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_exception(RuntimeError("Tab pool is closed"))
+        idle, self._idle = self._idle, []
+        for page in idle:
+            try:
+                await page.close()
+            except Exception:
+                pass
+
+def _get_user_data_dir() -> str:
     # Calculate project root from current file: backend/app/browser_manager.py -> ... -> ... -> root
     current_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(os.path.dirname(current_dir))
     user_data_dir = os.path.join(project_root, "user_data")
     if not os.path.exists(user_data_dir):
         os.makedirs(user_data_dir)
-        
-    # Get persistent browser config
-    browser_config = get_browser_config(user_data_dir)
+    return user_data_dir
+
+def _seed_worker_profile(source_dir: str, target_dir: str):
+    """Copies the main profile (cookies, login state) into a fleet worker's profile directory."""
+    # Lock files belong to whichever Chromium last owned the profile; caches are just bulk
+    ignore = shutil.ignore_patterns("Singleton*", "lockfile", "*.lock", "Cache", "Code Cache", "GPUCache", "ShaderCache", "GrShaderCache")
+    if os.path.exists(target_dir):
+        shutil.rmtree(target_dir, ignore_errors=True)
+    shutil.copytree(source_dir, target_dir, ignore=ignore, dirs_exist_ok=True)
+
+async def _launch_context(user_data_dir: str, headless_mode: bool, browser_config: Dict):
     user_agent = browser_config["user_agent"]
     width = browser_config["viewport"]["width"]
     height = browser_config["viewport"]["height"]
-    
-    # Determine headless mode from environment variable (default: True)
-    if headless_override is not None:
-        headless_mode = headless_override
-    else:
-        headless_mode = os.getenv("HEADLESS", "true").lower() == "true"
-    
-    _CURRENT_HEADLESS_MODE = headless_mode
 
     try:
-        _GLOBAL_CONTEXT = await _GLOBAL_PLAYWRIGHT.chromium.launch_persistent_context(
+        return await _GLOBAL_PLAYWRIGHT.chromium.launch_persistent_context(
             user_data_dir=user_data_dir,
             channel="chrome",  # Use real Chrome if available
             headless=headless_mode,
@@ -120,7 +426,7 @@ async def init_global_browser(headless_override: bool = None):
         )
     except Exception as e:
         print(f"Failed to launch Chrome: {e}. Trying default Chromium...")
-        _GLOBAL_CONTEXT = await _GLOBAL_PLAYWRIGHT.chromium.launch_persistent_context(
+        return await _GLOBAL_PLAYWRIGHT.chromium.launch_persistent_context(
             user_data_dir=user_data_dir,
             headless=headless_mode,
             args=[
@@ -135,42 +441,390 @@ async def init_global_browser(headless_override: bool = None):
             user_agent=user_agent,
             ignore_default_args=["--enable-automation"]
         )
-    print(f"Global Browser Initialized with UA: {user_agent}")
+
+def _profile_rss_bytes(profile_dir: str) -> Optional[int]:
+    """
+    Resident memory of the Chromium running on profile_dir plus all of its child processes
+    (renderers, GPU, zygotes). Reads /proc, so returns None where that isn't available.
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    marker = f"--user-data-dir={profile_dir}".encode()
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    children: Dict[int, List[int]] = {}
+    rss: Dict[int, int] = {}
+    roots = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        pid = int(entry)
+        try:
+            with open(f"/proc/{pid}/stat", "r") as f:
+                stat = f.read()
+            # The command name may contain spaces; fields resume after its closing paren
+            fields = stat[stat.rfind(")") + 2:].split()
+            children.setdefault(int(fields[1]), []).append(pid)
+            rss[pid] = int(fields[21]) * page_size
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                if marker in f.read():
+                    roots.append(pid)
+        except (OSError, IndexError, ValueError):
+            continue
+    if not roots:
+        return None
+
+    seen = set()
+    stack = list(roots)
+    while stack:
+        pid = stack.pop()
+        if pid in seen:
+            continue
+        seen.add(pid)
+        stack.extend(children.get(pid, []))
+    return sum(rss.get(pid, 0) for pid in seen)
+
+class BrowserWorker:
+    """
+    One Chromium process (persistent context) plus its tab pool.
+    In fleet mode each worker runs on a private copy of the main profile.
+    """
+    def __init__(self, index: int, profile_dir: str, seed_from: Optional[str] = None):
+        self.index = index
+        self.profile_dir = profile_dir
+        self.seed_from = seed_from
+        self.context = None
+        self.pool: Optional[TabPool] = None
+        self.alive = False
+        self.stopping = False
+        self.draining = False
+        self.pages_served = 0
+        self.rss_bytes: Optional[int] = None
+        self.started_at = time.time()
+
+    @property
+    def available(self) -> bool:
+        """Live and not being drained for a recycle."""
+        return self.alive and not self.draining
+
+    @property
+    def load(self) -> int:
+        if not self.pool:
+            return 0
+        return self.pool.in_use + self.pool.waiting
+
+    @property
+    def open_tabs(self) -> int:
+        try:
+            return len(self.context.pages) if self.context else 0
+        except Exception:
+            return 0
+
+    async def sample_rss(self) -> Optional[int]:
+        self.rss_bytes = await asyncio.to_thread(_profile_rss_bytes, self.profile_dir)
+        return self.rss_bytes
+
+    @property
+    def in_interaction(self) -> bool:
+        """Whether one of this worker's tabs is held by a live interaction (CAPTCHA) session."""
+        return any(session["page"].context is self.context for session in list(_INTERACTION_SESSIONS.values()))
+
+    def recycle_reason(self) -> Optional[str]:
+        """Returns why this worker should be recycled, or None while it's healthy."""
+        if self.pages_served >= _RECYCLE_AFTER_PAGES:
+            return f"served {self.pages_served} pages"
+        if self.open_tabs > _RECYCLE_MAX_TABS:
+            return f"has {self.open_tabs} open tabs"
+        if self.rss_bytes and self.rss_bytes > _RECYCLE_RSS_MB * 1024 * 1024:
+            return f"uses {self.rss_bytes // (1024 * 1024)} MB RSS"
+        return None
+
+    def stats(self) -> Dict:
+        return {
+            "index": self.index,
+            "alive": self.alive,
+            "draining": self.draining,
+            "pages_served": self.pages_served,
+            "open_tabs": self.open_tabs,
+            "leased_tabs": self.pool.in_use if self.pool else 0,
+            "rss_mb": round(self.rss_bytes / (1024 * 1024), 1) if self.rss_bytes else None,
+            "uptime": round(time.time() - self.started_at),
+        }
+
+    async def start(self, headless_mode: bool, browser_config: Dict):
+        if self.seed_from:
+            await asyncio.to_thread(_seed_worker_profile, self.seed_from, self.profile_dir)
+        self.started_at = time.time()
+        self.context = await _launch_context(self.profile_dir, headless_mode, browser_config)
+        self.context.on("close", lambda _: _on_worker_closed(self))
+        self.pool = TabPool(self.context, min_size=_TAB_POOL_MIN, max_size=_TAB_POOL_MAX)
+        await self.pool.warm()
+        self.alive = True
+
+    async def stop(self):
+        self.stopping = True
+        self.alive = False
+        if self.pool:
+            await self.pool.close()
+        if self.context:
+            try:
+                await self.context.close()
+            except Exception:
+                pass
+
+def _on_worker_closed(worker: BrowserWorker):
+    """Context 'close' handler: a worker closing on its own means Chromium died."""
+    if worker.stopping or worker.draining or worker not in _GLOBAL_FLEET:
+        return
+    worker.alive = False
+    if worker.index not in _WORKER_REPLACEMENTS:
+        print(f"Browser worker {worker.index} crashed. Replacing it in the background...")
+        _WORKER_REPLACEMENTS[worker.index] = asyncio.create_task(_replace_worker(worker))
+
+def _recycle_worker(worker: BrowserWorker, reason: str):
+    """Stops routing new leases to a worker and replaces it once its in-flight tabs are released."""
+    if worker.index in _WORKER_REPLACEMENTS:
+        return
+    print(f"Browser worker {worker.index} {reason}. Recycling it once its in-flight pages finish...")
+    worker.draining = True
+    _WORKER_REPLACEMENTS[worker.index] = asyncio.create_task(_replace_worker(worker, drain=True))
+
+async def _replace_worker(worker: BrowserWorker, drain: bool = False):
+    """
+    Swaps a worker for a fresh one without touching the rest of the fleet.
+    With drain=True leased tabs are allowed to finish first; callers arriving meanwhile
+    go to other workers or wait for this replacement.
+    """
+    global _GLOBAL_CONTEXT, _RECYCLE_COUNT
+    try:
+        if drain and worker.pool and not await worker.pool.drain(_DRAIN_TIMEOUT):
+            print(f"Browser worker {worker.index}: {worker.pool.in_use} tab(s) still leased after {_DRAIN_TIMEOUT:.0f}s, closing anyway.")
+        # Never close a page the user is solving a CAPTCHA on; the session ends on its own (done or timeout)
+        while drain and worker.in_interaction:
+            await asyncio.sleep(1.0)
+        await worker.stop()
+        user_data_dir = _get_user_data_dir()
+        fresh = BrowserWorker(worker.index, worker.profile_dir, seed_from=worker.seed_from)
+        for attempt in range(3):
+            try:
+                await fresh.start(_CURRENT_HEADLESS_MODE, get_browser_config(user_data_dir))
+                break
+            except Exception as e:
+                print(f"Browser worker {worker.index} failed to restart ({attempt+1}/3): {e}")
+                await asyncio.sleep(2.0 * (attempt + 1))
+        else:
+            return
+
+        if worker in _GLOBAL_FLEET:
+            position = _GLOBAL_FLEET.index(worker)
+            _GLOBAL_FLEET[position] = fresh
+            if position == 0:
+                _GLOBAL_CONTEXT = fresh.context
+            if drain:
+                _RECYCLE_COUNT += 1
+            print(f"Browser worker {worker.index} {'recycled' if drain else 'replaced'}.")
+        else:
+            # Fleet was shut down while we were restarting
+            await fresh.stop()
+    finally:
+        _WORKER_REPLACEMENTS.pop(worker.index, None)
+
+async def init_global_browser(headless_override: bool = None, fleet_size: int = None):
+    """
+    Initializes the global browser fleet.
+    With a fleet size of 1 the single worker runs directly on user_data/ (the classic mode);
+    larger fleets run one Chromium per worker on profiles cloned from user_data/.
+    """
+    async with _BROWSER_LOCK:
+        await _init_global_browser_locked(headless_override, fleet_size)
+
+async def _init_global_browser_locked(headless_override: bool = None, fleet_size: int = None):
+    global _GLOBAL_PLAYWRIGHT, _GLOBAL_CONTEXT, _GLOBAL_FLEET, _CURRENT_HEADLESS_MODE, _BROWSER_GENERATION, _WATCHDOG_TASK
+    
+    if _GLOBAL_FLEET:
+        return
+
+    _GLOBAL_PLAYWRIGHT = await async_playwright().start()
+    user_data_dir = _get_user_data_dir()
+        
+    # Get persistent browser config
+    browser_config = get_browser_config(user_data_dir)
+    
+    # Determine headless mode from environment variable (default: True)
+    if headless_override is not None:
+        headless_mode = headless_override
+    else:
+        headless_mode = os.getenv("HEADLESS", "true").lower() == "true"
+    
+    _CURRENT_HEADLESS_MODE = headless_mode
+    configure_http_client(browser_config["user_agent"])
+
+    size = max(1, fleet_size if fleet_size is not None else _BROWSER_FLEET_SIZE)
+    if size == 1:
+        workers = [BrowserWorker(0, user_data_dir)]
+    else:
+        fleet_dir = os.path.join(os.path.dirname(user_data_dir), "user_data_fleet")
+        workers = [BrowserWorker(i, os.path.join(fleet_dir, f"worker-{i}"), seed_from=user_data_dir) for i in range(size)]
+
+    results = await asyncio.gather(*[w.start(headless_mode, browser_config) for w in workers], return_exceptions=True)
+    for worker, result in zip(workers, results):
+        if isinstance(result, Exception):
+            print(f"Browser worker {worker.index} failed to start: {result}")
+    started = [w for w, r in zip(workers, results) if not isinstance(r, Exception)]
+    if not started:
+        await _GLOBAL_PLAYWRIGHT.stop()
+        _GLOBAL_PLAYWRIGHT = None
+        raise results[0]
+
+    _GLOBAL_FLEET = started
+    _GLOBAL_CONTEXT = started[0].context
+    _BROWSER_GENERATION += 1
+    if _WATCHDOG_INTERVAL > 0:
+        _WATCHDOG_TASK = asyncio.create_task(_watchdog_loop())
+    print(f"Global Browser Initialized with UA: {browser_config['user_agent']}")
+    print(f"Browser fleet ready: {len(started)} worker(s), {started[0].pool.size} pre-warmed tab(s) each, max {_TAB_POOL_MAX}")
 
 async def shutdown_global_browser():
-    """Shuts down the global browser instance."""
-    global _GLOBAL_PLAYWRIGHT, _GLOBAL_CONTEXT
-    if _GLOBAL_CONTEXT:
-        await _GLOBAL_CONTEXT.close()
-        _GLOBAL_CONTEXT = None
+    """Shuts down every browser worker."""
+    async with _BROWSER_LOCK:
+        await _shutdown_global_browser_locked()
+
+async def _shutdown_global_browser_locked():
+    global _GLOBAL_PLAYWRIGHT, _GLOBAL_CONTEXT, _GLOBAL_FLEET, _WATCHDOG_TASK
+    if _WATCHDOG_TASK:
+        _WATCHDOG_TASK.cancel()
+        _WATCHDOG_TASK = None
+    fleet, _GLOBAL_FLEET = _GLOBAL_FLEET, []
+    for task in list(_WORKER_REPLACEMENTS.values()):
+        task.cancel()
+    _WORKER_REPLACEMENTS.clear()
+    await asyncio.gather(*[w.stop() for w in fleet], return_exceptions=True)
+    _GLOBAL_CONTEXT = None
     if _GLOBAL_PLAYWRIGHT:
         await _GLOBAL_PLAYWRIGHT.stop()
         _GLOBAL_PLAYWRIGHT = None
     print("Global Browser Shutdown.")
 
-async def get_new_page() -> Page:
-    """Creates a new page, restarting the browser if the context is closed."""
-    global _GLOBAL_CONTEXT
-    
-    if not _GLOBAL_CONTEXT:
+async def restart_global_browser(reason: str):
+    """
+    Restarts the whole fleet. Single-flight: callers that queued up behind a restart
+    reuse the fresh fleet instead of tearing it down again.
+    """
+    generation = _BROWSER_GENERATION
+    async with _BROWSER_LOCK:
+        if _BROWSER_GENERATION != generation and any(w.available for w in _GLOBAL_FLEET):
+            return
+        print(f"Restarting browser ({reason})...")
+        await _shutdown_global_browser_locked()
+        await _init_global_browser_locked(headless_override=_CURRENT_HEADLESS_MODE)
+
+async def _watchdog_loop():
+    """Samples worker health and recycles workers that served too many pages, leak tabs or grew too big."""
+    while True:
+        await asyncio.sleep(_WATCHDOG_INTERVAL)
+        for worker in list(_GLOBAL_FLEET):
+            # One recycle at a time, so the rest of the fleet keeps serving
+            if _WORKER_REPLACEMENTS:
+                break
+            if not worker.available:
+                continue
+            try:
+                await worker.sample_rss()
+            except Exception as e:
+                print(f"Browser watchdog: failed to sample worker {worker.index}: {e}")
+            reason = worker.recycle_reason()
+            if reason and worker.in_interaction:
+                # Postponed to a later tick, once the user is done with the page
+                continue
+            if reason:
+                _recycle_worker(worker, reason)
+
+def get_browser_health() -> Dict:
+    return {
+        "generation": _BROWSER_GENERATION,
+        "recycles": _RECYCLE_COUNT,
+        "restarting": sorted(_WORKER_REPLACEMENTS),
+        "workers": [w.stats() for w in _GLOBAL_FLEET],
+    }
+
+async def _pick_worker() -> BrowserWorker:
+    """Returns the least-loaded available worker, waiting for a replacement if none is up."""
+    if not _GLOBAL_FLEET:
         await init_global_browser()
-        
+
+    available = [w for w in _GLOBAL_FLEET if w.available]
+    if not available:
+        if _WORKER_REPLACEMENTS:
+            await asyncio.wait(list(_WORKER_REPLACEMENTS.values()), return_when=asyncio.FIRST_COMPLETED)
+        else:
+            # Nothing is restarting them (e.g. closed without a crash event); restart the fleet
+            await restart_global_browser("no live browser workers")
+        available = [w for w in _GLOBAL_FLEET if w.available]
+        if not available:
+            raise RuntimeError("No browser worker available")
+
+    return min(available, key=lambda w: w.load)
+
+async def acquire_page() -> Page:
+    """Leases a stealth-patched tab from the least-loaded worker, replacing the worker if it has died."""
+    worker = await _pick_worker()
+
     try:
-        return await _GLOBAL_CONTEXT.new_page()
+        page = await worker.pool.acquire()
     except Exception as e:
-        if "Target page, context or browser has been closed" in str(e):
-            print(f"Browser context error: {e}. Restarting browser...")
-            await shutdown_global_browser()
-            # Restore previous headless mode
-            await init_global_browser(headless_override=_CURRENT_HEADLESS_MODE)
-            return await _GLOBAL_CONTEXT.new_page()
-        raise e
+        if "Target page, context or browser has been closed" in str(e) or "Tab pool is closed" in str(e):
+            # Crashed, or closed for a recycle while we were queued; either way the next pick avoids it
+            print(f"Browser worker {worker.index} error: {e}. Retrying on another worker...")
+            _on_worker_closed(worker)
+            worker = await _pick_worker()
+            page = await worker.pool.acquire()
+        else:
+            raise e
+    worker.pages_served += 1
+    return page
+
+async def release_page(page: Page):
+    """Returns a leased tab to its worker's pool, or closes it if it no longer belongs to one."""
+    for worker in _GLOBAL_FLEET:
+        if worker.pool and worker.pool.owns(page):
+            await worker.pool.release(page)
+            return
+    try:
+        if not page.is_closed():
+            await page.close()
+    except Exception:
+        pass
+
+def _cached_content(entry: Dict, query: Optional[str] = None) -> str:
+    """Content of a crawl cache entry; documents are re-rendered so their pages match this query."""
+    document = entry.get("document")
+    if document:
+        return render_document(document["pages"], document["kind"], query)
+    return entry["content"]
+
+def _canonicalize_results(results: List[Dict]) -> List[Dict]:
+    """
+    Unwraps redirects and strips tracking noise from result URLs, dropping results that
+    point at a page already listed, so dedup, caching and citations all see one URL per page.
+    The unwrapped but otherwise untouched link is kept as 'fetch_url' for crawling, since
+    some sites need the parameters or exact path canonicalization drops.
+    """
+    canonical, seen = [], set()
+    for res in results:
+        url = canonicalize_url(res['url'])
+        key = url_key(url)
+        if key in seen:
+            continue
+        seen.add(key)
+        fetch_url = unwrap_redirect(res.get('fetch_url') or res['url'])
+        canonical.append({**res, 'url': url, 'fetch_url': fetch_url, 'id': len(canonical) + 1})
+    return canonical
 
 class BrowserManager:
-    def __init__(self, engine: str = "duckduckgo", max_results: int = 8):
-        self.stealth = Stealth()
+    def __init__(self, engine: str = "duckduckgo", max_results: int = 8, hedged: bool = False):
         self.engine = engine
         self.max_results = max_results
+        # Hedged mode races a secondary engine when the primary is slower than usual
+        self.hedged = hedged
         # Search Engine Configuration
         self.engine_config = self._load_selectors()
 
@@ -200,8 +854,8 @@ class BrowserManager:
         }
 
     async def start(self):
-        # Ensure global browser is running (idempotent check)
-        if not _GLOBAL_CONTEXT:
+        # Ensure global browser fleet is running (idempotent check)
+        if not _GLOBAL_FLEET:
             await init_global_browser()
 
     async def stop(self):
@@ -211,45 +865,149 @@ class BrowserManager:
     async def search_web(self, query: str, log_func=None, session_id: str = None) -> List[Dict]:
         """
         [03] Concurrent Web Search (Google/Bing)
-        Scrapes search results for the query based on the selected engine.
+        Searches the selected engine, racing a secondary engine in hedged mode.
+        """
+        engine_key = self.engine if self.engine in self.engine_config else "duckduckgo"
+        secondary = self._pick_secondary_engine(engine_key) if self.hedged else None
+        if not secondary:
+            return await self._search_engine(engine_key, query, log_func, session_id)
+        return await self._hedged_search(engine_key, secondary, query, log_func, session_id)
+
+    def _captcha_risk(self, engine: str) -> Tuple[int, int]:
+        """Lower is safer: engines without CAPTCHA checks first, then the configured risk, then CAPTCHAs seen."""
+        config = self.engine_config.get(engine, {})
+        if not config.get("captcha_check"):
+            return (0, 0)
+        return (config.get("captcha_risk", 1), get_engine_limiter(engine, config).captcha_hits)
+
+    def _pick_secondary_engine(self, primary: str) -> Optional[str]:
+        # Without latency samples the hedge goes to the engine least likely to show a CAPTCHA
+        candidates = sorted((e for e in self.engine_config if e != primary), key=self._captcha_risk)
+        ranked = get_engine_stats().rank_engines(candidates)
+        return ranked[0] if ranked else None
+
+    async def _hedged_search(self, primary: str, secondary: str, query: str, log_func=None, session_id: str = None) -> List[Dict]:
+        """
+        Fires the primary engine and, if it has no results within its usual latency (p90),
+        races the secondary. The first non-empty answer wins and the other search is cancelled;
+        if both finish together their results are merged. A primary waiting on the user to
+        solve a CAPTCHA is never hedged or cancelled.
         """
-        if not _GLOBAL_CONTEXT:
+        stats = get_engine_stats()
+        delay = stats.hedge_delay(primary)
+        primary_task = asyncio.create_task(self._search_engine(primary, query, log_func, session_id))
+        done, _ = await asyncio.wait({primary_task}, timeout=delay)
+        if done and primary_task.exception() is None and primary_task.result():
+            return primary_task.result()
+        if not done and _in_interaction(session_id, primary, query):
+            # Slow because the user is solving a CAPTCHA for it; their answer is worth waiting for
+            return await primary_task
+
+        if log_func:
+            reason = "无结果" if done else f"{delay:.1f}s 内未返回"
+            log_func(f"浏览器: {primary.capitalize()} {reason}，启动备用引擎 {secondary.capitalize()} 对冲搜索...")
+        # No session: a CAPTCHA on the backup engine just loses the race instead of asking the user
+        secondary_task = asyncio.create_task(self._search_engine(secondary, query, log_func, None))
+        engine_of = {primary_task: primary, secondary_task: secondary}
+        pending = {secondary_task} if done else {primary_task, secondary_task}
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [t for t in done if not t.cancelled() and t.exception() is None and t.result()]
+                if not winners:
+                    continue
+                stats.record_hedge(primary, won=secondary_task in winners)
+                if len(winners) == 1:
+                    if log_func: log_func(f"浏览器: 对冲搜索采用 {engine_of[winners[0]].capitalize()} 的结果。")
+                    return winners[0].result()
+                if log_func: log_func("浏览器: 两个引擎同时返回，合并结果。")
+                return _canonicalize_results(primary_task.result() + secondary_task.result())
+            stats.record_hedge(primary, won=False)
+            return []
+        finally:
+            # Cancel the losing navigation, unless the user is mid-CAPTCHA on it: that session
+            # runs to completion (or its timeout) on its own and its results land in the search cache
+            for task in (primary_task, secondary_task):
+                if task.done():
+                    continue
+                if task is primary_task and _in_interaction(session_id, primary, query):
+                    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                else:
+                    task.cancel()
+
+    async def _search_engine(self, engine: str, query: str, log_func=None, session_id: str = None) -> List[Dict]:
+        """Returns cached results for repeated queries; identical in-flight searches share one navigation."""
+        cache = get_search_cache()
+        key = cache.make_key(engine, query, self.max_results)
+
+        cached = cache.get(key)
+        if cached is not None:
+            if log_func: log_func(f"搜索缓存: 命中 '{query}' ({len(cached)} 个结果)")
+            return cached
+
+        if cache.is_inflight(key) and log_func:
+            log_func(f"搜索缓存: 相同搜索 '{query}' 正在进行中，等待其结果...")
+        return await cache.coalesce(key, query, lambda: self._search_web_uncached(engine, query, log_func, session_id))
+
+    async def _search_web_uncached(self, engine: str, query: str, log_func=None, session_id: str = None) -> List[Dict]:
+        started = time.monotonic()
+        results = _canonicalize_results(await self._scrape_results(engine, query, log_func, session_id))
+        # Successful latencies drive the hedge threshold
+        get_engine_stats().record(engine, time.monotonic() - started, bool(results))
+        return results
+
+    async def _search_static(self, config: Dict, query: str, log_func=None) -> List[Dict]:
+        """Tries the engine's browser-free adapters in order; empty means fall back to the browser."""
+        for adapter in get_static_adapters(config):
+            results, reason = await adapter.search(query, self.max_results)
+            if results:
+                if log_func: log_func(f"搜索: 通过 {adapter.name} 静态接口获得 {len(results)} 个结果 (无需浏览器)。")
+                return results
+            if log_func: log_func(f"搜索: 静态接口 {adapter.name} 不可用: {reason}")
+        return []
+
+    async def _scrape_results(self, engine: str, query: str, log_func=None, session_id: str = None) -> List[Dict]:
+        """Scrapes search results for the query from the given engine."""
+        # Get config for the engine (default to duckduckgo if not found)
+        engine_key = engine if engine in self.engine_config else "duckduckgo"
+        config = self.engine_config[engine_key]
+        engine_name = engine_key.capitalize()
+
+        # One HTTP round-trip and no tab when the engine has a static endpoint
+        results = await self._search_static(config, query, log_func)
+        if results:
+            return results
+
+        if not _GLOBAL_FLEET:
             await self.start()
-        
-        # Get config based on current engine (default to duckduckgo if not found)
-        config = self.engine_config.get(self.engine, self.engine_config["duckduckgo"])
-        engine_name = self.engine.capitalize()
+        # "human" adds mouse/scroll mimicry and random pauses; "fast" skips them on engines that don't need it
+        human_like = config.get("wait_profile", "human") != "fast"
+
+        # Enforce per-engine rate limiting to avoid CAPTCHAs (before leasing a tab, so queued searches don't hold one)
+        limiter = get_engine_limiter(engine_key, config)
+        waited = await limiter.acquire()
+        if waited > 0.05 and log_func:
+            log_func(f"浏览器: {engine_name} 搜索排队等待了 {waited:.1f}s (限速 {limiter.rate:.2f} 次/秒)")
 
-        page = await get_new_page()
-        await self.stealth.apply_stealth_async(page)
+        page = await acquire_page()
         
         try:
             if log_func: log_func(f"浏览器: 正在前往 {engine_name} 搜索 '{query}'...")
             
-            delay = random.uniform(1.0, 2.0)
-            await asyncio.sleep(delay)
+            if human_like:
+                await asyncio.sleep(random.uniform(1.0, 2.0))
             
             # Construct URL
             encoded_query = urllib.parse.quote(query)
             # Google supports num param, others ignore it usually or we handle it differently
             url = config["base_url"].format(query=encoded_query, num=self.max_results + 2) # Request a few more to be safe
-            # Enforce rate limiting to avoid CAPTCHAs
-            global _LAST_REQUEST_TIME
-            async with _SEARCH_LOCK:
-                now = time.time()
-                elapsed = now - _LAST_REQUEST_TIME
-                if elapsed < _MIN_SEARCH_INTERVAL:
-                    # Add some randomness to the wait
-                    wait_time = _MIN_SEARCH_INTERVAL - elapsed + random.uniform(0.5, 1.5)
-                    if log_func: log_func(f"浏览器: 正在排队等待搜索 (冷却 {wait_time:.1f}s)...")
-                    await asyncio.sleep(wait_time)
-                
-                _LAST_REQUEST_TIME = time.time()
 
-                try:
-                    await page.goto(url, wait_until="domcontentloaded", timeout=20000)
-                    
-                    # Human-like interaction: Random mouse movement and scrolling
+            try:
+                await page.goto(url, wait_until="domcontentloaded", timeout=20000)
+                
+                # Human-like interaction: Random mouse movement and scrolling
+                if human_like:
                     try:
                         await page.mouse.move(random.randint(100, 500), random.randint(100, 500))
                         await asyncio.sleep(random.uniform(0.5, 1.5))
@@ -257,9 +1015,9 @@ class BrowserManager:
                         await asyncio.sleep(random.uniform(0.5, 1.5))
                     except Exception:
                         pass
-                except Exception as e:
-                    if log_func: log_func(f"浏览器: 搜索页面加载失败: {e}")
-                    return []
+            except Exception as e:
+                if log_func: log_func(f"浏览器: 搜索页面加载失败: {e}")
+                return []
             
             # Check for CAPTCHA (Mainly for Google)
             try:
@@ -281,7 +1039,8 @@ class BrowserManager:
                     break
 
             if detected_captcha:
-                print(f"CAPTCHA detected on {engine_name}!")
+                limiter.record_captcha()
+                print(f"CAPTCHA detected on {engine_name}! Rate limit lowered to {limiter.rate:.3f}/s")
                 if log_func: log_func("浏览器: 检测到验证码！等待手动解决...")
                 
                 if session_id:
@@ -292,6 +1051,8 @@ class BrowserManager:
                      _INTERACTION_SESSIONS[session_id] = {
                         "page": page,
                         "event": event,
+                        "engine": engine,
+                        "query": query,
                         "last_active": time.time()
                      }
                      
@@ -306,7 +1067,8 @@ class BrowserManager:
                      except asyncio.TimeoutError:
                         if log_func: log_func("浏览器: 等待手动验证超时 (10分钟)。")
                      finally:
-                        if session_id in _INTERACTION_SESSIONS:
+                        # Also runs on cancellation; only drop the session if a newer one hasn't replaced it
+                        if _INTERACTION_SESSIONS.get(session_id, {}).get("event") is event:
                             del _INTERACTION_SESSIONS[session_id]
                 else:
                     # Fallback old logic
@@ -320,7 +1082,8 @@ class BrowserManager:
             try:
                 # Increased timeout to 30s for slower loads after CAPTCHA
                 await page.wait_for_selector(config["wait_selector"], timeout=30000)
-                await asyncio.sleep(1.0) # Let the page settle
+                # Let the result list finish rendering (returns as soon as it stops changing)
+                await wait_for_dom_settle(page, config["wait_selector"], quiet_ms=300, timeout_ms=3000)
             except Exception as e:
                 msg = f"等待结果容器 ({config['wait_selector']}) 超时。"
                 print(msg)
@@ -411,6 +1174,8 @@ class BrowserManager:
                     # Re-raise if not a context issue or out of retries
                     raise e
             
+            if not detected_captcha:
+                limiter.record_success()
             if log_func: log_func(f"浏览器: 成功解析 {len(results)} 个结果。")
             return results
         except Exception as e:
@@ -419,98 +1184,121 @@ class BrowserManager:
             if log_func: log_func(f"浏览器错误: {msg}")
             return []
         finally:
-            await page.close()
+            await release_page(page)
 
-    async def crawl_page(self, url: str, log_func=None, interactive_mode: bool = False, query: str = None, llm_client=None, session_id: str = None) -> str:
+    async def crawl_page(self, url: str, log_func=None, interactive_mode: bool = False, query: str = None, llm_client=None, session_id: str = None, priority: float = None) -> str:
         """
         [06] Headless Browser Deep Crawling
+        Serves fresh pages from the crawl cache; anything else waits for a slot in the global
+        crawl scheduler (lower priority runs first), then tries a plain HTTP fetch, then a browser tab.
+        """
+        # The canonical form is only the cache/dedupe key; the page itself is fetched at its real (unwrapped) URL
+        final_url = canonicalize_url(url)
+        url = unwrap_redirect(url.strip())
+
+        cache = get_crawl_cache()
+        cached = await cache.get(final_url)
+        if cached and cached["fresh"]:
+            content = _cached_content(cached, query)
+            if log_func: log_func(f"缓存: 命中 {final_url} (缓存于 {cached['age'] / 60:.0f} 分钟前，{len(content)} 个字符)")
+            return content
+
+        host = (urllib.parse.urlparse(final_url).hostname or "").lower()
+        scheduler = get_crawl_scheduler()
+        waited = await scheduler.acquire(host, priority if priority is not None else crawl_priority())
+        if waited > 0.1 and log_func:
+            log_func(f"调度: 等待 {waited:.1f}s 后开始爬取 {host} (排队 {scheduler.queue_depth} 个)")
+        try:
+            return await self._fetch_page(url, final_url, cached, log_func, interactive_mode, query, llm_client)
+        finally:
+            scheduler.release(host)
+
+    async def _fetch_page(self, url: str, final_url: str, cached: Optional[Dict], log_func=None, interactive_mode: bool = False, query: str = None, llm_client=None) -> str:
+        """
+        Fetches a page that missed the cache: GitHub REST API or plain HTTP first, browser tab as fallback.
+        Requests go to url; final_url (its canonical form) keys the cache and the domain tier.
         """
-        if not _GLOBAL_CONTEXT:
+        cache = get_crawl_cache()
+
+        # GitHub profiles and repo lists: complete aggregates straight from the REST API
+        github_target = parse_github_url(final_url)
+        if github_target:
+            try:
+                summary = await get_github_fetcher().summarize(github_target)
+                await cache.put(final_url, summary)
+                if log_func: log_func(f"GitHub: 通过 REST API 获取 {github_target[1]} 的完整数据。")
+                return summary
+            except Exception as e:
+                if log_func: log_func(f"GitHub: REST API 不可用 ({e})，改用浏览器渲染...")
+                if github_target[0] == "repos":
+                    # The repositories tab sorted by stars is what the browser's star analysis reads
+                    url = final_url = f"https://github.com/{github_target[1]}?tab=repositories&q=&type=&language=&sort=stargazers"
+
+        # Tier 1: plain HTTP fetch, unless this domain needed a browser last time.
+        # GitHub repo listings are left to the browser, which runs DOM-specific analysis.
+        is_github_special = "api.github.com" in final_url or ("github.com" in final_url and "tab=repositories" in final_url)
+        if HTTP_FETCH_ENABLED and not is_github_special and final_url.startswith("http"):
+            # Documents are never worth a browser tab, whatever the domain needed last time
+            if preferred_tier(final_url) == "http" or looks_like_document(final_url):
+                validators = {"etag": cached.get("etag"), "last_modified": cached.get("last_modified")} if cached else {}
+                text, reason, meta = await fetch_page_text(url, query=query, **validators)
+                if meta.get("not_modified") and cached:
+                    await cache.put(final_url, cached["content"], etag=meta.get("etag") or cached.get("etag"), last_modified=meta.get("last_modified") or cached.get("last_modified"), document=cached.get("document"))
+                    if log_func: log_func(f"缓存: {final_url} 经条件请求验证未变化 (304)，复用缓存内容。")
+                    return _cached_content(cached, query)
+                if meta.get("document"):
+                    # Chromium can't read PDF/DOCX text either, so there is nothing to escalate to
+                    if text:
+                        # The cache keeps every page (content is the query-free rendering); text is picked for this query
+                        document = {"kind": meta["document"], "pages": meta["pages"]}
+                        await cache.put(final_url, render_document(meta["pages"], meta["document"]), etag=meta.get("etag"), last_modified=meta.get("last_modified"), document=document)
+                        if log_func: log_func(f"文档: 已下载并提取 {meta['document'].upper()} {final_url} ({len(text)} 个字符)。")
+                    elif log_func:
+                        log_func(f"文档: 无法提取 {final_url} ({reason})。")
+                    return text or ""
+                if text:
+                    record_tier(final_url, "http")
+                    await cache.put(final_url, text, etag=meta.get("etag"), last_modified=meta.get("last_modified"))
+                    if log_func: log_func(f"浏览器: HTTP 直取 {final_url} 成功 - 提取了 {len(text)} 个字符 (跳过浏览器渲染)。")
+                    return text
+                # Only a blocked or JS-rendered HTML page says anything about the domain; a JSON/image link or a 404 doesn't
+                if meta.get("needs_browser"):
+                    record_tier(final_url, "browser")
+                if log_func: log_func(f"浏览器: HTTP 直取不可用 ({reason})，改用浏览器渲染...")
+            elif log_func:
+                log_func(f"浏览器: 该域名上次需要浏览器渲染，跳过 HTTP 直取。")
+
+        if not _GLOBAL_FLEET:
             await self.start()
-            
-        # Handle search engine redirect URLs (Bing/Google/DuckDuckGo)
-        final_url = url
-        if "bing.com/ck/a" in url or "google.com/url" in url or "duckduckgo.com/l/" in url:
-            if log_func: log_func(f"浏览器: 检测到重定向 URL，正在尝试提取目标...")
-            
-            # Handle DuckDuckGo
-            if "duckduckgo.com/l/" in url:
-                try:
-                    parsed = urllib.parse.urlparse(url)
-                    params = urllib.parse.parse_qs(parsed.query)
-                    if 'uddg' in params:
-                        final_url = params['uddg'][0]
-                        if log_func: log_func(f"浏览器: 提取 DuckDuckGo 重定向 URL 成功: {final_url}")
-                except Exception as e:
-                    if log_func: log_func(f"浏览器: 提取 DuckDuckGo 重定向 URL 失败: {e}")
-
-            # For Bing, the 'u' parameter is often base64 encoded with 'a1' prefix
-            elif "bing.com/ck/a" in url:
-                parsed = urllib.parse.urlparse(url)
-                params = urllib.parse.parse_qs(parsed.query)
-                if 'u' in params:
-                    u_val = params['u'][0]
-                    if u_val.startswith('a1'):
-                        try:
-                            # a1 prefix, then base64
-                            b64_part = u_val[2:]
-                            # Add padding if needed
-                            b64_part += "=" * ((4 - len(b64_part) % 4) % 4)
-                            decoded = base64.b64decode(b64_part).decode('utf-8')
-                            final_url = decoded
-                            if log_func: log_func(f"浏览器: 提取 Bing 重定向 URL 成功: {final_url}")
-                        except Exception as e:
-                            if log_func: log_func(f"浏览器: 提取 Bing 重定向 URL 失败: {e}")
-
-        page = await get_new_page()
-        await self.stealth.apply_stealth_async(page)
+
+        content, cacheable = await self._crawl_with_browser(url, final_url, log_func, interactive_mode, query, llm_client)
+        if cacheable and content:
+            await cache.put(final_url, content)
+        return content
+
+    async def _crawl_with_browser(self, url: str, final_url: str, log_func=None, interactive_mode: bool = False, query: str = None, llm_client=None) -> Tuple[str, bool]:
+        """Renders the page in a pooled tab. Returns (content, cacheable)."""
+        page = await acquire_page()
+
+        prepend_text = ""
+        engine_config = self.engine_config.get(self.engine, self.engine_config["duckduckgo"])
+        blocker = ResourceBlocker(select_resource_profile(final_url, engine_config))
 
         try:
             if log_func: log_func(f"浏览器: 正在爬取 {final_url}...")
+            await blocker.attach(page)
             
-            # Special handling for GitHub API requests to make them useful for LLM
-            if "api.github.com" in final_url and "/repos" in final_url:
-                if log_func: log_func(f"浏览器: 检测到 GitHub API 请求，正在优化数据...")
-                try:
-                    await page.goto(final_url, wait_until="networkidle", timeout=30000)
-                    json_content = await page.evaluate("() => document.body.innerText")
-                    try:
-                        data = json.loads(json_content)
-                        if isinstance(data, list):
-                            # Summarize repository list
-                            summary = f"GitHub API Repository List Summary (First 30 items):\n"
-                            total_stars = 0
-                            for repo in data:
-                                name = repo.get("name", "Unknown")
-                                stars = repo.get("stargazers_count", 0)
-                                desc = repo.get("description", "")
-                                total_stars += stars
-                                summary += f"- {name}: {stars} stars ({desc})\n"
-                            
-                            summary += f"\nTotal stars in this page: {total_stars}\n"
-                            
-                            # Check for pagination
-                            # GitHub API uses Link header for pagination, but we can't easily access headers in page.goto
-                            # However, we can try to guess if there are more by checking if we got 30 items
-                            if len(data) == 30:
-                                summary += "WARNING: There are likely more repositories (pagination detected). This count is INCOMPLETE.\n"
-                            
-                            if log_func: log_func(f"浏览器: 成功解析 GitHub API 数据，当前页共 {total_stars} stars。")
-                            return summary
-                    except json.JSONDecodeError:
-                        pass
-                except Exception as e:
-                    if log_func: log_func(f"浏览器: GitHub API 处理失败: {e}")
-
             try:
-                await page.goto(final_url, wait_until="domcontentloaded", timeout=20000)
+                await page.goto(url, wait_until="domcontentloaded", timeout=20000)
             except Exception as e:
                 if log_func: log_func(f"浏览器: 加载页面超时或失败 {final_url}: {e}")
-                return ""
+                return "", False
 
             # Try to wait for content to stabilize
             try:
-                await page.wait_for_load_state("networkidle", timeout=5000)
+                settle = await wait_for_dom_settle(page, quiet_ms=500, timeout_ms=5000)
+                if log_func and not settle["settled"]:
+                    log_func(f"浏览器: 页面在 {settle['elapsed'] / 1000:.1f}s 内仍在变化，直接提取当前内容。")
                 # Specific wait for GitHub repository lists
                 if "github.com" in final_url and "tab=repositories" in final_url:
                     try:
@@ -558,7 +1346,6 @@ class BrowserManager:
                                 prepend_text += f"- {r['name']}: {r['stars']} stars\n"
                             prepend_text += f"--------------------------\n\n"
                             
-                            page.prepend_text = prepend_text
                         else:
                             if log_func: log_func("浏览器: 未能在页面上提取到 Star 数据。")
                             
@@ -570,86 +1357,26 @@ class BrowserManager:
             # --- Interactive Mode ---
             if interactive_mode and query and llm_client:
                 try:
-                    if log_func: log_func("浏览器: 交互模式已开启，正在提取可点击元素...")
-                    
-                    # 1. Extract clickable elements (buttons, links with interesting text)
-                    # We inject a script to find elements
-                    elements = await page.evaluate("""() => {
-                        const items = [];
-                        let idCounter = 0;
-                        
-                        // Helper to check if element is visible
-                        function isVisible(elem) {
-                            if (!elem.getBoundingClientRect || !elem.checkVisibility) return false;
-                            const rect = elem.getBoundingClientRect();
-                            return rect.width > 0 && rect.height > 0 && elem.checkVisibility();
-                        }
-
-                        // Collect buttons and links
-                        const candidates = document.querySelectorAll('button, a[href], [role="button"]');
-                        
-                        for (const el of candidates) {
-                            if (!isVisible(el)) continue;
-                            
-                            const text = el.innerText.trim();
-                            if (text.length < 2 || text.length > 50) continue; // Filter too short/long
-                            
-                            // Filter common noise
-                            if (/^(home|login|sign in|sign up|menu|privacy|terms)$/i.test(text)) continue;
-                            
-                            // Assign a temp ID attribute to locate it later
-                            const tempId = "js-interact-" + idCounter++;
-                            el.setAttribute("data-js-interact-id", tempId);
-                            
-                            items.push({
-                                id: tempId,
-                                text: text,
-                                tag: el.tagName.toLowerCase()
-                            });
-                            
-                            if (items.length >= 50) break; // Limit count
-                        }
-                        return items;
-                    }""")
-                    
-                    if elements:
-                        if log_func: log_func(f"浏览器: 提取到 {len(elements)} 个候选元素。请求 AI 决策...")
-                        
-                        # 2. Ask LLM what to click
-                        clicked_ids = await llm_client.decide_click_elements(query, elements)
-                        
-                        if clicked_ids:
-                            if log_func: log_func(f"浏览器: AI 决定点击元素 ID: {clicked_ids}")
-                            
-                            for cid in clicked_ids:
-                                try:
-                                    # Locate by the temp ID we injected
-                                    await page.click(f'[data-js-interact-id="{cid}"]', timeout=2000)
-                                    if log_func: log_func(f"浏览器: 已点击元素 {cid}")
-                                    await asyncio.sleep(1.0) # Wait for reaction
-                                except Exception as e:
-                                    if log_func: log_func(f"浏览器: 点击元素 {cid} 失败: {e}")
-                            
-                            # Wait for potential new content
-                            try:
-                                await page.wait_for_load_state("networkidle", timeout=3000)
-                            except:
-                                await asyncio.sleep(2.0)
-                        else:
-                            if log_func: log_func("浏览器: AI 决定不点击任何元素。")
+                    policy = get_click_policy()
+                    mode = policy.decide(final_url)
+                    if mode == "skip":
+                        if log_func: log_func("浏览器: 该域名上的点击从未带来新内容，跳过交互模式。")
                     else:
-                        if log_func: log_func("浏览器: 未找到显著的可交互元素。")
-                        
+                        await self._interact(page, final_url, query, llm_client, policy, mode, log_func)
                 except Exception as e:
                     if log_func: log_func(f"浏览器: 交互模式执行出错: {e}")
 
             # --- End Interactive Mode ---
 
             content = ""
+            extraction = {}
             # Retry logic for execution context issues
             for attempt in range(3):
                 try:
-                    content = await page.evaluate("() => document.body ? document.body.innerText : ''")
+                    # Main-content extraction runs in the page and is capped there,
+                    # so only the useful part of the text crosses the CDP boundary
+                    extraction = await page.evaluate(MAIN_CONTENT_JS, MAX_CONTENT_CHARS) or {}
+                    content = extraction.get("text", "")
                     break
                 except Exception as e:
                     if "Execution context was destroyed" in str(e) or "Cannot find context" in str(e):
@@ -668,27 +1395,81 @@ class BrowserManager:
             content_len = len(content)
             
             # Prepend analysis if available
-            if hasattr(page, 'prepend_text'):
-                content = page.prepend_text + content
+            if prepend_text:
+                content = prepend_text + content
                 content_len = len(content)
             
-            # DEBUG: Print content snippet to verify what LLM sees
-            print(f"\n--- CRAWLED CONTENT SNIPPET ({url}) ---\n{content[:1000]}\n----------------------------------------\n")
-            
-            # Write full content to file for debugging
-            try:
-                with open("crawled_debug.txt", "w", encoding="utf-8") as f:
-                    f.write(f"URL: {url}\nContent:\n{content}")
-            except Exception as e:
-                print(f"Failed to write debug file: {e}")
+            if _CRAWL_DEBUG:
+                # DEBUG: Print content snippet to verify what LLM sees
+                print(f"\n--- CRAWLED CONTENT SNIPPET ({url}) ---\n{content[:1000]}\n----------------------------------------\n")
+                
+                # Write full content to file for debugging
+                try:
+                    with open("crawled_debug.txt", "w", encoding="utf-8") as f:
+                        f.write(f"URL: {url}\nContent:\n{content}")
+                except Exception as e:
+                    print(f"Failed to write debug file: {e}")
 
-            if log_func: log_func(f"浏览器: 已爬取 {url} - 提取了 {content_len} 个字符。")
-            return content.strip()
+            if log_func and blocker.enabled: log_func(f"浏览器: {blocker.summary()}")
+            mode_desc = "正文" if extraction.get("mode") == "main" else "全文"
+            truncated_desc = f"，已截断至 {MAX_CONTENT_CHARS} 字符上限" if extraction.get("truncated") else ""
+            if log_func: log_func(f"浏览器: 已爬取 {url} - 提取了 {content_len} 个字符 ({mode_desc}{truncated_desc})。")
+            return content.strip(), True
             
         except Exception as e:
             msg = f"Crawl error for {url}: {e}"
             print(msg)
             if log_func: log_func(f"浏览器错误: {msg}")
-            return f"爬取页面时出错: {str(e)}"
+            return f"爬取页面时出错: {str(e)}", False
         finally:
-            await page.close()
\ No newline at end of file
+            await release_page(page)
+
+    async def _interact(self, page: Page, final_url: str, query: str, llm_client, policy, mode: str, log_func=None):
+        """
+        Clicks expanders before extraction. In "learned" mode the domain's known targets are
+        replayed without asking the LLM; otherwise the LLM picks. Every click's effect on
+        the page text is fed back into the click policy.
+        """
+        if log_func: log_func("浏览器: 交互模式已开启，正在提取可点击元素...")
+        elements = await page.evaluate(_CLICKABLES_JS)
+        if not elements:
+            if log_func: log_func("浏览器: 未找到显著的可交互元素。")
+            return
+
+        clicked_ids = []
+        if mode == "learned":
+            clicked_ids = policy.match(final_url, elements)
+            if clicked_ids:
+                if log_func: log_func(f"浏览器: 按该域名已学到的点击策略点击 {len(clicked_ids)} 个元素 (跳过 AI 决策)。")
+            else:
+                # Learned targets aren't on this page; let the LLM look at it
+                mode = "explore"
+        if mode == "explore":
+            if log_func: log_func(f"浏览器: 提取到 {len(elements)} 个候选元素。请求 AI 决策...")
+            clicked_ids = await llm_client.decide_click_elements(query, elements)
+            if not clicked_ids:
+                if log_func: log_func("浏览器: AI 决定不点击任何元素。")
+                await policy.record(final_url, [])
+                return
+            if log_func: log_func(f"浏览器: AI 决定点击元素 ID: {clicked_ids}")
+
+        by_id = {el["id"]: el for el in elements}
+        clicks = []
+        length = await page.evaluate(_TEXT_LENGTH_JS)
+        for cid in clicked_ids:
+            try:
+                # Locate by the temp ID we injected
+                await page.click(f'[data-js-interact-id="{cid}"]', timeout=2000)
+                if log_func: log_func(f"浏览器: 已点击元素 {cid}")
+                await wait_for_dom_settle(page, quiet_ms=300, timeout_ms=1500) # Wait for reaction
+                new_length = await page.evaluate(_TEXT_LENGTH_JS)
+            except Exception as e:
+                if log_func: log_func(f"浏览器: 点击元素 {cid} 失败: {e}")
+                continue
+            if cid in by_id:
+                clicks.append({**by_id[cid], "grew": click_grew(length, new_length)})
+            length = new_length
+
+        # Wait for potential new content
+        await wait_for_dom_settle(page, quiet_ms=500, timeout_ms=3000)
+        await policy.record(final_url, clicks, learned=(mode == "learned"))
\ No newline at end of file
@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import asyncio
+import urllib.parse
+import aiofiles
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Stored next to the crawl cache in the backend directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+POLICY_PATH = os.path.join(PROJECT_ROOT, 'cache', 'click_policy.json')
+
+CLICK_POLICY_ENABLED = os.getenv("CLICK_POLICY_ENABLED", "true").lower() == "true"
+MIN_TRIALS = 3  # LLM-guided visits before a domain's policy is trusted
+POLICY_TTL = 14 * 86400  # Seconds before a domain is explored again from scratch
+MIN_GROWTH_CHARS = 200  # A click "helped" when the page text grew at least this much...
+MIN_GROWTH_RATIO = 0.05  # ...and by at least this fraction
+MAX_DOMAINS = 2000
+MAX_SELECTORS = 20  # Remembered click targets per domain
+
+def domain_of(url: str) -> str:
+    host = (urllib.parse.urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+def click_grew(before: int, after: int) -> bool:
+    return after - before >= max(MIN_GROWTH_CHARS, before * MIN_GROWTH_RATIO)
+
+def _target_key(element: Dict) -> str:
+    return f"{element.get('selector', '')}|{' '.join(element.get('text', '').lower().split())}"
+
+class ClickPolicyStore:
+    """
+    Learns per domain which interactive-mode clicks made the extracted text grow.
+    A domain starts in "explore" (the LLM picks the clicks); after MIN_TRIALS visits it
+    either moves to "learned" (replay the targets that helped, no LLM call) or, when
+    no click ever helped, to "skip" (no DOM scan, no clicks). Kept in one small JSON file.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._domains: "OrderedDict[str, Dict]" = OrderedDict()  # domain -> record, least recently updated first
+        self._loaded = False
+        self.decisions = {"explore": 0, "learned": 0, "skip": 0}
+        self._save_lock = asyncio.Lock()
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for domain, record in sorted(data.items(), key=lambda item: item[1].get("updated_at", 0)):
+            self._domains[domain] = record
+
+    def _record(self, domain: str) -> Optional[Dict]:
+        self._load()
+        record = self._domains.get(domain)
+        if record and time.time() - record.get("updated_at", 0) > POLICY_TTL:
+            del self._domains[domain]
+            return None
+        return record
+
+    def decide(self, url: str) -> str:
+        """Returns "explore", "learned" or "skip" for the page's domain."""
+        mode = "explore"
+        record = self._record(domain_of(url)) if CLICK_POLICY_ENABLED else None
+        if record and record["trials"] >= MIN_TRIALS:
+            if record["helped"] == 0:
+                mode = "skip"
+            elif self.learned_targets(url):
+                mode = "learned"
+        self.decisions[mode] += 1
+        return mode
+
+    def learned_targets(self, url: str) -> List[Dict]:
+        """Click targets that helped on more than half of their clicks, best first."""
+        record = self._record(domain_of(url))
+        if not record:
+            return []
+        targets = [t for t in record["targets"].values() if t["helped"] * 2 > t["clicks"]]
+        return sorted(targets, key=lambda t: t["helped"], reverse=True)
+
+    def match(self, url: str, elements: List[Dict]) -> List[str]:
+        """Maps learned targets onto the elements found on this page; returns their temp IDs."""
+        wanted = {(t["selector"], t["text"]) for t in self.learned_targets(url)}
+        wanted_texts = {text for _, text in wanted}
+        exact, by_text = [], []
+        for el in elements:
+            text = ' '.join(el.get('text', '').lower().split())
+            if (el.get("selector", ""), text) in wanted:
+                exact.append(el["id"])
+            elif text in wanted_texts:
+                by_text.append(el["id"])
+        # Same selector and text first; the same label elsewhere on the page is a weaker match
+        return exact + by_text
+
+    async def record(self, url: str, clicks: List[Dict], learned: bool = False):
+        """
+        Folds in one interactive visit. clicks: [{"selector", "text", "grew"}] for each click made.
+        Replays of learned targets update the targets but don't count as exploration trials.
+        """
+        if not CLICK_POLICY_ENABLED:
+            return
+        domain = domain_of(url)
+        record = self._record(domain) or {"trials": 0, "helped": 0, "targets": {}}
+        if not learned:
+            record["trials"] += 1
+            if any(c["grew"] for c in clicks):
+                record["helped"] += 1
+        for click in clicks:
+            key = _target_key(click)
+            target = record["targets"].get(key)
+            if target is None:
+                target = record["targets"][key] = {
+                    "selector": click.get("selector", ""),
+                    "text": ' '.join(click.get("text", "").lower().split()),
+                    "clicks": 0,
+                    "helped": 0,
+                }
+            target["clicks"] += 1
+            if click["grew"]:
+                target["helped"] += 1
+        if len(record["targets"]) > MAX_SELECTORS:
+            ranked = sorted(record["targets"].items(), key=lambda item: (item[1]["helped"], item[1]["clicks"]), reverse=True)
+            record["targets"] = dict(ranked[:MAX_SELECTORS])
+        record["updated_at"] = time.time()
+
+        self._domains[domain] = record
+        self._domains.move_to_end(domain)
+        while len(self._domains) > MAX_DOMAINS:
+            self._domains.popitem(last=False)
+        await self._save()
+
+    async def _save(self):
+        # Overlapping saves would interleave in the temp file; one at a time, each writing the latest state.
+        # The pid suffix keeps several server processes off each other's temp file.
+        async with self._save_lock:
+            data = json.dumps(self._domains, ensure_ascii=False)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                async with aiofiles.open(tmp_path, 'w', encoding='utf-8') as f:
+                    await f.write(data)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print(f"Click policy write failed: {e}")
+
+    def stats(self) -> Dict:
+        self._load()
+        modes = {"explore": 0, "learned": 0, "skip": 0}
+        for record in self._domains.values():
+            if record["trials"] < MIN_TRIALS:
+                modes["explore"] += 1
+            elif record["helped"] == 0:
+                modes["skip"] += 1
+            else:
+                modes["learned"] += 1
+        return {
+            "domains": len(self._domains),
+            "domain_modes": modes,
+            "decisions": dict(self.decisions),
+            "llm_calls_saved": self.decisions["learned"] + self.decisions["skip"],
+        }
+
+_CLICK_POLICY: Optional[ClickPolicyStore] = None
+
+def get_click_policy() -> ClickPolicyStore:
+    global _CLICK_POLICY
+    if _CLICK_POLICY is None:
+        _CLICK_POLICY = ClickPolicyStore(POLICY_PATH)
+    return _CLICK_POLICY
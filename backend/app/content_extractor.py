@@ -0,0 +1,288 @@
+import os
+import re
+from typing import Dict, List, Optional
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+# Upper bound on extracted characters per page, applied before text leaves the browser
+MAX_CONTENT_CHARS = int(os.getenv("CRAWL_MAX_CHARS", "20000"))
+# Below this many characters the "main" block is not trusted and the whole body is used
+MIN_MAIN_CHARS = 250
+
+_NEGATIVE_HINTS = re.compile(r"comment|footer|footnote|masthead|\bnav|sidebar|sponsor|advert|\bads?\b|\bad[-_]|banner|cookie|consent|gdpr|popup|modal|share|social|related|recommend|menu|breadcrumb|subscribe|newsletter|promo", re.I)
+_POSITIVE_HINTS = re.compile(r"article|body|content|entry|main|page|post|text|blog|story|markdown|prose", re.I)
+
+_SKIP_TAGS = ["script", "style", "noscript", "template", "svg", "iframe", "nav", "footer", "aside", "form", "button", "select", "input", "textarea", "head"]
+_BLOCK_TAGS = ["address", "article", "aside", "blockquote", "dd", "div", "dl", "dt", "figure", "figcaption", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "ol", "p", "pre", "section", "table", "ul"]
+_TAG_BONUS = {"article": 10, "main": 10, "div": 5, "section": 3, "td": 3, "blockquote": 3}
+
+# In-page counterpart of extract_main_content(). Scores blocks by the paragraphs they hold
+# (Readability-style), then serializes the winner with headings, list items and table rows.
+# Takes the character cap so oversized pages are cut before crossing the CDP boundary.
+MAIN_CONTENT_JS = r"""(maxChars) => {
+    const NEG = /comment|footer|footnote|masthead|\bnav|sidebar|sponsor|advert|\bads?\b|\bad[-_]|banner|cookie|consent|gdpr|popup|modal|share|social|related|recommend|menu|breadcrumb|subscribe|newsletter|promo/i;
+    const POS = /article|body|content|entry|main|page|post|text|blog|story|markdown|prose/i;
+    const SKIP = new Set(["SCRIPT", "STYLE", "NOSCRIPT", "TEMPLATE", "SVG", "IFRAME", "NAV", "FOOTER", "ASIDE", "FORM", "BUTTON", "SELECT", "INPUT", "TEXTAREA"]);
+    const BLOCK_SEL = "address,article,aside,blockquote,dd,div,dl,dt,figure,figcaption,h1,h2,h3,h4,h5,h6,header,hr,li,main,ol,p,pre,section,table,ul";
+    const TAG_BONUS = {ARTICLE: 10, MAIN: 10, DIV: 5, SECTION: 3, TD: 3, BLOCKQUOTE: 3};
+    const MIN_MAIN_CHARS = 250;
+
+    const body = document.body;
+    if (!body) return {text: "", mode: "empty", truncated: false};
+
+    const hints = (el) => ((typeof el.className === "string" ? el.className : "") + " " + (el.id || ""));
+    const linkDensity = (el) => {
+        const total = el.textContent.length || 1;
+        let links = 0;
+        for (const a of el.querySelectorAll("a")) links += a.textContent.length;
+        return Math.min(1, links / total);
+    };
+
+    // 1. Score containers by the paragraphs they hold
+    const scores = new Map();
+    const addScore = (el, s) => {
+        if (!el || el === document.documentElement) return;
+        if (!scores.has(el)) {
+            const h = hints(el);
+            let base = TAG_BONUS[el.tagName] || 0;
+            if (NEG.test(h)) base -= 25;
+            if (POS.test(h)) base += 25;
+            scores.set(el, base);
+        }
+        scores.set(el, scores.get(el) + s);
+    };
+    for (const p of body.querySelectorAll("p, pre, td, blockquote, li, h2, h3")) {
+        const text = p.textContent.trim();
+        if (text.length < 25) continue;
+        const s = 1 + (text.match(/[,，、。]/g) || []).length + Math.min(Math.floor(text.length / 100), 3);
+        const parent = p.parentElement;
+        addScore(parent, s);
+        if (parent) addScore(parent.parentElement, s / 2);
+    }
+
+    let top = null, topScore = 0;
+    for (const [el, s] of scores) {
+        const adjusted = s * (1 - linkDensity(el));
+        if (adjusted > topScore) { topScore = adjusted; top = el; }
+    }
+
+    // Pull in well-scored siblings (articles are often split across adjacent blocks)
+    let roots = [body];
+    let mode = "body";
+    if (top && top !== body && top.textContent.trim().length >= MIN_MAIN_CHARS) {
+        roots = [top];
+        mode = "main";
+        if (top.parentElement) {
+            const threshold = Math.max(10, topScore * 0.2);
+            roots = Array.from(top.parentElement.children).filter(el =>
+                el === top || (scores.has(el) && scores.get(el) * (1 - linkDensity(el)) >= threshold));
+        }
+    }
+
+    // 2. Serialize, stopping once the cap is reached
+    const out = [];
+    let length = 0, truncated = false;
+    const push = (text, preserve) => {
+        if (truncated || !text) return;
+        text = preserve ? text.replace(/^\n+|\s+$/g, "") : text.replace(/\s+/g, " ").trim();
+        if (!text) return;
+        if (length + text.length > maxChars) {
+            text = text.slice(0, Math.max(0, maxChars - length));
+            truncated = true;
+        }
+        out.push(text);
+        length += text.length + 1;
+    };
+    const isHidden = (el) => el.hidden || el.getAttribute("aria-hidden") === "true" || (el.checkVisibility && !el.checkVisibility());
+    const emitTable = (table) => {
+        let rows = 0;
+        for (const tr of table.querySelectorAll("tr")) {
+            if (truncated || rows++ >= 200) break;
+            const cells = Array.from(tr.cells).map(c => c.innerText.replace(/\s+/g, " ").trim());
+            if (cells.some(c => c)) push("| " + cells.join(" | ") + " |");
+        }
+    };
+    const walk = (el) => {
+        let inline = "";
+        const flush = () => { push(inline); inline = ""; };
+        for (const child of el.childNodes) {
+            if (truncated) return;
+            if (child.nodeType === Node.TEXT_NODE) { inline += child.textContent; continue; }
+            if (child.nodeType !== Node.ELEMENT_NODE) continue;
+            // Foreign-namespace elements report lowercase names ("svg", not "SVG")
+            const tag = child.tagName.toUpperCase();
+            if (SKIP.has(tag) || isHidden(child)) continue;
+            // Boilerplate nested inside the article (share bars, related links)
+            if (NEG.test(hints(child)) && linkDensity(child) > 0.5) continue;
+            if (/^H[1-6]$/.test(tag)) { flush(); push("#".repeat(Number(tag[1])) + " " + child.innerText); }
+            else if (tag === "TABLE") { flush(); emitTable(child); }
+            else if (tag === "PRE") { flush(); push(child.innerText, true); }
+            else if (tag === "LI") { flush(); push("- " + child.innerText); }
+            else if (tag === "BR" || tag === "HR") { flush(); }
+            else if (child.matches(BLOCK_SEL) || child.querySelector(BLOCK_SEL)) { flush(); walk(child); }
+            else { inline += child.innerText || child.textContent; }
+        }
+        flush();
+    };
+    for (const root of roots) walk(root);
+
+    let text = out.join("\n");
+    if (mode === "main" && !truncated && text.length < MIN_MAIN_CHARS) {
+        mode = "body";
+        const full = body.innerText || "";
+        truncated = full.length > maxChars;
+        text = full.slice(0, maxChars);
+    }
+    return {text, mode, truncated};
+}"""
+
+def _hints(el: Tag) -> str:
+    classes = el.get("class") or []
+    if isinstance(classes, str):
+        classes = [classes]
+    return " ".join(classes) + " " + (el.get("id") or "")
+
+def _link_density(el: Tag) -> float:
+    total = len(el.get_text()) or 1
+    links = sum(len(a.get_text()) for a in el.find_all("a"))
+    return min(1.0, links / total)
+
+def _is_hidden(el: Tag) -> bool:
+    if el.has_attr("hidden") or el.get("aria-hidden") == "true":
+        return True
+    style = (el.get("style") or "").replace(" ", "").lower()
+    return "display:none" in style or "visibility:hidden" in style
+
+class _Serializer:
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.out: List[str] = []
+        self.length = 0
+        self.truncated = False
+
+    def push(self, text: str, preserve: bool = False):
+        if self.truncated or not text:
+            return
+        text = text.strip("\n").rstrip() if preserve else re.sub(r"\s+", " ", text).strip()
+        if not text:
+            return
+        if self.length + len(text) > self.max_chars:
+            text = text[:max(0, self.max_chars - self.length)]
+            self.truncated = True
+        self.out.append(text)
+        self.length += len(text) + 1
+
+    def table(self, table: Tag):
+        for rows, tr in enumerate(table.find_all("tr")):
+            if self.truncated or rows >= 200:
+                break
+            cells = [re.sub(r"\s+", " ", c.get_text(" ")).strip() for c in tr.find_all(["td", "th"])]
+            if any(cells):
+                self.push("| " + " | ".join(cells) + " |")
+
+    def walk(self, el: Tag):
+        inline: List[str] = []
+
+        def flush():
+            self.push("".join(inline))
+            inline.clear()
+
+        for child in el.children:
+            if self.truncated:
+                return
+            if type(child) is NavigableString:
+                inline.append(str(child))
+                continue
+            if not isinstance(child, Tag):
+                continue
+            name = child.name
+            if _NEGATIVE_HINTS.search(_hints(child)) and _link_density(child) > 0.5:
+                continue
+            if re.fullmatch(r"h[1-6]", name):
+                flush()
+                self.push("#" * int(name[1]) + " " + child.get_text(" "))
+            elif name == "table":
+                flush()
+                self.table(child)
+            elif name == "pre":
+                flush()
+                self.push(child.get_text(), preserve=True)
+            elif name == "li":
+                flush()
+                self.push("- " + child.get_text(" "))
+            elif name in ("br", "hr"):
+                flush()
+            elif name in _BLOCK_TAGS or child.find(_BLOCK_TAGS):
+                flush()
+                self.walk(child)
+            else:
+                inline.append(child.get_text())
+        flush()
+
+def extract_main_content(html: str, max_chars: Optional[int] = None) -> Dict:
+    """
+    Server-side counterpart of MAIN_CONTENT_JS for HTML fetched without a browser.
+    Returns {"text": ..., "mode": "main" | "body", "truncated": bool}.
+    """
+    max_chars = max_chars or MAX_CONTENT_CHARS
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(_SKIP_TAGS):
+        tag.decompose()
+    for tag in soup.find_all(_is_hidden):
+        tag.decompose()
+    body = soup.body or soup
+
+    scores: Dict[int, float] = {}
+    elements: Dict[int, Tag] = {}
+
+    def add_score(el: Optional[Tag], score: float):
+        if el is None or not isinstance(el, Tag) or el.name in ("html", "[document]"):
+            return
+        key = id(el)
+        if key not in scores:
+            hints = _hints(el)
+            base = _TAG_BONUS.get(el.name, 0)
+            if _NEGATIVE_HINTS.search(hints):
+                base -= 25
+            if _POSITIVE_HINTS.search(hints):
+                base += 25
+            scores[key] = base
+            elements[key] = el
+        scores[key] += score
+
+    for p in body.find_all(["p", "pre", "td", "blockquote", "li", "h2", "h3"]):
+        text = p.get_text(" ", strip=True)
+        if len(text) < 25:
+            continue
+        score = 1 + len(re.findall(r"[,，、。]", text)) + min(len(text) // 100, 3)
+        add_score(p.parent, score)
+        if p.parent is not None:
+            add_score(p.parent.parent, score / 2)
+
+    adjusted = {key: score * (1 - _link_density(elements[key])) for key, score in scores.items()}
+    top = elements[max(adjusted, key=adjusted.get)] if adjusted else None
+
+    roots = [body]
+    mode = "body"
+    if top is not None and top is not body and len(top.get_text(" ", strip=True)) >= MIN_MAIN_CHARS:
+        roots = [top]
+        mode = "main"
+        parent = top.parent
+        if isinstance(parent, Tag):
+            threshold = max(10, adjusted[id(top)] * 0.2)
+            roots = [el for el in parent.find_all(recursive=False)
+                     if el is top or adjusted.get(id(el), 0) >= threshold]
+
+    serializer = _Serializer(max_chars)
+    for root in roots:
+        serializer.walk(root)
+    text = "\n".join(serializer.out)
+    truncated = serializer.truncated
+
+    if mode == "main" and not truncated and len(text) < MIN_MAIN_CHARS:
+        mode = "body"
+        serializer = _Serializer(max_chars)
+        serializer.walk(body)
+        text = "\n".join(serializer.out)
+        truncated = serializer.truncated
+
+    return {"text": text, "mode": mode, "truncated": truncated}
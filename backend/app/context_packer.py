@@ -0,0 +1,143 @@
+import os
+import re
+import json
+from typing import Dict, List, Tuple
+import numpy as np
+
+DEFAULT_CONTEXT_TOKENS = int(os.getenv("CONTEXT_TOKEN_BUDGET", "12000"))  # Source tokens per answer prompt
+# Per-model overrides, e.g. CONTEXT_TOKEN_BUDGETS='{"deepseek": 48000, "gpt-4o-mini": 24000}' (matched as substrings)
+MODEL_CONTEXT_TOKENS: Dict[str, int] = json.loads(os.getenv("CONTEXT_TOKEN_BUDGETS", "{}"))
+PASSAGE_CHARS = 800  # Target passage size; paragraphs are merged up to about this
+LEAD_CHARS = 400  # Every source keeps at least its opening (title/lead) so it stays citable
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"\w+")
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff]")
+
+def budget_for(model: str) -> int:
+    model = (model or "").lower()
+    matches = [(len(name), tokens) for name, tokens in MODEL_CONTEXT_TOKENS.items() if name.lower() in model]
+    # The most specific (longest) match wins
+    return max(matches)[1] if matches else DEFAULT_CONTEXT_TOKENS
+
+def estimate_tokens(text: str) -> int:
+    """Rough count without a tokenizer: about one token per CJK character and per 4 other characters."""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk) // 4 + 1
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for word in _TOKEN.findall(text.lower()):
+        if _CJK.match(word):
+            # No spaces between CJK words; bigrams are a cheap stand-in
+            tokens.extend(word[i:i + 2] for i in range(max(1, len(word) - 1)))
+        else:
+            tokens.append(word)
+    return tokens
+
+def split_passages(text: str) -> List[str]:
+    """Splits on blank lines / paragraphs and merges short ones up to about PASSAGE_CHARS."""
+    passages, current = [], ""
+    for para in re.split(r"\n\s*\n|\n", text):
+        para = para.strip()
+        if not para:
+            continue
+        while len(para) > PASSAGE_CHARS * 2:
+            # Unbroken walls of text (minified pages, PDFs) get hard cuts
+            if current:
+                passages.append(current)
+                current = ""
+            passages.append(para[:PASSAGE_CHARS])
+            para = para[PASSAGE_CHARS:]
+        if current and len(current) + len(para) > PASSAGE_CHARS:
+            passages.append(current)
+            current = para
+        else:
+            current = f"{current}\n{para}" if current else para
+    if current:
+        passages.append(current)
+    return passages
+
+def bm25_scores(query: str, passages: List[str]) -> np.ndarray:
+    """BM25 of every passage against the query, computed as one term-frequency matrix."""
+    terms = sorted(set(tokenize(query)))
+    if not terms or not passages:
+        return np.zeros(len(passages))
+    index = {term: i for i, term in enumerate(terms)}
+    tf = np.zeros((len(passages), len(terms)))
+    lengths = np.zeros(len(passages))
+    for row, passage in enumerate(passages):
+        tokens = tokenize(passage)
+        lengths[row] = len(tokens)
+        for token in tokens:
+            col = index.get(token)
+            if col is not None:
+                tf[row, col] += 1
+
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log1p((len(passages) - df + 0.5) / (df + 0.5))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(lengths.mean(), 1.0))
+    return ((tf * (BM25_K1 + 1)) / (tf + norm[:, None])) @ idf
+
+def pack_sources(query: str, sources: List[Dict], budget_tokens: int) -> Tuple[List[Dict], Dict]:
+    """
+    Fits sources into budget_tokens. If everything fits, sources are returned unchanged.
+    Otherwise each source keeps its lead passage, the rest of the budget goes to the passages
+    scoring highest against the query, and each source's content is rebuilt from its chosen
+    passages in their original order (gaps marked with "..."). Source IDs are never changed.
+    Returns (packed sources, {"passages", "selected", "tokens"}).
+    """
+    total = sum(estimate_tokens(src.get('content', '')) for src in sources)
+    if total <= budget_tokens:
+        return sources, {"passages": None, "selected": None, "tokens": total}
+
+    owners, passages = [], []  # parallel: (source index, passage index within source), text
+    for s, src in enumerate(sources):
+        for p, passage in enumerate(split_passages(src.get('content', ''))):
+            owners.append((s, p))
+            passages.append(passage)
+    costs = np.array([estimate_tokens(p) for p in passages])
+    scores = bm25_scores(query, passages)
+
+    chosen = set()
+    trimmed: Dict[int, str] = {}  # lead passages currently shown cut to LEAD_CHARS
+    used = 0
+    for i, (_, p) in enumerate(owners):
+        if p == 0:
+            chosen.add(i)
+            if len(passages[i]) > LEAD_CHARS:
+                trimmed[i] = passages[i][:LEAD_CHARS] + "..."
+            used += estimate_tokens(trimmed.get(i, passages[i]))
+    # Stable sort: equal scores (including the unmatched rest) keep document order
+    for i in np.argsort(-scores, kind="stable"):
+        i = int(i)
+        if i in trimmed:
+            # A relevant lead is worth showing in full
+            extra = costs[i] - estimate_tokens(trimmed[i])
+            if used + extra <= budget_tokens:
+                del trimmed[i]
+                used += extra
+        elif i not in chosen and used + costs[i] <= budget_tokens:
+            chosen.add(i)
+            used += costs[i]
+
+    per_source: Dict[int, List[Tuple[int, str, bool]]] = {}  # source index -> [(passage index, text, chosen)]
+    for i, (s, p) in enumerate(owners):
+        per_source.setdefault(s, []).append((p, trimmed.get(i, passages[i]), i in chosen))
+
+    packed = []
+    for s, src in enumerate(sources):
+        parts, gap = [], False
+        for _, text, keep in per_source.get(s, []):
+            if keep:
+                if gap:
+                    parts.append("...")
+                parts.append(text)
+                gap = False
+            else:
+                gap = True
+        if gap and parts:
+            parts.append("...")
+        packed.append({**src, "content": "\n\n".join(parts)})
+    return packed, {"passages": len(passages), "selected": len(chosen), "tokens": int(used)}
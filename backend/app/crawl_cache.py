@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import hashlib
+import urllib.parse
+import aiofiles
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from .url_normalizer import canonicalize_url, url_key
+
+# Cache lives next to chats/ in the backend directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+CACHE_DIR = os.path.join(PROJECT_ROOT, 'cache', 'pages')
+
+CRAWL_CACHE_ENABLED = os.getenv("CRAWL_CACHE_ENABLED", "true").lower() == "true"
+DEFAULT_TTL = int(os.getenv("CRAWL_CACHE_TTL", str(6 * 3600)))  # Seconds a crawled page stays fresh
+MAX_CACHE_BYTES = int(os.getenv("CRAWL_CACHE_MAX_MB", "200")) * 1024 * 1024
+
+# Per-domain freshness overrides in seconds (matched on the domain and its subdomains)
+DOMAIN_TTLS = {
+    "api.github.com": 600,
+    "github.com": 3600,
+    "twitter.com": 600,
+    "x.com": 600,
+    "weibo.com": 600,
+    "wikipedia.org": 7 * 86400,
+    "docs.python.org": 7 * 86400,
+    "developer.mozilla.org": 7 * 86400,
+    "arxiv.org": 30 * 86400,
+}
+
+def cache_key(url: str) -> str:
+    """Cache identity of a URL; variants of the same page (redirect wrappers, tracking params, www.) share it."""
+    return url_key(url)
+
+def ttl_for(url: str) -> int:
+    host = (urllib.parse.urlsplit(url).hostname or "").lower()
+    for domain, ttl in DOMAIN_TTLS.items():
+        if host == domain or host.endswith("." + domain):
+            return ttl
+    return DEFAULT_TTL
+
+class CrawlCache:
+    """
+    Disk-backed cache of extracted page content, one JSON file per URL.
+    Entries keep their ETag/Last-Modified so stale pages can be revalidated over HTTP.
+    Documents also keep every extracted page ("document"), since the pages shown depend on the query.
+    Total size is bounded; the least recently used entries are evicted first.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # file key -> size, oldest first
+        self._total_bytes = 0
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def _load_index(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-5], stat.st_size))
+        # mtime is bumped on every hit, so it doubles as the LRU order
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    @staticmethod
+    def _file_key(url: str) -> str:
+        return hashlib.sha256(cache_key(url).encode("utf-8")).hexdigest()
+
+    async def get(self, url: str) -> Optional[Dict]:
+        """Returns the cached entry (with "fresh" and "age" filled in), or None."""
+        if not CRAWL_CACHE_ENABLED:
+            return None
+        self._load_index()
+        key = self._file_key(url)
+        if key not in self._index:
+            self.misses += 1
+            return None
+
+        try:
+            async with aiofiles.open(self._path(key), 'r', encoding='utf-8') as f:
+                entry = json.loads(await f.read())
+        except Exception:
+            self._forget(key)
+            self.misses += 1
+            return None
+
+        age = time.time() - entry.get("fetched_at", 0)
+        entry["age"] = age
+        entry["fresh"] = age < ttl_for(url)
+        if entry["fresh"]:
+            self.hits += 1
+        else:
+            self.revalidations += 1
+
+        self._index.move_to_end(key)
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        return entry
+
+    async def put(self, url: str, content: str, etag: Optional[str] = None, last_modified: Optional[str] = None, document: Optional[Dict] = None):
+        if not CRAWL_CACHE_ENABLED or not content:
+            return
+        self._load_index()
+        key = self._file_key(url)
+        data = json.dumps({
+            "url": canonicalize_url(url),
+            "content": content,
+            "fetched_at": time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+            "document": document,
+        }, ensure_ascii=False)
+
+        try:
+            async with aiofiles.open(self._path(key), 'w', encoding='utf-8') as f:
+                await f.write(data)
+        except Exception as e:
+            print(f"Crawl cache write failed for {url}: {e}")
+            return
+
+        size = len(data.encode("utf-8"))
+        self._total_bytes += size - self._index.get(key, 0)
+        self._index[key] = size
+        self._index.move_to_end(key)
+        self._evict()
+
+    def _forget(self, key: str):
+        size = self._index.pop(key, 0)
+        self._total_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            oldest = next(iter(self._index))
+            self._forget(oldest)
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._index),
+            "bytes": self._total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+        }
+
+_CRAWL_CACHE: Optional[CrawlCache] = None
+
+def get_crawl_cache() -> CrawlCache:
+    global _CRAWL_CACHE
+    if _CRAWL_CACHE is None:
+        _CRAWL_CACHE = CrawlCache(CACHE_DIR, MAX_CACHE_BYTES)
+    return _CRAWL_CACHE
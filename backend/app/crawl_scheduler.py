@@ -0,0 +1,117 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+from collections import Counter
+from typing import Dict, Optional
+
+CRAWL_MAX_CONCURRENCY = int(os.getenv("CRAWL_MAX_CONCURRENCY", "8"))  # Crawls in flight across all sessions
+CRAWL_MAX_PER_HOST = int(os.getenv("CRAWL_MAX_PER_HOST", "2"))  # Crawls in flight against one host
+RANK_PENALTY = 10.0  # Seconds of deadline slack per relevance rank
+DEFAULT_DEADLINE = 120.0  # Seconds, for crawls that come without a request deadline
+
+def crawl_priority(deadline: Optional[float] = None, rank: int = 0) -> float:
+    """
+    Lower runs first. Earliest request deadline wins, and within a request
+    each step down the relevance ranking counts as RANK_PENALTY seconds of extra slack.
+    """
+    if deadline is None:
+        deadline = time.monotonic() + DEFAULT_DEADLINE
+    return deadline + rank * RANK_PENALTY
+
+class CrawlScheduler:
+    """
+    Process-wide admission control for page crawls.
+    Enforces a global and a per-host concurrency cap, and hands free slots
+    to the waiting crawl with the best (lowest) priority whose host has room.
+    """
+    def __init__(self, max_concurrency: int = 8, max_per_host: int = 2):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_per_host = max(1, max_per_host)
+        self._queue = []  # heap of (priority, seq, host, future)
+        self._seq = itertools.count()
+        self._active = 0
+        self._active_per_host = Counter()
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.max_queue_depth = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, _, fut in self._queue if not fut.done())
+
+    def _grant(self, host: str):
+        self._active += 1
+        self._active_per_host[host] += 1
+
+    def _dispatch(self):
+        if self._active >= self.max_concurrency or not self._queue:
+            return
+        skipped = []
+        while self._queue and self._active < self.max_concurrency:
+            item = heapq.heappop(self._queue)
+            _, _, host, fut = item
+            if fut.done():
+                continue  # Cancelled while waiting
+            if self._active_per_host[host] >= self.max_per_host:
+                skipped.append(item)
+                continue
+            self._grant(host)
+            fut.set_result(None)
+        for item in skipped:
+            heapq.heappush(self._queue, item)
+
+    async def acquire(self, host: str, priority: float) -> float:
+        """Waits for a crawl slot and returns the seconds spent queueing."""
+        started = time.monotonic()
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), host, fut))
+        self._dispatch()
+        if fut.done():
+            return 0.0
+
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Slot was granted just as we were cancelled; give it back
+                self.release(host, record=False)
+            raise
+
+        waited = time.monotonic() - started
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def release(self, host: str, record: bool = True):
+        self._active -= 1
+        self._active_per_host[host] -= 1
+        if self._active_per_host[host] <= 0:
+            del self._active_per_host[host]
+        if record:
+            self.completed += 1
+        self._dispatch()
+
+    def stats(self) -> Dict:
+        return {
+            "active": self._active,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "active_per_host": dict(self._active_per_host),
+            "completed": self.completed,
+            "avg_wait": round(self.total_wait / self.completed, 3) if self.completed else 0.0,
+            "max_wait": round(self.max_wait, 3),
+            "max_concurrency": self.max_concurrency,
+            "max_per_host": self.max_per_host,
+        }
+
+_CRAWL_SCHEDULER: Optional[CrawlScheduler] = None
+
+def get_crawl_scheduler() -> CrawlScheduler:
+    global _CRAWL_SCHEDULER
+    if _CRAWL_SCHEDULER is None:
+        _CRAWL_SCHEDULER = CrawlScheduler(CRAWL_MAX_CONCURRENCY, CRAWL_MAX_PER_HOST)
+    return _CRAWL_SCHEDULER
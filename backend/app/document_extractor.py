@@ -0,0 +1,192 @@
+import os
+import re
+import asyncio
+import zipfile
+import urllib.parse
+import multiprocessing
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+import aiofiles
+import aiofiles.os
+import aiofiles.tempfile
+from .content_extractor import MAX_CONTENT_CHARS
+
+MAX_DOCUMENT_BYTES = int(os.getenv("DOC_MAX_MB", "20")) * 1024 * 1024  # Larger downloads are abandoned
+MAX_SOURCE_PAGES = int(os.getenv("DOC_MAX_PAGES", "8"))  # Pages forwarded as the source's content
+MAX_SCAN_PAGES = 300  # Pages extracted before ranking; bounds worker CPU on huge documents
+DOC_WORKERS = int(os.getenv("DOC_WORKERS", "2"))
+TEXT_PAGE_CHARS = 4000  # Plain text and DOCX have no pages; split them into chunks of about this size
+
+# Content types handled here instead of in the HTML pipeline
+DOCUMENT_TYPES = {
+    "application/pdf": "pdf",
+    "application/x-pdf": "pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+    "text/plain": "text",
+    "text/markdown": "text",
+    "text/csv": "text",
+}
+_EXTENSIONS = {".pdf": "pdf", ".docx": "docx", ".txt": "text", ".md": "text", ".csv": "text"}
+
+_WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff]")
+
+_EXECUTOR: Optional[ProcessPoolExecutor] = None
+
+def document_kind(content_type: str, url: str = "") -> Optional[str]:
+    """Returns "pdf" / "docx" / "text" for document responses, or None for HTML and everything else."""
+    mime = content_type.split(";")[0].strip().lower()
+    if mime in DOCUMENT_TYPES:
+        return DOCUMENT_TYPES[mime]
+    if mime in ("", "application/octet-stream", "binary/octet-stream"):
+        # Servers often send downloads untyped; fall back to the extension
+        return _EXTENSIONS.get(os.path.splitext(urllib.parse.urlsplit(url).path.lower())[1])
+    return None
+
+def looks_like_document(url: str) -> bool:
+    return os.path.splitext(urllib.parse.urlsplit(url).path.lower())[1] in _EXTENSIONS
+
+def _chunk_text(text: str) -> List[str]:
+    pages, current, size = [], [], 0
+    for para in text.split("\n"):
+        current.append(para)
+        size += len(para) + 1
+        if size >= TEXT_PAGE_CHARS:
+            pages.append("\n".join(current).strip())
+            current, size = [], 0
+    if current:
+        pages.append("\n".join(current).strip())
+    return [p for p in pages if p]
+
+def _pdf_pages(path: str) -> List[str]:
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    pages = []
+    for page in reader.pages[:MAX_SCAN_PAGES]:
+        try:
+            pages.append((page.extract_text() or "").strip())
+        except Exception:
+            pages.append("")
+    return pages
+
+def _docx_pages(path: str) -> List[str]:
+    with zipfile.ZipFile(path) as archive:
+        root = ET.fromstring(archive.read("word/document.xml"))
+    paragraphs = []
+    for para in root.iter(f"{_WORD_NS}p"):
+        text = "".join(node.text or "" for node in para.iter(f"{_WORD_NS}t"))
+        if text.strip():
+            paragraphs.append(text)
+    return _chunk_text("\n".join(paragraphs))[:MAX_SCAN_PAGES]
+
+def _text_pages(path: str) -> List[str]:
+    with open(path, "rb") as f:
+        raw = f.read()
+    return _chunk_text(raw.decode("utf-8", errors="replace"))[:MAX_SCAN_PAGES]
+
+def extract_pages(path: str, kind: str) -> List[str]:
+    """Extracts per-page text from a downloaded document. Runs in a worker process."""
+    if kind == "pdf":
+        return _pdf_pages(path)
+    if kind == "docx":
+        return _docx_pages(path)
+    return _text_pages(path)
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        # spawn: the server process runs Playwright threads that must not be forked
+        _EXECUTOR = ProcessPoolExecutor(max_workers=max(1, DOC_WORKERS), mp_context=multiprocessing.get_context("spawn"))
+    return _EXECUTOR
+
+def shutdown_document_workers():
+    global _EXECUTOR
+    if _EXECUTOR is not None:
+        _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        _EXECUTOR = None
+
+def _query_terms(query: str) -> set:
+    terms = set()
+    for token in re.findall(r"\w+", query.lower()):
+        if _CJK.match(token):
+            # No spaces between CJK words; bigrams are a cheap stand-in
+            terms.update(token[i:i + 2] for i in range(max(1, len(token) - 1)))
+        elif len(token) > 1:
+            terms.add(token)
+    return terms
+
+def select_pages(pages: List[str], query: Optional[str] = None, max_pages: int = MAX_SOURCE_PAGES) -> List[int]:
+    """
+    Picks the page indexes to forward: the first max_pages, or with a query the best
+    matching pages (the first page always, it usually holds the title and abstract).
+    """
+    candidates = [i for i, text in enumerate(pages) if text]
+    if len(candidates) <= max_pages or not query:
+        return candidates[:max_pages]
+    terms = _query_terms(query)
+    if not terms:
+        return candidates[:max_pages]
+
+    def score(i: int) -> int:
+        text = pages[i].lower()
+        return sum(text.count(term) for term in terms)
+
+    ranked = sorted(candidates[1:], key=lambda i: (-score(i), i))
+    return sorted([candidates[0]] + ranked[:max_pages - 1])
+
+async def extract_document(response, kind: str) -> Tuple[Optional[List[str]], str]:
+    """
+    Streams a document response to a temp file (capped at MAX_DOCUMENT_BYTES), extracts it
+    page by page in a worker process and returns (page texts, "") or (None, reason).
+    The pages are cached whole; render_document picks the ones shown for each query.
+    """
+    async with aiofiles.tempfile.NamedTemporaryFile("wb", suffix=f".{kind}", delete=False) as f:
+        path = f.name
+    try:
+        size = 0
+        truncated = False
+        async with aiofiles.open(path, "wb") as f:
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > MAX_DOCUMENT_BYTES:
+                    truncated = True
+                    break
+                await f.write(chunk)
+
+        # A cut-off PDF/DOCX can't be parsed; a cut-off text file is still useful
+        if truncated and kind != "text":
+            return None, f"document larger than {MAX_DOCUMENT_BYTES // (1024 * 1024)} MB"
+        try:
+            loop = asyncio.get_running_loop()
+            pages = await loop.run_in_executor(_get_executor(), extract_pages, path, kind)
+        except ImportError:
+            return None, "pypdf is not installed"
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a hostile file); start a fresh pool next time
+            shutdown_document_workers()
+            return None, f"{kind} extraction worker crashed"
+        except Exception as e:
+            return None, f"{kind} extraction failed ({type(e).__name__})"
+    finally:
+        try:
+            await aiofiles.os.remove(path)
+        except OSError:
+            pass
+
+    if not any(pages):
+        return None, f"no text in {kind} (scanned or empty)"
+    return pages, ""
+
+def render_document(pages: List[str], kind: str, query: Optional[str] = None) -> str:
+    """Source text of a document: a header and the pages select_pages picks for the query."""
+    selected = select_pages(pages, query)
+    label = "Chunk" if kind != "pdf" else "Page"
+    header = f"[{kind.upper()} document, {len(pages)} {label.lower()}s"
+    if len(selected) < len([p for p in pages if p]):
+        header += f", showing {len(selected)} {'most relevant' if query else 'first'}"
+    header += "]\n\n"
+    # Same overall budget as an HTML page, shared evenly by the selected pages
+    budget = max(500, MAX_CONTENT_CHARS // len(selected))
+    return header + "\n\n".join(f"--- {label} {i + 1} ---\n{pages[i][:budget]}" for i in selected)
@@ -0,0 +1,69 @@
+import os
+from collections import Counter, defaultdict, deque
+from typing import Dict, List, Optional
+
+DEFAULT_HEDGE_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "6.0"))  # Seconds, until an engine has enough samples
+MIN_HEDGE_DELAY = 2.0
+MAX_HEDGE_DELAY = 15.0
+MIN_SAMPLES = 5
+
+class EngineLatencyStats:
+    """Rolling latency samples of successful searches per engine, used to time hedged requests."""
+    def __init__(self, window: int = 50):
+        self._samples: Dict[str, deque] = defaultdict(lambda: deque(maxlen=window))
+        self._failures = Counter()
+        self._hedges = Counter()
+        self._hedge_wins = Counter()
+
+    def record(self, engine: str, seconds: float, success: bool):
+        if success:
+            self._samples[engine].append(seconds)
+        else:
+            self._failures[engine] += 1
+
+    def record_hedge(self, engine: str, won: bool):
+        """Counts a secondary search fired on behalf of `engine`, and whether it beat the primary."""
+        self._hedges[engine] += 1
+        if won:
+            self._hedge_wins[engine] += 1
+
+    def percentile(self, engine: str, pct: float) -> Optional[float]:
+        samples = sorted(self._samples.get(engine, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def hedge_delay(self, engine: str) -> float:
+        """Hedge once the primary is slower than its usual p90."""
+        if len(self._samples.get(engine, ())) < MIN_SAMPLES:
+            return DEFAULT_HEDGE_DELAY
+        return min(MAX_HEDGE_DELAY, max(MIN_HEDGE_DELAY, self.percentile(engine, 90)))
+
+    def rank_engines(self, engines: List[str]) -> List[str]:
+        """Orders engines by median latency; engines without samples keep their relative order at the end."""
+        def key(item):
+            position, engine = item
+            median = self.percentile(engine, 50)
+            return (median is None, median or 0.0, position)
+        return [engine for _, engine in sorted(enumerate(engines), key=key)]
+
+    def stats(self) -> Dict[str, Dict]:
+        engines = set(self._samples) | set(self._failures) | set(self._hedges)
+        return {
+            engine: {
+                "samples": len(self._samples.get(engine, ())),
+                "p50": self.percentile(engine, 50),
+                "p90": self.percentile(engine, 90),
+                "failures": self._failures[engine],
+                "hedge_delay": self.hedge_delay(engine),
+                "hedges": self._hedges[engine],
+                "hedge_wins": self._hedge_wins[engine],
+            }
+            for engine in engines
+        }
+
+_ENGINE_STATS = EngineLatencyStats()
+
+def get_engine_stats() -> EngineLatencyStats:
+    return _ENGINE_STATS
@@ -0,0 +1,210 @@
+import os
+import re
+import asyncio
+import urllib.parse
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+
+GITHUB_API = "https://api.github.com"
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN", "")  # Optional; raises the rate limit from 60 to 5000 requests/hour
+PER_PAGE = 100
+MAX_PAGES = 30  # 3000 repos; beyond that the summary says it is partial
+PAGE_CONCURRENCY = 4
+ETAG_CACHE_SIZE = 512
+TOP_REPOS = 30  # Repos listed individually in the summary
+
+# First path segments on github.com that are not user/org profiles
+_RESERVED_PATHS = {
+    "login", "logout", "join", "search", "explore", "topics", "trending", "about", "pricing",
+    "features", "marketplace", "settings", "notifications", "orgs", "sponsors", "collections",
+    "events", "enterprise", "security", "site", "contact", "apps", "new", "codespaces", "issues", "pulls",
+}
+
+_LINK_LAST = re.compile(r'<([^>]+)>;\s*rel="last"')
+
+class GitHubError(Exception):
+    pass
+
+def parse_github_url(url: str) -> Optional[Tuple[str, str]]:
+    """
+    Recognizes URLs the fetcher can answer from the REST API.
+    Returns ("repos", owner) for profile / repository-list URLs, ("repo", "owner/name")
+    for api.github.com repo URLs, or None.
+    """
+    parts = urllib.parse.urlsplit(url)
+    host = (parts.hostname or "").lower()
+    segments = [s for s in parts.path.split("/") if s]
+
+    if host == "api.github.com":
+        if len(segments) == 3 and segments[0] in ("users", "orgs") and segments[2] == "repos":
+            return "repos", segments[1]
+        if len(segments) == 3 and segments[0] == "repos":
+            return "repo", f"{segments[1]}/{segments[2]}"
+        return None
+
+    if host in ("github.com", "www.github.com") and len(segments) == 1 and segments[0].lower() not in _RESERVED_PATHS:
+        # Profile pages and their ?tab=repositories view
+        tab = urllib.parse.parse_qs(parts.query).get("tab", [""])[0]
+        if tab in ("", "repositories"):
+            return "repos", segments[0]
+    return None
+
+class GitHubFetcher:
+    """
+    REST client for api.github.com on a pooled httpx client.
+    Responses are cached with their ETag and revalidated with If-None-Match
+    (with GITHUB_TOKEN set, 304s don't count against the rate limit); repo lists walk every page concurrently.
+    """
+    def __init__(self):
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+            "User-Agent": "JustSearch",
+        }
+        if GITHUB_TOKEN:
+            headers["Authorization"] = f"Bearer {GITHUB_TOKEN}"
+        self.client = httpx.AsyncClient(
+            base_url=GITHUB_API,
+            headers=headers,
+            timeout=httpx.Timeout(15.0, connect=5.0),
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+        )
+        self._etags: "OrderedDict[str, Dict]" = OrderedDict()  # request URL -> {"etag", "data", "link"}
+        self.requests = 0
+        self.not_modified = 0
+        self.rate_remaining: Optional[int] = None
+
+    async def get_json(self, path: str, params: Optional[Dict] = None) -> Tuple[Any, str]:
+        """GETs an API path, revalidating any cached copy. Returns (data, Link header)."""
+        request = self.client.build_request("GET", path, params=params)
+        key = str(request.url)
+        cached = self._etags.get(key)
+        if cached:
+            request.headers["If-None-Match"] = cached["etag"]
+
+        self.requests += 1
+        response = await self.client.send(request)
+        remaining = response.headers.get("x-ratelimit-remaining")
+        if remaining is not None:
+            self.rate_remaining = int(remaining)
+
+        if response.status_code == 304 and cached:
+            self.not_modified += 1
+            self._etags.move_to_end(key)
+            return cached["data"], cached["link"]
+        if response.status_code in (403, 429) and remaining == "0":
+            raise GitHubError("rate limit exceeded")
+        if response.status_code != 200:
+            raise GitHubError(f"HTTP {response.status_code} for {path}")
+
+        data = response.json()
+        link = response.headers.get("link", "")
+        etag = response.headers.get("etag")
+        if etag:
+            self._etags[key] = {"etag": etag, "data": data, "link": link}
+            self._etags.move_to_end(key)
+            while len(self._etags) > ETAG_CACHE_SIZE:
+                self._etags.popitem(last=False)
+        return data, link
+
+    async def get_repo(self, full_name: str) -> Dict:
+        data, _ = await self.get_json(f"/repos/{full_name}")
+        return data
+
+    async def list_repos(self, owner: str) -> Tuple[List[Dict], bool]:
+        """Returns (every public repo of a user or org, complete) using per_page=100 pagination."""
+        path = f"/users/{owner}/repos"
+        params = {"per_page": PER_PAGE, "type": "owner", "sort": "updated"}
+        first, link = await self.get_json(path, params)
+        last_page = 1
+        match = _LINK_LAST.search(link)
+        if match:
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(match.group(1)).query)
+            last_page = int(query.get("page", ["1"])[0])
+
+        pages = min(last_page, MAX_PAGES)
+        semaphore = asyncio.Semaphore(PAGE_CONCURRENCY)
+
+        async def fetch(page: int) -> List[Dict]:
+            async with semaphore:
+                data, _ = await self.get_json(path, {**params, "page": page})
+                return data
+
+        rest = await asyncio.gather(*[fetch(page) for page in range(2, pages + 1)])
+        repos = list(first)
+        for batch in rest:
+            repos.extend(batch)
+        return repos, last_page <= MAX_PAGES
+
+    async def summarize(self, target: Tuple[str, str]) -> str:
+        """Builds an LLM-friendly text summary for a URL recognized by parse_github_url."""
+        kind, name = target
+        if kind == "repo":
+            repo = await self.get_repo(name)
+            return (
+                f"--- GITHUB API: REPOSITORY {repo.get('full_name', name)} ---\n"
+                f"Description: {repo.get('description') or ''}\n"
+                f"Stars: {repo.get('stargazers_count', 0)}\n"
+                f"Forks: {repo.get('forks_count', 0)}\n"
+                f"Open issues: {repo.get('open_issues_count', 0)}\n"
+                f"Language: {repo.get('language') or 'n/a'}\n"
+                f"Created: {repo.get('created_at')}, last push: {repo.get('pushed_at')}\n"
+                f"Homepage: {repo.get('homepage') or 'n/a'}\n"
+            )
+
+        (profile, _), (repos, complete) = await asyncio.gather(
+            self.get_json(f"/users/{name}"),
+            self.list_repos(name)
+        )
+        total_stars = sum(r.get("stargazers_count", 0) for r in repos)
+        own = [r for r in repos if not r.get("fork")]
+        own_stars = sum(r.get("stargazers_count", 0) for r in own)
+        total_forks = sum(r.get("forks_count", 0) for r in repos)
+
+        summary = f"--- GITHUB API: {profile.get('type', 'User').upper()} {profile.get('login', name)} ---\n"
+        if profile.get("name"):
+            summary += f"Name: {profile['name']}\n"
+        if profile.get("bio"):
+            summary += f"Bio: {profile['bio']}\n"
+        summary += f"Followers: {profile.get('followers', 0)}, Following: {profile.get('following', 0)}\n"
+        summary += f"Public repositories: {profile.get('public_repos', len(repos))}\n"
+        summary += f"Repositories fetched: {len(repos)} ({len(own)} non-fork)\n"
+        summary += f"Total stars (all fetched repositories): {total_stars}\n"
+        summary += f"Total stars (excluding forks): {own_stars}\n"
+        summary += f"Total forks: {total_forks}\n"
+        if complete:
+            summary += "These totals are COMPLETE (all pages of the repository list were fetched).\n"
+        else:
+            summary += f"WARNING: only the first {MAX_PAGES * PER_PAGE} repositories were fetched; totals are partial.\n"
+
+        summary += "\nTop repositories by stars:\n"
+        for repo in sorted(repos, key=lambda r: r.get("stargazers_count", 0), reverse=True)[:TOP_REPOS]:
+            fork = " [fork]" if repo.get("fork") else ""
+            summary += f"- {repo.get('name')}{fork}: {repo.get('stargazers_count', 0)} stars, {repo.get('forks_count', 0)} forks, {repo.get('language') or 'n/a'} ({repo.get('description') or ''})\n"
+        return summary
+
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "cached_etags": len(self._etags),
+            "rate_remaining": self.rate_remaining,
+        }
+
+    async def close(self):
+        await self.client.aclose()
+
+_GITHUB_FETCHER: Optional[GitHubFetcher] = None
+
+def get_github_fetcher() -> GitHubFetcher:
+    global _GITHUB_FETCHER
+    if _GITHUB_FETCHER is None or _GITHUB_FETCHER.client.is_closed:
+        _GITHUB_FETCHER = GitHubFetcher()
+    return _GITHUB_FETCHER
+
+async def close_github_fetcher():
+    global _GITHUB_FETCHER
+    if _GITHUB_FETCHER is not None:
+        await _GITHUB_FETCHER.close()
+        _GITHUB_FETCHER = None
@@ -0,0 +1,167 @@
+import os
+import time
+import asyncio
+import urllib.parse
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import httpx
+from .content_extractor import extract_main_content
+from .document_extractor import document_kind, extract_document, render_document
+
+HTTP_FETCH_ENABLED = os.getenv("HTTP_FETCH_ENABLED", "true").lower() == "true"
+MIN_TEXT_LENGTH = int(os.getenv("HTTP_FETCH_MIN_TEXT", "800"))  # Shorter pages are treated as JS shells
+MAX_HTML_BYTES = 5 * 1024 * 1024
+DOMAIN_TIER_TTL = 6 * 3600  # Seconds before a domain's remembered tier is re-tested
+MAX_DOMAIN_TIERS = 5000  # Domains remembered; the least recently recorded are forgotten first
+
+# Fallback until init_global_browser shares the persistent browser UA
+_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36"
+_HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+
+# host -> {"tier": "http" | "browser", "updated": timestamp}, least recently recorded first
+_DOMAIN_TIERS: "OrderedDict[str, Dict]" = OrderedDict()
+
+# Statuses that mean "a real browser might get through"; other errors are the URL's problem, not the domain's
+_BROWSER_STATUSES = (401, 403, 429, 503)
+
+# Text that shows up on anti-bot interstitials and "please enable JavaScript" shells
+_BLOCK_MARKERS = [
+    "just a moment...",
+    "checking your browser",
+    "cf-browser-verification",
+    "enable javascript",
+    "javascript is required",
+    "javascript is disabled",
+    "请开启 javascript",
+    "请启用 javascript",
+    "access denied",
+    "are you a robot",
+    "unusual traffic",
+]
+
+def configure_http_client(user_agent: str):
+    """Makes plain HTTP fetches use the same UA as the browser profile."""
+    global _USER_AGENT
+    _USER_AGENT = user_agent
+    if _HTTP_CLIENT is not None and not _HTTP_CLIENT.is_closed:
+        _HTTP_CLIENT.headers["User-Agent"] = user_agent
+
+def get_http_client() -> httpx.AsyncClient:
+    """Returns the shared, connection-pooled client for page fetches."""
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None or _HTTP_CLIENT.is_closed:
+        _HTTP_CLIENT = httpx.AsyncClient(
+            headers={
+                "User-Agent": _USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+            },
+            follow_redirects=True,
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        )
+    return _HTTP_CLIENT
+
+async def close_http_client():
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is not None:
+        await _HTTP_CLIENT.aclose()
+        _HTTP_CLIENT = None
+
+def _domain_of(url: str) -> str:
+    return (urllib.parse.urlparse(url).hostname or "").lower()
+
+def preferred_tier(url: str) -> str:
+    """Returns the tier that worked for this domain last time ("http" if unknown or stale)."""
+    domain = _domain_of(url)
+    entry = _DOMAIN_TIERS.get(domain)
+    if entry is None:
+        return "http"
+    if time.time() - entry["updated"] >= DOMAIN_TIER_TTL:
+        del _DOMAIN_TIERS[domain]
+        return "http"
+    return entry["tier"]
+
+def record_tier(url: str, tier: str):
+    domain = _domain_of(url)
+    _DOMAIN_TIERS[domain] = {"tier": tier, "updated": time.time()}
+    _DOMAIN_TIERS.move_to_end(domain)
+    while len(_DOMAIN_TIERS) > MAX_DOMAIN_TIERS:
+        _DOMAIN_TIERS.popitem(last=False)
+
+def _escalation_reason(status: int, text: str) -> Optional[str]:
+    """Returns why this response needs a real browser, or None if it's usable."""
+    if status in _BROWSER_STATUSES:
+        return f"blocked (HTTP {status})"
+    if status >= 400:
+        return f"HTTP {status}"
+    if len(text) < MIN_TEXT_LENGTH:
+        return f"too short ({len(text)} chars, likely JS-rendered)"
+    head = text[:2000].lower()
+    for marker in _BLOCK_MARKERS:
+        if marker in head:
+            return f"looks blocked or JS-rendered ('{marker}')"
+    return None
+
+async def fetch_page_text(url: str, etag: Optional[str] = None, last_modified: Optional[str] = None, query: Optional[str] = None) -> Tuple[Optional[str], str, Dict]:
+    """
+    Fetches a page over plain HTTP and extracts its text server-side.
+    Pass the validators of a cached copy to make the request conditional.
+    PDF/DOCX/plain-text responses go to the document extractor; query picks the pages in the text.
+    Returns (text, "", meta) on success or (None, reason, meta) when the browser should take over;
+    meta carries the response's "etag"/"last_modified", "not_modified" on a 304, "document" (the kind)
+    and "pages" (every extracted page, for caching) for documents,
+    and "needs_browser" when an HTML page came back blocked or as a JS shell (the domain should be rendered).
+    """
+    client = get_http_client()
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    meta: Dict = {}
+    try:
+        async with client.stream("GET", url, headers=headers) as response:
+            meta["etag"] = response.headers.get("etag")
+            meta["last_modified"] = response.headers.get("last-modified")
+            if response.status_code == 304:
+                meta["not_modified"] = True
+                return None, "not modified", meta
+
+            content_type = response.headers.get("content-type", "").lower()
+            kind = document_kind(content_type, str(response.url))
+            if kind:
+                meta["document"] = kind
+                if response.status_code >= 400:
+                    return None, f"HTTP {response.status_code}", meta
+                pages, reason = await extract_document(response, kind)
+                if not pages:
+                    return None, reason, meta
+                meta["pages"] = pages
+                return render_document(pages, kind, query), "", meta
+            if "html" not in content_type:
+                return None, f"non-HTML content ({content_type or 'unknown'})", meta
+
+            chunks = []
+            size = 0
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > MAX_HTML_BYTES:
+                    break
+            body = b"".join(chunks)
+            html = body.decode(response.encoding or "utf-8", errors="replace")
+            status = response.status_code
+    except Exception as e:
+        return None, f"request failed ({type(e).__name__})", meta
+
+    # Parsing large documents is CPU-bound; keep it off the event loop
+    extraction = await asyncio.to_thread(extract_main_content, html)
+    text = extraction["text"]
+
+    reason = _escalation_reason(status, text)
+    if reason:
+        meta["needs_browser"] = status < 400 or status in _BROWSER_STATUSES
+        return None, reason, meta
+    return text, "", meta
@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import hashlib
+import aiofiles
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from .search_cache import is_time_sensitive, normalize_query
+from .url_normalizer import url_key
+
+# Disk tier lives next to the crawl cache in the backend directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+CACHE_DIR = os.path.join(PROJECT_ROOT, 'cache', 'llm')
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_DISK = os.getenv("LLM_CACHE_DISK", "false").lower() == "true"  # Keep entries across restarts
+DEFAULT_TTL = int(os.getenv("LLM_CACHE_TTL", str(6 * 3600)))
+TIME_SENSITIVE_TTL = int(os.getenv("LLM_CACHE_TTL_TIME_SENSITIVE", "900"))
+MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))  # In memory; the disk tier keeps up to 10x as many
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+def template_version(template: str) -> str:
+    """Editing a prompt template invalidates everything cached under it."""
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+
+def collapse_whitespace(text: str) -> str:
+    """Only layout is normalized: case, punctuation and symbols can change what the model extracts (URLs, "C#")."""
+    return " ".join((text or "").split())
+
+def history_digest(history: Optional[List[Dict[str, str]]]) -> str:
+    return _digest([[m.get("role", "user"), collapse_whitespace(m.get("content", ""))] for m in (history or [])])
+
+def snippet_set(snippets: List[Dict]) -> List[List[str]]:
+    """Relevance input as an order-free set of (title, url, snippet); result IDs are positional and can't be part of it."""
+    return sorted([normalize_query(s.get("title", "")), url_key(s.get("url", "")), normalize_query(s.get("snippet", ""))] for s in snippets)
+
+class LLMResponseCache:
+    """
+    Cache of parsed results of the small classification calls (task analysis, relevance).
+    Keys combine the call, model, prompt template version and normalized input.
+    An LRU in memory, optionally backed by one JSON file per entry on disk.
+    """
+    def __init__(self, max_entries: int, cache_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._disk_index: "OrderedDict[str, float]" = OrderedDict()  # key -> expires_at, oldest write first
+        self._disk_loaded = False
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(call: str, model: str, template: str, payload: Any) -> str:
+        return _digest([call, model, template_version(template), payload])
+
+    @staticmethod
+    def ttl_for(text: str) -> int:
+        return TIME_SENSITIVE_TTL if is_time_sensitive(text) else DEFAULT_TTL
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_disk_index(self):
+        if self._disk_loaded or not self.cache_dir:
+            return
+        self._disk_loaded = True
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json"):
+                try:
+                    entries.append((os.stat(os.path.join(self.cache_dir, name)).st_mtime, name[:-5]))
+                except OSError:
+                    continue
+        for mtime, key in sorted(entries):
+            # Real expiry is read from the file on a hit
+            self._disk_index[key] = mtime
+
+    async def get(self, key: str) -> Optional[Any]:
+        if not LLM_CACHE_ENABLED:
+            return None
+        entry = self._entries.get(key)
+        if entry is None and self.cache_dir:
+            entry = await self._read_disk(key)
+            if entry is not None:
+                self._remember(key, entry)
+                self.disk_hits += 1
+        if entry is None or time.time() > entry["expires_at"]:
+            if entry is not None:
+                self._entries.pop(key, None)
+                if self.cache_dir:
+                    self._forget_disk(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return json.loads(json.dumps(entry["value"]))
+
+    async def put(self, key: str, value: Any, ttl: int):
+        if not LLM_CACHE_ENABLED:
+            return
+        entry = {"value": value, "expires_at": time.time() + ttl}
+        self._remember(key, json.loads(json.dumps(entry)))
+        if self.cache_dir:
+            await self._write_disk(key, entry)
+
+    def _remember(self, key: str, entry: Dict):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _read_disk(self, key: str) -> Optional[Dict]:
+        self._load_disk_index()
+        if key not in self._disk_index:
+            return None
+        try:
+            async with aiofiles.open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.loads(await f.read())
+        except Exception:
+            self._forget_disk(key)
+            return None
+
+    async def _write_disk(self, key: str, entry: Dict):
+        self._load_disk_index()
+        try:
+            async with aiofiles.open(self._path(key), 'w', encoding='utf-8') as f:
+                await f.write(json.dumps(entry, ensure_ascii=False))
+        except Exception as e:
+            print(f"LLM cache write failed: {e}")
+            return
+        self._disk_index[key] = entry["expires_at"]
+        self._disk_index.move_to_end(key)
+        while len(self._disk_index) > self.max_entries * 10:
+            self._forget_disk(next(iter(self._disk_index)))
+
+    def _forget_disk(self, key: str):
+        self._disk_index.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "disk_entries": len(self._disk_index) if self.cache_dir else None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
+
+_LLM_CACHE: Optional[LLMResponseCache] = None
+
+def get_llm_cache() -> LLMResponseCache:
+    global _LLM_CACHE
+    if _LLM_CACHE is None:
+        _LLM_CACHE = LLMResponseCache(MAX_ENTRIES, CACHE_DIR if LLM_CACHE_DISK else None)
+    return _LLM_CACHE
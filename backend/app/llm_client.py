@@ -1,16 +1,120 @@
 import json
 import os
 import re
+import time
 import asyncio
 from datetime import datetime
-from typing import List, Dict, Optional, Callable, Any
-from openai import AsyncOpenAI
+from typing import List, Dict, Optional, Callable, Any, Tuple
+from openai import APIConnectionError, AuthenticationError, InternalServerError, RateLimitError
+from .llm_pool import get_openai_client
+from .api_key_pool import KeyLease, KeyState, get_key_pool, mask_key
+from .answer_parser import AnswerStreamParser
+from .context_packer import budget_for, pack_sources
+from .llm_cache import collapse_whitespace, get_llm_cache, history_digest, snippet_set
+from .search_cache import normalize_query
+from .url_normalizer import url_key
 from .prompts import TASK_ANALYSIS_PROMPT, RELEVANCE_ASSESSMENT_PROMPT, CLICK_DECISION_PROMPT, ANSWER_GENERATION_PROMPT
 
+class GenerationStats:
+    """
+    Tracks answer generations cut short once they reported "insufficient".
+    The time saved per abort is estimated from how long the answer part of
+    completed generations takes (EWMA), since the aborted tail never runs.
+    """
+    def __init__(self):
+        self.completed = 0
+        self.aborted = 0
+        self.answer_seconds: Optional[float] = None  # Moving average, header end -> stream end
+        self.seconds_saved = 0.0
+
+    def record_completed(self, answer_seconds: float):
+        self.completed += 1
+        if self.answer_seconds is None:
+            self.answer_seconds = answer_seconds
+        else:
+            self.answer_seconds = self.answer_seconds * 0.8 + answer_seconds * 0.2
+
+    def record_aborted(self) -> float:
+        """Counts an abort and returns its estimated saving in seconds."""
+        self.aborted += 1
+        saved = self.answer_seconds or 0.0
+        self.seconds_saved += saved
+        return saved
+
+    def stats(self) -> Dict:
+        return {
+            "completed": self.completed,
+            "aborted_insufficient": self.aborted,
+            "answer_seconds_avg": round(self.answer_seconds, 2) if self.answer_seconds is not None else None,
+            "seconds_saved": round(self.seconds_saved, 1),
+        }
+
+_GENERATION_STATS = GenerationStats()
+
+def get_generation_stats() -> GenerationStats:
+    return _GENERATION_STATS
+
+MAX_KEY_ATTEMPTS = 3  # Tries per LLM call, each on the healthiest key not yet tried (or the same key after its backoff)
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
 class LLMClient:
     def __init__(self, api_key: str, base_url: str = "https://api.openai.com/v1", model: str = "deepseek-ai/deepseek-v3.2"):
-        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+        # api_key may hold several comma-separated keys; every call leases the healthiest one
+        self.keys = get_key_pool(base_url, api_key)
+        self.base_url = base_url
         self.model = model
+        # Warms the shared client for the first key; a missing or invalid key only shows up as a 401 on the first call
+        get_openai_client(self.keys.states[0].key, base_url)
+
+    def _key_failed(self, state: KeyState, error: Exception) -> Optional[float]:
+        """
+        Updates the key's health after a failed call. Returns the seconds to wait before
+        retrying (0 when another key takes over), or None if the call shouldn't be retried.
+        """
+        if isinstance(error, RateLimitError):
+            return self.keys.back_off(state, _retry_after(error), throttled=True)
+        if isinstance(error, AuthenticationError):
+            self.keys.disable(state)
+            return 0.0 if self.keys.size > 1 else None
+        if isinstance(error, (InternalServerError, APIConnectionError)):
+            return self.keys.back_off(state, _retry_after(error))
+        # Bad requests, 403s (model or region access) etc. are not the key's fault
+        return None
+
+    async def _create(self, **kwargs) -> Tuple[Any, KeyLease]:
+        """
+        Starts a chat completion on the healthiest key, retrying throttled / failed calls on another key.
+        With no other usable key, the same key is retried after its Retry-After or backoff delay.
+        The caller releases the returned lease once the response (or stream) is consumed.
+        """
+        tried = set()
+        for attempt in range(MAX_KEY_ATTEMPTS):
+            lease = await self.keys.acquire(exclude=tried)
+            client = get_openai_client(lease.key, self.base_url)
+            try:
+                return await client.chat.completions.create(**kwargs), lease
+            except Exception as e:
+                lease.release(success=False)
+                delay = self._key_failed(lease.state, e)
+                if delay is None or attempt == MAX_KEY_ATTEMPTS - 1:
+                    raise
+                tried.add(lease.key)
+                if delay > 0:
+                    print(f"LLM call failed on key {mask_key(lease.key)} ({type(e).__name__}), no other key available, retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                else:
+                    print(f"LLM call failed on key {mask_key(lease.key)} ({type(e).__name__}), retrying with another key")
+
+    async def _chat(self, **kwargs) -> Any:
+        response, lease = await self._create(**kwargs)
+        lease.release()
+        return response
 
     def _extract_json(self, text: str) -> Optional[Dict]:
         """Helper to safely extract JSON from LLM response"""
@@ -54,9 +158,19 @@ class LLMClient:
                 messages.append({"role": role, "content": content})
         
         messages.append({"role": "user", "content": user_input})
+
+        cache = get_llm_cache()
+        # Exact input: the extracted URL and search query are copied from it verbatim
+        cache_key = cache.make_key("analyze_task", self.model, TASK_ANALYSIS_PROMPT, {
+            "input": collapse_whitespace(user_input),
+            "history": history_digest(messages[1:-1]),
+        })
+        cached = await cache.get(cache_key)
+        if cached:
+            return cached
         
         try:
-            response = await self.client.chat.completions.create(
+            response = await self._chat(
                 model=self.model,
                 messages=messages
             )
@@ -64,6 +178,7 @@ class LLMClient:
             
             data = self._extract_json(content)
             if data:
+                await cache.put(cache_key, data, cache.ttl_for(user_input))
                 return data
             
             # Fallback
@@ -87,8 +202,19 @@ class LLMClient:
             date_info = f"Date: {item.get('date', 'N/A')}\n" if item.get('date') else ""
             user_message += f"ID [{item['id']}]: Title: {item['title']}\n{date_info}Snippet: {item['snippet']}\n\n"
 
+        # Cached as URLs: the same results can come back in another order with other IDs
+        cache = get_llm_cache()
+        cache_key = cache.make_key("assess_relevance", self.model, RELEVANCE_ASSESSMENT_PROMPT, {
+            "query": normalize_query(query),
+            "snippets": snippet_set(snippets),
+        })
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            id_of = {url_key(item.get('url', '')): item['id'] for item in snippets}
+            return [id_of[key] for key in cached if key in id_of]
+
         try:
-            response = await self.client.chat.completions.create(
+            response = await self._chat(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -99,7 +225,12 @@ class LLMClient:
             
             data = self._extract_json(content)
             if data:
-                return data.get("relevant_ids", [])
+                relevant_ids = data.get("relevant_ids", [])
+                url_of = {item['id']: url_key(item.get('url', '')) for item in snippets}
+                urls = [url_of[rid] for rid in relevant_ids if rid in url_of]
+                if len(urls) == len(relevant_ids):
+                    await cache.put(cache_key, urls, cache.ttl_for(query))
+                return relevant_ids
             
             return [s['id'] for s in snippets[:3]]
         except Exception as e:
@@ -125,7 +256,7 @@ class LLMClient:
             user_message += f"ID [{el['id']}]: [{el['tag']}] {el['text'][:100]}\n"
             
         try:
-            response = await self.client.chat.completions.create(
+            response = await self._chat(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -142,11 +273,13 @@ class LLMClient:
             print(f"Error in decide_click_elements: {e}")
             return []
 
-    async def generate_answer(self, query: str, sources: List[Dict], history: Optional[List[Dict[str, str]]] = None, stream_callback: Optional[Callable[[str], None]] = None) -> Dict[str, any]:
+    async def generate_answer(self, query: str, sources: List[Dict], history: Optional[List[Dict[str, str]]] = None, stream_callback: Optional[Callable[[str], None]] = None, abort_if_insufficient: bool = False) -> Dict[str, any]:
         """
         [09] AI Model: Generation & Evaluation
         Input: Query and full content of selected sources.
-        Returns: {"status": "sufficient"|"insufficient", "answer": "..."}
+        Returns: {"status": "sufficient"|"insufficient", "answer": "...", "missing_info": "..."|None, "aborted": bool, "seconds_saved": float}
+        With abort_if_insufficient, an insufficient generation is cancelled as soon as its header
+        (Status, Missing_Info) is parsed; its answer text would be discarded anyway.
         """
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
@@ -163,76 +296,60 @@ class LLMClient:
                 content = msg.get("content", "")
                 messages.append({"role": role, "content": content})
         
+        # Fit the sources into the model's context budget, keeping the passages that match the question
+        packed, packing = pack_sources(query, sources, budget_for(self.model))
+        if packing["passages"] is not None:
+            print(f"Context packing: kept {packing['selected']}/{packing['passages']} passages (~{packing['tokens']} tokens)")
+
         user_message = f"Question: {query}\n\nSources:\n"
-        for src in sources:
-            # Add strict length limit per source context to avoid token overflow
-            content_preview = src['content'][:5000] 
+        for src in packed:
             date_info = f" (Date: {src.get('date')})" if src.get('date') else ""
-            user_message += f"Source [{src['id']}] (Title: {src['title']}{date_info}):\n{content_preview}\n\n"
+            user_message += f"Source [{src['id']}] (Title: {src['title']}{date_info}):\n{src['content']}\n\n"
 
         messages.append({"role": "user", "content": user_message})
 
         try:
-            response = await self.client.chat.completions.create(
+            response, lease = await self._create(
                 model=self.model,
                 messages=messages,
                 stream=True
             )
             
-            full_content = ""
-            status = "sufficient" # Default assumption
-            parsing_header = True
-            header_buffer = ""
-            answer_started = False
-            
-            async for chunk in response:
-                if chunk.choices and chunk.choices[0].delta.content:
-                    content = chunk.choices[0].delta.content
-                    full_content += content
-                    
-                    if parsing_header:
-                        header_buffer += content
-                        # Check for Status
-                        if "Status:" in header_buffer and "\n" in header_buffer.split("Status:")[1]:
-                             status_line = [line for line in header_buffer.split("\n") if "Status:" in line][0]
-                             if "insufficient" in status_line.lower():
-                                 status = "insufficient"
-                        
-                        # Check for Answer start
-                        if "Answer:" in header_buffer:
-                            parts = header_buffer.split("Answer:", 1)
-                            pre_answer = parts[0]
-                            # If we have content after Answer:, that's the start of the answer
-                            if len(parts) > 1:
-                                answer_chunk = parts[1]
-                                parsing_header = False
-                                answer_started = True
-                                if status == "sufficient" and stream_callback and answer_chunk:
-                                    stream_callback(answer_chunk)
-                        
-                        # Safety valve: if buffer gets too long without Answer:, maybe model didn't follow format
-                        if len(header_buffer) > 500 and not answer_started:
-                            parsing_header = False
-                            # Assume whole thing is answer if status check passed or failed
-                            if stream_callback:
-                                stream_callback(header_buffer)
-
-                    else:
-                        # Streaming answer
-                        if status == "sufficient" and stream_callback:
-                            stream_callback(content)
-
-            # Post-processing to extract clean answer from full_content
-            final_answer = full_content
-            if "Answer:" in full_content:
-                final_answer = full_content.split("Answer:", 1)[1].strip()
-            elif "Status:" in full_content:
-                 # Fallback if Answer: tag missing but Status present
-                 lines = full_content.split("\n")
-                 # Filter out metadata lines
-                 final_answer = "\n".join([l for l in lines if not l.startswith("Status:") and not l.startswith("Missing_Info:")])
-            
-            return {"status": status, "answer": final_answer.strip()}
+            parser = AnswerStreamParser()
+            stats = get_generation_stats()
+            answer_started_at = None
+            aborted = False
+            seconds_saved = 0.0
+            streamed = False
+            try:
+                async for chunk in response:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        for event, value in parser.feed(chunk.choices[0].delta.content):
+                            # Only a sufficient answer is shown while it streams
+                            if event == "answer" and parser.status == "sufficient" and stream_callback:
+                                stream_callback(value)
+                        if parser.in_answer and answer_started_at is None:
+                            answer_started_at = time.monotonic()
+                        if abort_if_insufficient and parser.in_answer and parser.status == "insufficient":
+                            # Stop paying for output tokens nobody will read
+                            await response.close()
+                            aborted = True
+                            seconds_saved = stats.record_aborted()
+                            break
+                streamed = True
+            finally:
+                # The key stays leased for the whole stream
+                lease.release(success=streamed)
+
+            if not aborted and answer_started_at is not None:
+                stats.record_completed(time.monotonic() - answer_started_at)
+            return {
+                "status": parser.status,
+                "answer": parser.answer(),
+                "missing_info": parser.missing_info,
+                "aborted": aborted,
+                "seconds_saved": seconds_saved,
+            }
 
         except Exception as e:
             print(f"Error in generate_answer: {e}")
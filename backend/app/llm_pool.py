@@ -0,0 +1,109 @@
+import os
+import importlib.util
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import httpx
+from openai import AsyncOpenAI
+
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "120"))  # Seconds an idle connection is kept
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "600"))  # Same overall timeout the OpenAI SDK uses by default
+MAX_CLIENTS = 32  # (base_url, api_key) pairs kept; they all share one transport, so this only bounds bookkeeping
+
+# HTTP/2 needs the optional h2 package (httpx[http2]); without it connections are plain keep-alive HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+class _TracingTransport(httpx.AsyncHTTPTransport):
+    """Transport that counts requests against newly opened connections, so reuse is observable."""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.requests = 0
+        self.connections_opened = 0
+        self.http_versions: Dict[str, int] = {}
+
+    async def _trace(self, event: str, info: Dict):
+        if event == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        request.extensions = {**request.extensions, "trace": self._trace}
+        response = await super().handle_async_request(request)
+        version = response.extensions.get("http_version", b"").decode("ascii", "replace") or "unknown"
+        self.http_versions[version] = self.http_versions.get(version, 0) + 1
+        return response
+
+class LLMClientRegistry:
+    """
+    Process-wide AsyncOpenAI clients keyed by (base_url, api_key).
+    Every client sits on one tuned httpx pool, so keep-alive connections (HTTP/2 when
+    available) are reused across requests, workflows and API keys for the same host.
+    """
+    def __init__(self):
+        self.transport: Optional[_TracingTransport] = None
+        self.http_client: Optional[httpx.AsyncClient] = None
+        self._clients: "OrderedDict[Tuple[str, str], AsyncOpenAI]" = OrderedDict()
+        self.clients_created = 0
+
+    def _http(self) -> httpx.AsyncClient:
+        if self.http_client is None or self.http_client.is_closed:
+            limits = httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+            )
+            self.transport = _TracingTransport(http2=HTTP2_AVAILABLE, limits=limits)
+            self.http_client = httpx.AsyncClient(
+                transport=self.transport,
+                timeout=httpx.Timeout(LLM_TIMEOUT, connect=10.0),
+                follow_redirects=True,
+            )
+            # Clients bound to a closed pool are useless
+            self._clients.clear()
+        return self.http_client
+
+    def get(self, api_key: str, base_url: str) -> AsyncOpenAI:
+        http_client = self._http()
+        key = (base_url, api_key)
+        client = self._clients.get(key)
+        if client is None:
+            # LLMClient retries instead: on another key, or on the same one after its Retry-After (see api_key_pool)
+            client = self._clients[key] = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+            self.clients_created += 1
+            while len(self._clients) > MAX_CLIENTS:
+                # Dropping the wrapper is enough; closing it would close the shared pool
+                self._clients.popitem(last=False)
+        self._clients.move_to_end(key)
+        return client
+
+    async def close(self):
+        self._clients.clear()
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+
+    def stats(self) -> Dict:
+        transport = self.transport
+        requests = transport.requests if transport else 0
+        opened = transport.connections_opened if transport else 0
+        return {
+            "http2": HTTP2_AVAILABLE,
+            "clients": len(self._clients),
+            "clients_created": self.clients_created,
+            "requests": requests,
+            "connections_opened": opened,
+            "reuse_ratio": round(1 - opened / requests, 3) if requests else None,
+            "http_versions": dict(transport.http_versions) if transport else {},
+        }
+
+_LLM_CLIENTS = LLMClientRegistry()
+
+def get_openai_client(api_key: str, base_url: str) -> AsyncOpenAI:
+    return _LLM_CLIENTS.get(api_key, base_url)
+
+def get_llm_pool_stats() -> Dict:
+    return _LLM_CLIENTS.stats()
+
+async def close_llm_clients():
+    await _LLM_CLIENTS.close()
@@ -1,7 +1,6 @@
 import os
 import json
 import asyncio
-import httpx
 from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import List, Optional, Dict, Any
@@ -13,9 +12,24 @@ from pydantic import BaseModel
 
 from .workflow import SearchWorkflow
 from .chat_manager import list_chats, load_chat_history, save_chat_history, delete_chat, get_chat_path, delete_all_chats
-from .settings_manager import load_settings, save_settings, DEFAULT_SETTINGS, get_next_api_key
-from .browser_manager import init_global_browser, shutdown_global_browser, get_interaction_session, mark_interaction_completed
-import base64
+from .settings_manager import load_settings, save_settings, DEFAULT_SETTINGS
+from .browser_manager import init_global_browser, shutdown_global_browser, get_interaction_session, mark_interaction_completed, get_browser_health
+from .http_fetcher import close_http_client
+from .github_fetcher import GitHubError, close_github_fetcher, get_github_fetcher
+from .click_policy import get_click_policy
+from .llm_pool import close_llm_clients, get_llm_pool_stats
+from .llm_cache import get_llm_cache
+from .result_ranker import get_local_ranker
+from .llm_client import get_generation_stats
+from .api_key_pool import get_key_pool_stats
+from .document_extractor import shutdown_document_workers
+from .crawl_scheduler import get_crawl_scheduler
+from .crawl_cache import get_crawl_cache
+from .search_cache import get_search_cache
+from .rate_limiter import get_limiter_stats
+from .engine_stats import get_engine_stats
+from .search_adapters import get_adapter_stats
+from .screencast import BrowserScreencast, InputQueue
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -31,6 +45,10 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     await shutdown_global_browser()
+    await close_http_client()
+    await close_github_fetcher()
+    await close_llm_clients()
+    shutdown_document_workers()
 
 app = FastAPI(title="JustSearch", lifespan=lifespan)
 
@@ -61,6 +79,7 @@ class ChatRequest(BaseModel):
     max_results: Optional[int] = 8
     max_iterations: Optional[int] = 5
     interactive_search: Optional[bool] = True
+    hedged_search: Optional[bool] = None
 
 class SettingsModel(BaseModel):
     theme: Optional[str] = "light"
@@ -71,6 +90,7 @@ class SettingsModel(BaseModel):
     max_results: Optional[int] = 8
     max_iterations: Optional[int] = 5
     interactive_search: Optional[bool] = True
+    hedged_search: Optional[bool] = False
 
 # Endpoints
 
@@ -88,19 +108,51 @@ async def get_github_stats():
         return {"stars": github_stats_cache["stars"]}
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get("https://api.github.com/repos/yeahhe365/JustSearch")
-            if response.status_code == 200:
-                data = response.json()
-                stars = data.get("stargazers_count", 0)
-                github_stats_cache["stars"] = stars
-                github_stats_cache["last_updated"] = now
-                return {"stars": stars}
-            else:
-                return {"stars": github_stats_cache["stars"], "error": "Failed to fetch from GitHub"}
+        # Shared GitHub client; revalidates with the cached ETag (304s are only free of quota with GITHUB_TOKEN set)
+        data = await get_github_fetcher().get_repo("yeahhe365/JustSearch")
+        stars = data.get("stargazers_count", 0)
+        github_stats_cache["stars"] = stars
+        github_stats_cache["last_updated"] = now
+        return {"stars": stars}
+    except GitHubError as e:
+        return {"stars": github_stats_cache["stars"], "error": f"Failed to fetch from GitHub: {e}"}
     except Exception as e:
         return {"stars": github_stats_cache["stars"], "error": str(e)}
 
+@app.get("/api/stats/crawl")
+async def get_crawl_stats():
+    """Search and crawl pipeline counters."""
+    return {
+        "scheduler": get_crawl_scheduler().stats(),
+        "crawl_cache": get_crawl_cache().stats(),
+        "search_cache": get_search_cache().stats(),
+        "rate_limits": get_limiter_stats(),
+        "engines": get_engine_stats().stats(),
+        "static_search": get_adapter_stats(),
+        "browser": get_browser_health(),
+        "github": get_github_fetcher().stats(),
+        "click_policy": get_click_policy().stats()
+    }
+
+@app.get("/api/stats/llm")
+async def get_llm_stats():
+    """LLM transport, cache, key and generation counters."""
+    return {
+        "pool": get_llm_pool_stats(),
+        "cache": get_llm_cache().stats(),
+        "relevance": get_local_ranker().stats(),
+        "generation": get_generation_stats().stats(),
+        "api_keys": get_key_pool_stats()
+    }
+
+@app.get("/api/stats")
+async def get_stats():
+    """All runtime counters, grouped by area."""
+    return {
+        "crawl": await get_crawl_stats(),
+        "llm": await get_llm_stats()
+    }
+
 @app.get("/api/history")
 async def get_history_endpoint():
     return await list_chats()
@@ -157,30 +209,8 @@ async def browser_control_endpoint(websocket: WebSocket, session_id: str):
         return
 
     page = session["page"]
-    
-    async def send_frames():
-        try:
-            while True:
-                if websocket.client_state.name != "CONNECTED":
-                    break
-                    
-                try:
-                    # Capture screenshot
-                    # quality=50 is a good balance for speed
-                    screenshot = await page.screenshot(type="jpeg", quality=50)
-                    b64_img = base64.b64encode(screenshot).decode("utf-8")
-                    await websocket.send_json({
-                        "type": "frame",
-                        "image": b64_img
-                    })
-                except Exception as e:
-                    print(f"Frame error: {e}")
-                    # If page is closed, we should stop
-                    break
-                    
-                await asyncio.sleep(0.5) 
-        except Exception:
-            pass
+    screencast = BrowserScreencast(page, websocket)
+    inputs = InputQueue()
 
     async def receive_events():
         try:
@@ -188,51 +218,41 @@ async def browser_control_endpoint(websocket: WebSocket, session_id: str):
                 data = await websocket.receive_json()
                 action = data.get("action")
                 
-                if action == "click":
-                    x = data.get("x")
-                    y = data.get("y")
-                    if x is not None and y is not None:
-                        try:
-                            await page.mouse.click(x, y)
-                        except:
-                            pass
-                
-                elif action == "scroll":
-                    delta_y = data.get("dy", 0)
-                    try:
-                        await page.mouse.wheel(0, delta_y)
-                    except:
-                        pass
-                    
-                elif action == "type":
-                    text = data.get("text")
-                    if text:
-                        try:
-                            await page.keyboard.type(text)
-                        except:
-                            pass
-                
-                elif action == "key":
-                    key = data.get("key")
-                    if key:
-                        try:
-                            await page.keyboard.press(key)
-                        except:
-                            pass
+                if action == "ack":
+                    # Client finished displaying the last frame
+                    screencast.client_acked()
 
                 elif action == "complete":
                     # User signaled completion
                     await mark_interaction_completed(session_id)
                     await websocket.send_json({"type": "status", "msg": "Completed"})
                     break
+
+                else:
+                    inputs.push(data)
                     
         except Exception as e:
             print(f"Input error: {e}")
 
-    # Run both
+    async def apply_inputs():
+        while True:
+            event = await inputs.get()
+            try:
+                await screencast.apply_input(event)
+            except Exception:
+                pass
+
+    async def send_frames():
+        try:
+            await screencast.run()
+        except Exception as e:
+            print(f"Frame error: {e}")
+
+    # Run all three
     tasks = [
         asyncio.create_task(send_frames()),
-        asyncio.create_task(receive_events())
+        asyncio.create_task(receive_events()),
+        asyncio.create_task(apply_inputs())
     ]
     
     try:
@@ -244,6 +264,8 @@ async def browser_control_endpoint(websocket: WebSocket, session_id: str):
     except Exception:
         pass
     finally:
+        await screencast.stop()
+        print(f"Browser control session {session_id} ended: {screencast.stats()}, {inputs.coalesced} input events coalesced")
         try:
             await websocket.close()
         except:
@@ -252,11 +274,8 @@ async def browser_control_endpoint(websocket: WebSocket, session_id: str):
 @app.post("/api/chat")
 async def chat_endpoint(request: ChatRequest):
     defaults = await load_settings()
+    # May hold several comma-separated keys; the LLM client balances calls across them
     api_key = request.api_key or defaults.get("api_key")
-    
-    # Apply round-robin selection if multiple keys are provided
-    if api_key:
-        api_key = get_next_api_key(api_key)
         
     base_url = request.base_url or defaults.get("base_url")
     
@@ -272,6 +291,7 @@ async def chat_endpoint(request: ChatRequest):
     max_results = request.max_results or defaults.get("max_results", 8)
     max_iterations = request.max_iterations or defaults.get("max_iterations", 5)
     interactive_search = request.interactive_search if request.interactive_search is not None else defaults.get("interactive_search", True)
+    hedged_search = request.hedged_search if request.hedged_search is not None else defaults.get("hedged_search", False)
     
     if not api_key:
         # Fallback to env var if available, or error
@@ -290,7 +310,7 @@ async def chat_endpoint(request: ChatRequest):
     # Note: SearchWorkflow might fail if api_key is missing. 
     # We should catch this.
     try:
-        workflow = SearchWorkflow(api_key, base_url, model, search_engine, max_results, max_iterations, interactive_search, session_id=session_id)
+        workflow = SearchWorkflow(api_key, base_url, model, search_engine, max_results, max_iterations, interactive_search, session_id=session_id, hedged_search=hedged_search)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     
@@ -0,0 +1,92 @@
+import asyncio
+import random
+import time
+from typing import Dict, Optional
+
+# Used when an engine has no "rate_limit" entry in search_selectors.json
+DEFAULT_RATE_LIMIT = {
+    "rate": 0.25,   # Searches per second once the burst is spent
+    "burst": 1,     # Searches allowed back-to-back after an idle period
+    "jitter": 1.0   # Max random extra seconds added to each wait
+}
+
+class TokenBucket:
+    """
+    Token bucket rate limiter for a single search engine.
+    Waiters are served in FIFO order. The refill rate is halved on every CAPTCHA hit
+    and recovers gradually after clean searches.
+    """
+    def __init__(self, rate: float, burst: int = 1, jitter: float = 0.0, min_rate: Optional[float] = None):
+        self.base_rate = max(rate, 0.001)
+        self.rate = self.base_rate
+        self.min_rate = min_rate if min_rate is not None else self.base_rate / 8
+        self.burst = max(1, int(burst))
+        self.jitter = max(0.0, jitter)
+        self.tokens = float(self.burst)
+        self.captcha_hits = 0
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """Waits for a token and returns the seconds spent queueing."""
+        started = time.monotonic()
+        # The lock makes waiters queue in arrival order
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    break
+                wait_time = (1 - self.tokens) / self.rate
+                if self.jitter:
+                    wait_time += random.uniform(0, self.jitter)
+                await asyncio.sleep(wait_time)
+        return time.monotonic() - started
+
+    def record_captcha(self):
+        """Backs off: halves the rate and empties the bucket."""
+        self._refill()
+        self.captcha_hits += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0.0
+
+    def record_success(self):
+        """Recovers a tenth of the configured rate per clean search."""
+        self._refill()
+        self.rate = min(self.base_rate, self.rate + self.base_rate / 10)
+
+    def stats(self) -> Dict:
+        return {
+            "rate": round(self.rate, 4),
+            "base_rate": self.base_rate,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 2),
+            "captcha_hits": self.captcha_hits
+        }
+
+# engine name -> limiter, shared by all sessions in the process
+_ENGINE_LIMITERS: Dict[str, TokenBucket] = {}
+
+def get_engine_limiter(engine: str, engine_config: Optional[Dict] = None) -> TokenBucket:
+    """Returns the process-wide limiter for an engine, creating it from its config on first use."""
+    limiter = _ENGINE_LIMITERS.get(engine)
+    if limiter is None:
+        settings = DEFAULT_RATE_LIMIT.copy()
+        if engine_config:
+            settings.update(engine_config.get("rate_limit", {}))
+        limiter = TokenBucket(
+            rate=float(settings["rate"]),
+            burst=int(settings["burst"]),
+            jitter=float(settings.get("jitter", 0.0)),
+            min_rate=settings.get("min_rate")
+        )
+        _ENGINE_LIMITERS[engine] = limiter
+    return limiter
+
+def get_limiter_stats() -> Dict[str, Dict]:
+    return {engine: limiter.stats() for engine, limiter in _ENGINE_LIMITERS.items()}
@@ -0,0 +1,117 @@
+import os
+import json
+import urllib.parse
+from collections import Counter
+from typing import Dict, Optional
+
+# Rough average transfer size per resource type, used to estimate bytes saved.
+# Blocked requests never reach the network, so their real size is unknown.
+_ESTIMATED_BYTES = {
+    "image": 45_000,
+    "media": 500_000,
+    "font": 35_000,
+    "stylesheet": 25_000,
+    "script": 30_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+    "other": 5_000,
+}
+
+_FALLBACK_CONFIG = {
+    "default_profile": "full",
+    "profiles": {"full": {"block_types": [], "block_hosts": False}},
+    "blocked_hosts": [],
+    "domains": {}
+}
+
+_CONFIG: Optional[Dict] = None
+
+def load_resource_profiles() -> Dict:
+    """Loads resource_profiles.json once per process."""
+    global _CONFIG
+    if _CONFIG is None:
+        try:
+            config_path = os.path.join(os.path.dirname(__file__), 'resource_profiles.json')
+            with open(config_path, 'r', encoding='utf-8') as f:
+                _CONFIG = json.load(f)
+        except Exception as e:
+            print(f"Error loading resource profiles: {e}")
+            _CONFIG = _FALLBACK_CONFIG
+    return _CONFIG
+
+def _host_matches(host: str, pattern: str) -> bool:
+    return host == pattern or host.endswith("." + pattern)
+
+def select_resource_profile(url: str, engine_config: Optional[Dict] = None) -> str:
+    """
+    Picks the blocking profile for a crawl.
+    Precedence: CRAWL_RESOURCE_PROFILE env var > per-domain rule > engine's "resource_profile" > default.
+    """
+    config = load_resource_profiles()
+    profiles = config.get("profiles", {})
+
+    forced = os.getenv("CRAWL_RESOURCE_PROFILE")
+    if forced in profiles:
+        return forced
+
+    host = (urllib.parse.urlparse(url).hostname or "").lower()
+    for domain, profile in config.get("domains", {}).items():
+        if _host_matches(host, domain) and profile in profiles:
+            return profile
+
+    if engine_config and engine_config.get("resource_profile") in profiles:
+        return engine_config["resource_profile"]
+
+    default = config.get("default_profile", "full")
+    return default if default in profiles else "full"
+
+class ResourceBlocker:
+    """Request interceptor that aborts resources the active profile doesn't need."""
+    def __init__(self, profile_name: str):
+        config = load_resource_profiles()
+        profile = config.get("profiles", {}).get(profile_name, {})
+        self.profile_name = profile_name
+        self.block_types = set(profile.get("block_types", []))
+        self.blocked_hosts = config.get("blocked_hosts", []) if profile.get("block_hosts") else []
+        self.blocked = Counter()
+        self.estimated_bytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.block_types or self.blocked_hosts)
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        # Never block the document itself, or the crawl has nothing to read
+        if resource_type == "document":
+            return False
+        if resource_type in self.block_types:
+            return True
+        if self.blocked_hosts:
+            host = (urllib.parse.urlparse(url).hostname or "").lower()
+            return any(_host_matches(host, pattern) for pattern in self.blocked_hosts)
+        return False
+
+    async def _handle(self, route):
+        request = route.request
+        try:
+            if self.should_block(request.resource_type, request.url):
+                self.blocked[request.resource_type] += 1
+                self.estimated_bytes += _ESTIMATED_BYTES.get(request.resource_type, 5_000)
+                await route.abort()
+            else:
+                await route.continue_()
+        except Exception:
+            # Route already handled or page closed
+            pass
+
+    async def attach(self, page):
+        """Installs the interceptor on a page. Pooled tabs drop it again via unroute_all on release."""
+        if self.enabled:
+            await page.route("**/*", self._handle)
+
+    def summary(self) -> str:
+        total = sum(self.blocked.values())
+        if not total:
+            return f"资源拦截 ({self.profile_name}): 未拦截任何请求"
+        by_type = ", ".join(f"{t} {n}" for t, n in self.blocked.most_common())
+        return f"资源拦截 ({self.profile_name}): 拦截 {total} 个请求 ({by_type})，约节省 {self.estimated_bytes / 1024:.0f} KB"
@@ -0,0 +1,158 @@
+import os
+import re
+import math
+import urllib.parse
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .context_packer import bm25_scores, tokenize
+from .search_cache import is_time_sensitive
+
+LOCAL_RANKING_ENABLED = os.getenv("LOCAL_RANKING_ENABLED", "true").lower() == "true"
+MIN_PICK = 2  # IDs selected locally, same range the relevance prompt asks the LLM for
+MAX_PICK = 4
+MIN_MARGIN = 0.15  # Score drop after the last pick, as a fraction of the top score, to trust the ranking
+MIN_COVERAGE = 0.6  # Share of query terms every pick must mention
+
+# Weights of the combined score; BM25 is normalized to [0, 1] per batch first
+W_BM25 = 0.45
+W_COVERAGE = 0.3
+W_FRESHNESS = 0.1
+W_DOMAIN = 0.1
+W_RANK = 0.05
+
+# Prior quality of a domain (and its subdomains) as a source, in [-1, 1]
+DOMAIN_PRIORS = {
+    "wikipedia.org": 1.0,
+    "github.com": 0.8,
+    "stackoverflow.com": 0.8,
+    "arxiv.org": 0.8,
+    "docs.python.org": 0.8,
+    "developer.mozilla.org": 0.8,
+    "gov.cn": 0.6,
+    "gov": 0.6,
+    "edu": 0.5,
+    "zhihu.com": 0.3,
+    "reddit.com": 0.2,
+    "pinterest.com": -0.8,
+    "facebook.com": -0.5,
+    "instagram.com": -0.5,
+}
+
+_MONTHS = {m: i + 1 for i, m in enumerate(["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"])}
+
+def parse_result_date(text: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Parses the date formats the scrapers extract ("Mar 5, 2024", "5 Mar 2024", "2024年3月5日", "3 days ago", ISO)."""
+    now = now or datetime.now()
+    text = (text or "").strip()
+    if not text:
+        return None
+    match = re.match(r"(\d{1,2}) (hour|day)s? ago", text, re.I)
+    if match:
+        amount = int(match.group(1))
+        return now - (timedelta(hours=amount) if match.group(2).lower() == "hour" else timedelta(days=amount))
+    match = re.match(r"(\d{4})年(\d{1,2})月(\d{1,2})日", text) or re.match(r"(\d{4})-(\d{2})-(\d{2})", text)
+    if match:
+        year, month, day = (int(g) for g in match.groups())
+    else:
+        match = re.match(r"([a-z]{3})[a-z]* (\d{1,2}), (\d{4})", text, re.I)
+        if match:
+            month, day, year = _MONTHS.get(match.group(1).lower()), int(match.group(2)), int(match.group(3))
+        else:
+            match = re.match(r"(\d{1,2}) ([a-z]{3})[a-z]* (\d{4})", text, re.I)
+            if not match:
+                return None
+            day, month, year = int(match.group(1)), _MONTHS.get(match.group(2).lower()), int(match.group(3))
+    try:
+        return datetime(year, month, day)
+    except (TypeError, ValueError):
+        return None
+
+def domain_prior(url: str) -> float:
+    host = (urllib.parse.urlsplit(url).hostname or "").lower()
+    for domain, prior in DOMAIN_PRIORS.items():
+        if host == domain or host.endswith("." + domain):
+            return prior
+    return 0.0
+
+def _domain_tokens(url: str) -> List[str]:
+    host = (urllib.parse.urlsplit(url).hostname or "").lower()
+    return re.split(r"[.\-]", host)
+
+def score_results(query: str, results: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns (combined score, query-term coverage) per result."""
+    terms = set(tokenize(query))
+    # Titles count twice; they are the most deliberate text in a result
+    texts = [f"{r.get('title', '')} {r.get('title', '')} {r.get('snippet', '')}" for r in results]
+    bm25 = bm25_scores(query, texts)
+    if bm25.max() > 0:
+        bm25 = bm25 / bm25.max()
+
+    coverage = np.zeros(len(results))
+    freshness = np.zeros(len(results))
+    priors = np.zeros(len(results))
+    now = datetime.now()
+    # Recency matters for "latest"/dated questions; elsewhere it only breaks ties
+    half_life = 30.0 if is_time_sensitive(query) else 365.0
+    for i, r in enumerate(results):
+        words = set(tokenize(texts[i])) | set(_domain_tokens(r.get("url", "")))
+        coverage[i] = len(terms & words) / len(terms) if terms else 0.0
+        date = parse_result_date(r.get("date", ""), now)
+        if date is not None:
+            freshness[i] = math.exp(-max(0.0, (now - date).days) / half_life)
+        priors[i] = domain_prior(r.get("url", ""))
+
+    ranks = np.array([r.get("rank", i) for i, r in enumerate(results)], dtype=float)
+    rank_prior = 1.0 / (1.0 + ranks)
+    score = W_BM25 * bm25 + W_COVERAGE * coverage + W_FRESHNESS * freshness + W_DOMAIN * priors + W_RANK * rank_prior
+    return score, coverage
+
+class LocalRelevanceRanker:
+    """
+    Ranks a batch of search results without the LLM. When the top results stand clearly
+    apart from the rest, their IDs are used directly and the relevance LLM call is skipped.
+    """
+    def __init__(self):
+        self.batches = 0
+        self.bypassed = 0
+
+    def rank(self, query: str, results: List[Dict]) -> Tuple[List[Dict], Optional[List[int]]]:
+        """Returns (results best first, confident IDs or None when the LLM should decide)."""
+        self.batches += 1
+        if not results:
+            return results, None
+        score, coverage = score_results(query, results)
+        order = np.argsort(-score, kind="stable")
+        ranked = [results[int(i)] for i in order]
+        if not LOCAL_RANKING_ENABLED or len(results) <= MIN_PICK or score[order[0]] <= 0:
+            return ranked, None
+
+        sorted_scores = score[order]
+        best_k, best_gap = 0, 0.0
+        for k in range(MIN_PICK, min(MAX_PICK, len(results) - 1) + 1):
+            gap = sorted_scores[k - 1] - sorted_scores[k]
+            if gap > best_gap:
+                best_k, best_gap = k, gap
+        if not best_k or best_gap / sorted_scores[0] < MIN_MARGIN:
+            return ranked, None
+        if coverage[order[:best_k]].min() < MIN_COVERAGE:
+            return ranked, None
+
+        self.bypassed += 1
+        return ranked, [r['id'] for r in ranked[:best_k]]
+
+    @property
+    def bypass_rate(self) -> float:
+        return self.bypassed / self.batches if self.batches else 0.0
+
+    def stats(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "llm_bypassed": self.bypassed,
+            "bypass_rate": round(self.bypass_rate, 3),
+        }
+
+_RANKER = LocalRelevanceRanker()
+
+def get_local_ranker() -> LocalRelevanceRanker:
+    return _RANKER
@@ -0,0 +1,212 @@
+import time
+import base64
+import asyncio
+from collections import deque
+from typing import Dict, Optional, Tuple
+from fastapi import WebSocket
+from playwright.async_api import Page
+
+QUALITY_LEVELS = [30, 45, 60, 75]  # JPEG quality steps the stream moves between
+MAX_FRAME_SKIP = 4  # everyNthFrame ceiling once the lowest quality is still too slow
+SLOW_ACK_MS = 250  # Client ack latency above this degrades the stream
+FAST_ACK_MS = 80  # ...and below this upgrades it
+ADJUST_INTERVAL = 2.0  # Seconds between quality/frame-rate changes
+ACK_TIMEOUT = 1.0  # Seconds to wait for a client ack before sending the next frame anyway
+FALLBACK_INTERVAL = 0.5  # Seconds between screenshots when CDP is unavailable
+
+class InputQueue:
+    """
+    Ordered queue of browser input events. Bursts of scrolls are summed and mouse moves
+    keep only the latest position, so a fast wheel doesn't replay hundreds of steps.
+    """
+    def __init__(self):
+        self._items = deque()
+        self._ready = asyncio.Event()
+        self.coalesced = 0
+
+    def push(self, event: Dict):
+        action = event.get("action")
+        last = self._items[-1] if self._items else None
+        if last is not None and last.get("action") == action:
+            if action == "scroll":
+                last["dx"] = last.get("dx", 0) + event.get("dx", 0)
+                last["dy"] = last.get("dy", 0) + event.get("dy", 0)
+                self.coalesced += 1
+                return
+            if action == "move":
+                last.update(event)
+                self.coalesced += 1
+                return
+        self._items.append(dict(event))
+        self._ready.set()
+
+    async def get(self) -> Dict:
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._items.popleft()
+
+class BrowserScreencast:
+    """
+    Streams a page to a WebSocket as binary JPEG messages using CDP Page.startScreencast.
+    One frame is in flight at a time: Chrome's frame is acked only after the client acks
+    the previous one, so the frame rate follows the client, and JPEG quality / everyNthFrame
+    follow its ack latency. Falls back to screenshot polling if CDP is unavailable.
+    """
+    def __init__(self, page: Page, websocket: WebSocket):
+        self.page = page
+        self.websocket = websocket
+        self.cdp = None
+        self.quality_index = 2
+        self.every_nth = 1
+        self.ack_ms: Optional[float] = None  # Moving average of client ack latency
+        self.metadata: Dict = {}  # Of the last frame sent; maps client coordinates back to the viewport
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self._latest: Optional[Dict] = None
+        self._frame_ready = asyncio.Event()
+        self._client_ack = asyncio.Event()
+        self._last_adjust = time.monotonic()
+
+    @property
+    def quality(self) -> int:
+        return QUALITY_LEVELS[self.quality_index]
+
+    def client_acked(self):
+        self._client_ack.set()
+
+    def _on_frame(self, params: Dict):
+        if self._latest is not None:
+            # The client is still behind; only the newest frame is worth sending
+            self.frames_dropped += 1
+            asyncio.create_task(self._ack_cdp(self._latest["sessionId"]))
+        self._latest = params
+        self._frame_ready.set()
+
+    async def _ack_cdp(self, frame_session_id: int):
+        try:
+            await self.cdp.send("Page.screencastFrameAck", {"sessionId": frame_session_id})
+        except Exception:
+            pass
+
+    async def _start_cdp(self):
+        await self.cdp.send("Page.startScreencast", {
+            "format": "jpeg",
+            "quality": self.quality,
+            "everyNthFrame": self.every_nth,
+        })
+
+    async def _send_frame(self, data: bytes) -> float:
+        """Sends one frame and waits for the client's ack. Returns the ack latency in ms."""
+        self._client_ack.clear()
+        started = time.monotonic()
+        await self.websocket.send_bytes(data)
+        self.frames_sent += 1
+        try:
+            await asyncio.wait_for(self._client_ack.wait(), ACK_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        return (time.monotonic() - started) * 1000
+
+    def _record_latency(self, latency_ms: float) -> bool:
+        """Folds in a new sample; returns True when quality or frame skip changed."""
+        self.ack_ms = latency_ms if self.ack_ms is None else self.ack_ms * 0.8 + latency_ms * 0.2
+        now = time.monotonic()
+        if now - self._last_adjust < ADJUST_INTERVAL:
+            return False
+
+        quality_index, every_nth = self.quality_index, self.every_nth
+        if self.ack_ms > SLOW_ACK_MS:
+            if self.quality_index > 0:
+                self.quality_index -= 1
+            elif self.every_nth < MAX_FRAME_SKIP:
+                self.every_nth += 1
+        elif self.ack_ms < FAST_ACK_MS:
+            if self.every_nth > 1:
+                self.every_nth -= 1
+            elif self.quality_index < len(QUALITY_LEVELS) - 1:
+                self.quality_index += 1
+        self._last_adjust = now
+        return (quality_index, every_nth) != (self.quality_index, self.every_nth)
+
+    async def run(self):
+        """Streams until the page or socket goes away."""
+        try:
+            self.cdp = await self.page.context.new_cdp_session(self.page)
+            self.cdp.on("Page.screencastFrame", self._on_frame)
+            await self._start_cdp()
+        except Exception as e:
+            print(f"Screencast unavailable ({e}), falling back to screenshots")
+            self.cdp = None
+            await self._run_screenshots()
+            return
+
+        while not self.page.is_closed():
+            try:
+                # Static pages produce no frames; wake up now and then to notice the page closing
+                await asyncio.wait_for(self._frame_ready.wait(), 5.0)
+            except asyncio.TimeoutError:
+                continue
+            self._frame_ready.clear()
+            frame, self._latest = self._latest, None
+            if frame is None:
+                continue
+            self.metadata = frame.get("metadata", {})
+            latency = await self._send_frame(base64.b64decode(frame["data"]))
+            if self._record_latency(latency):
+                # New settings only take effect on a restarted screencast
+                await self.cdp.send("Page.stopScreencast")
+                await self._start_cdp()
+            await self._ack_cdp(frame["sessionId"])
+
+    async def _run_screenshots(self):
+        while not self.page.is_closed():
+            screenshot = await self.page.screenshot(type="jpeg", quality=self.quality)
+            self.metadata = {}
+            self._record_latency(await self._send_frame(screenshot))
+            await asyncio.sleep(FALLBACK_INTERVAL * self.every_nth)
+
+    async def stop(self):
+        if self.cdp is None:
+            return
+        try:
+            await self.cdp.send("Page.stopScreencast")
+            await self.cdp.detach()
+        except Exception:
+            pass
+        self.cdp = None
+
+    def _to_viewport(self, event: Dict) -> Tuple[float, float]:
+        """Maps client coordinates (in frame pixels, with the frame's size) to CSS pixels of the page."""
+        x, y = float(event.get("x", 0)), float(event.get("y", 0))
+        width, height = event.get("width"), event.get("height")
+        if width and height:
+            viewport = self.page.viewport_size or {}
+            target_w = self.metadata.get("deviceWidth") or viewport.get("width") or width
+            target_h = self.metadata.get("deviceHeight") or viewport.get("height") or height
+            x, y = x * target_w / width, y * target_h / height
+        return x, y
+
+    async def apply_input(self, event: Dict):
+        action = event.get("action")
+        if action == "click":
+            x, y = self._to_viewport(event)
+            await self.page.mouse.click(x, y)
+        elif action == "move":
+            x, y = self._to_viewport(event)
+            await self.page.mouse.move(x, y)
+        elif action == "scroll":
+            await self.page.mouse.wheel(event.get("dx", 0), event.get("dy", 0))
+        elif action == "type" and event.get("text"):
+            await self.page.keyboard.type(event["text"])
+        elif action == "key" and event.get("key"):
+            await self.page.keyboard.press(event["key"])
+
+    def stats(self) -> Dict:
+        return {
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "quality": self.quality,
+            "every_nth_frame": self.every_nth,
+            "ack_ms": round(self.ack_ms, 1) if self.ack_ms is not None else None,
+        }
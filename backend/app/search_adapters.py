@@ -0,0 +1,182 @@
+import os
+import re
+import time
+import asyncio
+import urllib.parse
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from bs4 import BeautifulSoup
+from .http_fetcher import get_http_client
+from .rate_limiter import get_engine_limiter
+
+STATIC_SEARCH_ENABLED = os.getenv("STATIC_SEARCH_ENABLED", "true").lower() == "true"
+BLOCK_COOLDOWN = 600  # Seconds an adapter is skipped after being served an error/challenge page
+
+# Same leading-date pattern the browser scraper looks for in snippets
+_DATE_PREFIX = re.compile(r"^([a-zA-Z]{3} \d{1,2}, \d{4}|\d{1,2} [a-zA-Z]{3} \d{4}|\d{4}年\d{1,2}月\d{1,2}日|\d{1,2} hours? ago|\d{1,2} days? ago)")
+
+def _clean(text: str) -> str:
+    return " ".join(text.split())
+
+class SearchAdapter(ABC):
+    """
+    Browser-free search against an engine's static HTML endpoint.
+    Subclasses build the form and parse the response into the same
+    {id, title, url, snippet, date} dicts the browser scraper returns.
+    """
+    name = ""
+    endpoint = ""
+    rate_limit: Dict = {"rate": 1.0, "burst": 3, "jitter": 0.3}
+    block_markers: List[str] = []
+
+    def __init__(self):
+        self.blocked_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def available(self) -> bool:
+        return time.time() >= self.blocked_until
+
+    def build_form(self, query: str) -> Dict:
+        return {"q": query}
+
+    @abstractmethod
+    def parse(self, html: str, max_results: int) -> List[Dict]:
+        ...
+
+    def _append(self, results: List[Dict], title: str, href: str, snippet: str, date: str = ""):
+        # Protocol-relative redirect links are unwrapped later by the canonicalization stage
+        url = urllib.parse.urljoin(self.endpoint, href)
+        if not title or not url.startswith("http"):
+            return
+        snippet = _clean(snippet)
+        date = _clean(date)
+        if not date and snippet:
+            match = _DATE_PREFIX.match(snippet)
+            if match:
+                date = match.group(0)
+        results.append({
+            "id": len(results) + 1,
+            "title": _clean(title),
+            "url": url,
+            "snippet": snippet,
+            "date": date
+        })
+
+    async def search(self, query: str, max_results: int) -> Tuple[Optional[List[Dict]], str]:
+        """Returns (results, "") on success or (None, reason) when the browser should take over."""
+        limiter = get_engine_limiter(self.name, {"rate_limit": self.rate_limit})
+        await limiter.acquire()
+        self.requests += 1
+        try:
+            response = await get_http_client().post(self.endpoint, data=self.build_form(query), headers={"Referer": self.endpoint})
+        except Exception as e:
+            self.failures += 1
+            return None, f"request failed ({type(e).__name__})"
+
+        html = response.text
+        # Non-200 (DDG answers 202 with a challenge) or an error page means we've been flagged
+        if response.status_code != 200 or any(marker in html for marker in self.block_markers):
+            self.failures += 1
+            self.blocked_until = time.time() + BLOCK_COOLDOWN
+            limiter.record_captcha()
+            return None, f"blocked (HTTP {response.status_code})"
+
+        results = await asyncio.to_thread(self.parse, html, max_results)
+        if not results:
+            self.failures += 1
+            return None, "no results parsed"
+        limiter.record_success()
+        return results, ""
+
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "blocked_for": max(0, round(self.blocked_until - time.time())),
+        }
+
+class DuckDuckGoHtmlAdapter(SearchAdapter):
+    name = "ddg_html"
+    endpoint = "https://html.duckduckgo.com/html/"
+    block_markers = ["error-lite", "anomaly-modal"]
+
+    def parse(self, html: str, max_results: int) -> List[Dict]:
+        soup = BeautifulSoup(html, "html.parser")
+        results = []
+        for el in soup.select("div.result"):
+            if len(results) >= max_results:
+                break
+            if "result--ad" in (el.get("class") or []):
+                continue
+            link = el.select_one("a.result__a")
+            if not link or not link.get("href"):
+                continue
+            snippet = el.select_one(".result__snippet")
+            date = el.select_one(".result__timestamp")
+            self._append(
+                results,
+                link.get_text(" "),
+                link["href"],
+                snippet.get_text(" ") if snippet else "",
+                date.get_text(" ") if date else ""
+            )
+        return results
+
+class DuckDuckGoLiteAdapter(SearchAdapter):
+    name = "ddg_lite"
+    endpoint = "https://lite.duckduckgo.com/lite/"
+    block_markers = ["error-lite", "anomaly-modal"]
+
+    def parse(self, html: str, max_results: int) -> List[Dict]:
+        soup = BeautifulSoup(html, "html.parser")
+        results = []
+        # Each result is a run of table rows: title link, snippet, then url/timestamp
+        for link in soup.select("a.result-link"):
+            if len(results) >= max_results:
+                break
+            row = link.find_parent("tr")
+            if row is None or "result-sponsored" in (row.get("class") or []) or not link.get("href"):
+                continue
+            snippet, date = "", ""
+            for sibling in row.find_next_siblings("tr"):
+                if sibling.select_one("a.result-link"):
+                    break
+                cell = sibling.select_one(".result-snippet")
+                if cell:
+                    snippet = cell.get_text(" ")
+                stamp = sibling.select_one(".timestamp")
+                if stamp:
+                    date = stamp.get_text(" ")
+            self._append(results, link.get_text(" "), link["href"], snippet, date)
+        return results
+
+# Names usable in an engine's "static_adapters" list in search_selectors.json
+ADAPTER_CLASSES = {
+    DuckDuckGoHtmlAdapter.name: DuckDuckGoHtmlAdapter,
+    DuckDuckGoLiteAdapter.name: DuckDuckGoLiteAdapter,
+}
+
+# adapter name -> instance, shared by all sessions in the process
+_ADAPTERS: Dict[str, SearchAdapter] = {}
+
+def get_static_adapters(engine_config: Dict) -> List[SearchAdapter]:
+    """Returns the engine's static adapters in preference order, skipping ones that are cooling down."""
+    if not STATIC_SEARCH_ENABLED:
+        return []
+    adapters = []
+    for name in engine_config.get("static_adapters", []):
+        adapter = _ADAPTERS.get(name)
+        if adapter is None:
+            cls = ADAPTER_CLASSES.get(name)
+            if cls is None:
+                print(f"Unknown static search adapter '{name}'")
+                continue
+            adapter = _ADAPTERS[name] = cls()
+        if adapter.available:
+            adapters.append(adapter)
+    return adapters
+
+def get_adapter_stats() -> Dict[str, Dict]:
+    return {name: adapter.stats() for name, adapter in _ADAPTERS.items()}
@@ -0,0 +1,132 @@
+import os
+import re
+import time
+import asyncio
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+EVERGREEN_TTL = int(os.getenv("SEARCH_CACHE_TTL", str(24 * 3600)))
+TIME_SENSITIVE_TTL = int(os.getenv("SEARCH_CACHE_TTL_TIME_SENSITIVE", "900"))
+MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1000"))
+
+# Queries mentioning a year or relative time get a short TTL
+_TIME_SENSITIVE = re.compile(
+    r"\b(19|20)\d{2}\b|\b(today|tonight|now|latest|current|currently|recent|breaking|news|live|yesterday|tomorrow|this (week|month|year)|price|stock|weather|score)\b"
+    r"|今天|今日|今晚|现在|目前|当前|最新|最近|本周|本月|今年|昨天|明天|实时|新闻|股价|天气|比分|\d{4}年",
+    re.I
+)
+
+# Sentence punctuation that doesn't change what a query asks for when it ends it
+_TRAILING_PUNCT = ".,!?;:。，！？；：、…"
+
+def normalize_query(query: str) -> str:
+    """
+    Folds case, width, whitespace and trailing sentence punctuation so near-identical queries share an entry.
+    Symbols inside the query are kept: "C#", "C++", ".NET" and "C" are different searches.
+    """
+    text = unicodedata.normalize("NFKC", query).casefold()
+    return " ".join(text.split()).rstrip(_TRAILING_PUNCT + " ")
+
+def is_time_sensitive(query: str) -> bool:
+    return bool(_TIME_SENSITIVE.search(unicodedata.normalize("NFKC", query)))
+
+def ttl_for_query(query: str) -> int:
+    return TIME_SENSITIVE_TTL if is_time_sensitive(query) else EVERGREEN_TTL
+
+class SearchCache:
+    """
+    In-memory LRU of search results keyed by (engine, max_results, normalized query).
+    Concurrent identical searches are coalesced onto a single navigation.
+    """
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Dict]" = OrderedDict()
+        self._inflight: Dict[Tuple, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(engine: str, query: str, max_results: int) -> Tuple:
+        return (engine, max_results, normalize_query(query))
+
+    def get(self, key: Tuple) -> Optional[List[Dict]]:
+        if not SEARCH_CACHE_ENABLED:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if time.time() > entry["expires_at"]:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return [dict(r) for r in entry["results"]]
+
+    def put(self, key: Tuple, query: str, results: List[Dict]):
+        # Empty results usually mean a timeout or CAPTCHA, so they are not cached
+        if not SEARCH_CACHE_ENABLED or not results:
+            return
+        self._entries[key] = {
+            "results": [dict(r) for r in results],
+            "expires_at": time.time() + ttl_for_query(query),
+        }
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def is_inflight(self, key: Tuple) -> bool:
+        return key in self._inflight
+
+    async def coalesce(self, key: Tuple, query: str, search: Callable[[], Awaitable[List[Dict]]]) -> List[Dict]:
+        """
+        Runs search() unless an identical search is already in flight, in which case its result is shared.
+        The shared search is cancelled only once every caller waiting on it has gone away.
+        """
+        entry = self._inflight.get(key)
+        if entry is None:
+            async def run():
+                results = await search()
+                self.put(key, query, results)
+                return results
+
+            task = asyncio.ensure_future(run())
+            entry = {"task": task, "waiters": 0}
+            self._inflight[key] = entry
+
+            def cleanup(_):
+                if self._inflight.get(key) is entry:
+                    del self._inflight[key]
+            task.add_done_callback(cleanup)
+        else:
+            self.coalesced += 1
+
+        entry["waiters"] += 1
+        try:
+            results = await asyncio.shield(entry["task"])
+        finally:
+            entry["waiters"] -= 1
+            if entry["waiters"] == 0 and not entry["task"].done():
+                entry["task"].cancel()
+        return [dict(r) for r in results]
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+_SEARCH_CACHE: Optional[SearchCache] = None
+
+def get_search_cache() -> SearchCache:
+    global _SEARCH_CACHE
+    if _SEARCH_CACHE is None:
+        _SEARCH_CACHE = SearchCache(MAX_ENTRIES)
+    return _SEARCH_CACHE
@@ -12,35 +12,10 @@ DEFAULT_SETTINGS = {
     "search_engine": "duckduckgo",
     "max_results": 8,
     "max_iterations": 5,
-    "interactive_search": True
+    "interactive_search": True,
+    "hedged_search": False
 }
 
-_api_key_index = 0
-
-def get_next_api_key(api_keys_str: str) -> str:
-    """
-    Get the next API key from a comma-separated string in a round-robin fashion.
-    If the string contains only one key or is empty, it returns the string as is (or empty).
-    """
-    global _api_key_index
-    if not api_keys_str:
-        return api_keys_str
-        
-    # Split by comma and strip whitespace
-    keys = [k.strip() for k in api_keys_str.split(',') if k.strip()]
-    
-    if not keys:
-        return ""
-        
-    if len(keys) == 1:
-        return keys[0]
-        
-    # Round-robin selection
-    current_key = keys[_api_key_index % len(keys)]
-    _api_key_index = (_api_key_index + 1) % len(keys)
-    
-    return current_key
-
 async def load_settings():
     """Load settings from the JSON file asynchronously, or return defaults if not found."""
     if not os.path.exists(SETTINGS_FILE):
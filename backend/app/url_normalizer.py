@@ -0,0 +1,103 @@
+import base64
+import urllib.parse
+from typing import Optional
+
+# Query parameters that only describe the click, never the content
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "gclsrc", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "ref_src", "ref_url", "spm_id_from", "vd_source", "share_source", "share_medium",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def _query_param(parts: urllib.parse.SplitResult, name: str) -> Optional[str]:
+    values = urllib.parse.parse_qs(parts.query).get(name)
+    return values[0] if values else None
+
+def _unwrap_once(url: str) -> Optional[str]:
+    parts = urllib.parse.urlsplit(url)
+    host = (parts.hostname or "").lower()
+
+    # DuckDuckGo: /l/?uddg=<target>
+    if host.endswith("duckduckgo.com") and parts.path.startswith("/l/"):
+        return _query_param(parts, "uddg")
+
+    # Bing: /ck/a?u=a1<base64 target>
+    if host.endswith("bing.com") and parts.path.startswith("/ck/a"):
+        value = _query_param(parts, "u")
+        if value and value.startswith("a1"):
+            encoded = value[2:] + "=" * (-len(value[2:]) % 4)
+            try:
+                return base64.urlsafe_b64decode(encoded).decode("utf-8")
+            except Exception:
+                return None
+        return None
+
+    # Google: /url?q=<target> (or url=<target>)
+    if (host.startswith("google.") or ".google." in host) and parts.path == "/url":
+        return _query_param(parts, "q") or _query_param(parts, "url")
+
+    # Google AMP cache: <mangled-host>.cdn.ampproject.org/c/s/<host>/<path>
+    if host.endswith(".cdn.ampproject.org"):
+        segments = parts.path.split("/")
+        if len(segments) > 3 and segments[1] in ("c", "v"):
+            secure = segments[2] == "s"
+            rest = "/".join(segments[3:] if secure else segments[2:])
+            target = f"{'https' if secure else 'http'}://{rest}"
+            return f"{target}?{parts.query}" if parts.query else target
+    return None
+
+def unwrap_redirect(url: str) -> str:
+    """Returns the target of a search engine or AMP cache redirect, or the URL unchanged."""
+    # Wrappers can nest, e.g. a Google /url link pointing into the AMP cache
+    for _ in range(3):
+        target = _unwrap_once(url)
+        if not target or not target.startswith(("http://", "https://")):
+            break
+        url = target
+    return url
+
+def _is_noise_param(pair: str) -> bool:
+    name, _, value = pair.partition("=")
+    name = urllib.parse.unquote_plus(name).lower()
+    if name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES):
+        return True
+    # AMP variants of the same article
+    return name == "amp" or (name == "outputtype" and value.lower() == "amp")
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalizes a result URL to the form we crawl and cite: redirects unwrapped, tracking
+    and AMP params dropped, scheme/host lowercased, default port, trailing slash and fragment removed.
+    Query parameters keep their original order and encoding.
+    """
+    url = unwrap_redirect(url.strip())
+    parts = urllib.parse.urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return url
+
+    host = parts.hostname.lower().rstrip(".")
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port in (None, _DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+
+    # A trailing "/amp" segment is left alone: on most sites it is a real page (/tags/amp, /project/amp)
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+
+    query = "&".join(p for p in parts.query.split("&") if p and not _is_noise_param(p))
+    # Hash-routed single page apps keep their route
+    fragment = parts.fragment if parts.fragment.startswith(("/", "!")) else ""
+    return urllib.parse.urlunsplit((scheme, netloc, path, query, fragment))
+
+def url_key(url: str) -> str:
+    """Identity used for dedup and caching: the canonical URL ignoring scheme, "www." and query order."""
+    parts = urllib.parse.urlsplit(canonicalize_url(url))
+    host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    query = "&".join(sorted(p for p in parts.query.split("&") if p))
+    return urllib.parse.urlunsplit(("", host, parts.path, query, parts.fragment))
@@ -1,13 +1,20 @@
+import time
 import asyncio
 from typing import List, Dict, Callable, Any, Optional
 from .llm_client import LLMClient
 from .browser_manager import BrowserManager
+from .crawl_scheduler import crawl_priority
+from .url_normalizer import canonicalize_url, url_key
+from .result_ranker import get_local_ranker
+
+# Seconds a request aims to finish in; crawls of requests closer to their deadline are scheduled first
+REQUEST_DEADLINE = 120.0
 
 class SearchWorkflow:
-    def __init__(self, api_key: str, base_url: str, model: str, search_engine: str = "duckduckgo", max_results: int = 8, max_iterations: int = 5, interactive_search: bool = True, session_id: str = None):
+    def __init__(self, api_key: str, base_url: str, model: str, search_engine: str = "duckduckgo", max_results: int = 8, max_iterations: int = 5, interactive_search: bool = True, session_id: str = None, hedged_search: bool = False):
         self.llm = LLMClient(api_key, base_url, model)
         # Pass the search engine preference to the browser manager
-        self.browser = BrowserManager(engine=search_engine, max_results=max_results)
+        self.browser = BrowserManager(engine=search_engine, max_results=max_results, hedged=hedged_search)
         self.max_iterations = max_iterations
         self.history = []
         self.interactive_search = interactive_search
@@ -44,6 +51,7 @@ class SearchWorkflow:
         # await self.browser.start()
         
         try:
+            deadline = time.monotonic() + REQUEST_DEADLINE
             iteration = 0
             accumulated_sources = []
             visited_urls = set()
@@ -73,27 +81,15 @@ class SearchWorkflow:
                 
                 if analysis.get("type") == "direct":
                     raw_url = analysis.get("url")
-                    url = raw_url
+                    # Canonical form for dedupe and citation; the crawl fetches the URL as given
+                    url = canonicalize_url(raw_url)
                     
-                    # Heuristic Optimization for GitHub User Profiles
-                    # If the task is about counting stars or repos, and the URL is a user profile,
-                    # automatically redirect to the repositories tab sorted by stargazers.
-                    if "github.com" in url and "tab=" not in url:
-                        # Check if it looks like a user profile (e.g. github.com/username)
-                        # Remove protocol
-                        clean_url = url.replace("https://", "").replace("http://", "").rstrip('/')
-                        parts = clean_url.split('/')
-                        
-                        if len(parts) == 2 and parts[1] not in ["login", "search", "explore", "topics", "about", "pricing"]:
-                            # It might be a user or org profile
-                            progress_callback(f"检测到 GitHub 用户主页，正在优化 URL 以获取仓库列表...")
-                            url = f"{url}?tab=repositories&q=&type=&language=&sort=stargazers"
-
+                    # GitHub profile URLs need no rewriting: crawl_page answers them from the REST API
                     progress_callback(f"目标 URL: {url}")
                     
-                    if url not in visited_urls:
-                        content = await self.browser.crawl_page(url, log_func=progress_callback, interactive_mode=self.interactive_search, query=user_input, llm_client=self.llm, session_id=self.session_id)
-                        visited_urls.add(url)
+                    if url_key(url) not in visited_urls:
+                        content = await self.browser.crawl_page(raw_url, log_func=progress_callback, interactive_mode=self.interactive_search, query=user_input, llm_client=self.llm, session_id=self.session_id, priority=crawl_priority(deadline, 0))
+                        visited_urls.add(url_key(url))
                         source_id_counter += 1
                         new_sources.append({
                             "id": source_id_counter, 
@@ -130,13 +126,18 @@ class SearchWorkflow:
                         tasks = [self.browser.search_web(q, log_func=progress_callback, session_id=self.session_id) for q in valid_queries]
                         results_list = await asyncio.gather(*tasks)
                         
-                        # Flatten and Reindex results
+                        # Flatten and Reindex results (URLs are already canonical; drop pages found by several queries)
                         search_results = []
                         current_id = 1
+                        seen_keys = set()
                         for batch in results_list:
-                            for res in batch:
+                            for rank, res in enumerate(batch):
+                                if url_key(res['url']) in seen_keys:
+                                    continue
+                                seen_keys.add(url_key(res['url']))
                                 new_res = res.copy()
                                 new_res['id'] = current_id
+                                new_res['rank'] = rank  # Position on the engine's result page
                                 search_results.append(new_res)
                                 current_id += 1
                     else:
@@ -150,19 +151,29 @@ class SearchWorkflow:
                         progress_callback(f"找到 {len(search_results)} 个结果。正在评估相关性...")
                         
                         # [04] Relevance Assessment
-                        # Use user_input as the query context for relevance assessment to cover all aspects
-                        relevant_ids = await self.llm.assess_relevance(user_input, search_results)
+                        # Use user_input as the query context for relevance assessment to cover all aspects.
+                        # A clear local ranking is used as is; only ambiguous batches go to the LLM
+                        ranker = get_local_ranker()
+                        ranked_results, relevant_ids = ranker.rank(user_input, search_results)
+                        if relevant_ids is not None:
+                            progress_callback(f"本地排序结果明确，跳过 AI 相关性评估 (累计跳过率 {ranker.bypass_rate:.0%})。")
+                        else:
+                            # Best-first order also makes the assessor's "first 3" fallback meaningful
+                            relevant_ids = await self.llm.assess_relevance(user_input, ranked_results)
                         progress_callback(f"选定进行深度爬取的 ID: {relevant_ids}")
                         
                         # [05] Admission Filter
                         to_crawl = []
                         seen_urls_in_batch = set()
 
-                        for res in search_results:
-                            if res['id'] in relevant_ids:
-                                if res['url'] not in visited_urls and res['url'] not in seen_urls_in_batch:
+                        # Order by the assessor's ranking so the best pages get crawl slots first
+                        rank_of = {rid: rank for rank, rid in enumerate(relevant_ids)}
+                        for res in sorted(search_results, key=lambda r: rank_of.get(r['id'], len(rank_of))):
+                            if res['id'] in rank_of:
+                                key = url_key(res['url'])
+                                if key not in visited_urls and key not in seen_urls_in_batch:
                                     to_crawl.append(res)
-                                    seen_urls_in_batch.add(res['url'])
+                                    seen_urls_in_batch.add(key)
                                 else:
                                     pass 
                         
@@ -171,11 +182,11 @@ class SearchWorkflow:
                             progress_callback("未找到新的相关页面进行爬取 (可能已访问过)。")
                         else:
                             progress_callback(f"正在爬取 {len(to_crawl)} 个新页面...")
-                            tasks = [self.browser.crawl_page(item['url'], log_func=progress_callback, interactive_mode=self.interactive_search, query=user_input, llm_client=self.llm, session_id=self.session_id) for item in to_crawl]
+                            tasks = [self.browser.crawl_page(item.get('fetch_url') or item['url'], log_func=progress_callback, interactive_mode=self.interactive_search, query=user_input, llm_client=self.llm, session_id=self.session_id, priority=crawl_priority(deadline, rank)) for rank, item in enumerate(to_crawl)]
                             contents = await asyncio.gather(*tasks)
                             
                             for i, item in enumerate(to_crawl):
-                                visited_urls.add(item['url'])
+                                visited_urls.add(url_key(item['url']))
                                 source_id_counter += 1
                                 # [07] Structure Data
                                 new_sources.append({
@@ -199,7 +210,8 @@ class SearchWorkflow:
                 if source_callback:
                     source_callback(accumulated_sources)
                 
-                result = await self.llm.generate_answer(user_input, accumulated_sources, history, stream_callback)
+                # The last iteration's answer is shown even if insufficient, so only earlier ones may be cut short
+                result = await self.llm.generate_answer(user_input, accumulated_sources, history, stream_callback, abort_if_insufficient=iteration < self.max_iterations)
                 
                 if result.get("status") == "sufficient":
                     progress_callback("答案状态: 充分")
@@ -214,8 +226,11 @@ class SearchWorkflow:
                             
                     return formatted_result
                 else:
-                    last_feedback = result.get("answer")
+                    # Missing_Info is what the next analysis needs; the draft answer is the fallback
+                    last_feedback = result.get("missing_info") or result.get("answer")
                     progress_callback(f"答案状态: 不充分 (迭代 {iteration}/{self.max_iterations})")
+                    if result.get("aborted"):
+                        progress_callback(f"已在解析出缺失信息后提前终止生成 (估计节省 {result.get('seconds_saved', 0):.1f} 秒)。")
                     progress_callback(f"原因/缺失信息: {last_feedback}")
                     
                     if iteration >= self.max_iterations:
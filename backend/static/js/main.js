@@ -160,6 +160,14 @@ document.addEventListener('DOMContentLoaded', async () => {
         if (!modal) return;
 
         let ws = null;
+        let frameUrl = null;
+
+        // Ack each frame once it's on screen; the server sends the next one only after that
+        img.addEventListener('load', () => {
+            if (ws && ws.readyState === WebSocket.OPEN) {
+                ws.send(JSON.stringify({ action: 'ack' }));
+            }
+        });
 
         closeBtn.addEventListener('click', () => {
             modal.style.display = 'none';
@@ -193,9 +201,22 @@ document.addEventListener('DOMContentLoaded', async () => {
             ws.send(JSON.stringify({
                 action: 'click',
                 x: x,
-                y: y
+                y: y,
+                width: img.naturalWidth,
+                height: img.naturalHeight
             }));
         });
+
+        // Scrolling the image scrolls the page (the server merges bursts of wheel events)
+        img.addEventListener('wheel', (e) => {
+            if (!ws || img.style.display === 'none') return;
+            e.preventDefault();
+            ws.send(JSON.stringify({
+                action: 'scroll',
+                dx: e.deltaX,
+                dy: e.deltaY
+            }));
+        }, { passive: false });
         
         // Expose open function to state or window
         state.openBrowserModal = (sessionId) => {
@@ -217,13 +238,20 @@ document.addEventListener('DOMContentLoaded', async () => {
             };
             
             ws.onmessage = (event) => {
-                const data = JSON.parse(event.data);
-                
-                if (data.type === 'frame') {
+                // Frames arrive as binary JPEG messages
+                if (typeof event.data !== 'string') {
                     status.style.display = 'none';
                     img.style.display = 'block';
-                    img.src = `data:image/jpeg;base64,${data.image}`;
-                } else if (data.type === 'status') {
+                    const previousUrl = frameUrl;
+                    frameUrl = URL.createObjectURL(event.data);
+                    img.src = frameUrl;
+                    if (previousUrl) URL.revokeObjectURL(previousUrl);
+                    return;
+                }
+
+                const data = JSON.parse(event.data);
+                
+                if (data.type === 'status') {
                      if (data.msg === 'Completed') {
                          modal.style.display = 'none';
                          if (ws) {
@@ -286,6 +314,7 @@ document.addEventListener('DOMContentLoaded', async () => {
             document.getElementById('base-url-input').value = state.settings.base_url || '';
             document.getElementById('model-input').value = state.settings.model_id || '';
             document.getElementById('interactive-search-input').checked = state.settings.interactive_search !== undefined ? state.settings.interactive_search : true;
+            document.getElementById('hedged-search-input').checked = state.settings.hedged_search !== undefined ? state.settings.hedged_search : false;
 
             // Fetch GitHub Stars
             const starsCountElement = document.getElementById('github-stars-count');
@@ -317,7 +346,8 @@ document.addEventListener('DOMContentLoaded', async () => {
                 api_key: document.getElementById('api-key-input').value,
                 base_url: document.getElementById('base-url-input').value,
                 model_id: document.getElementById('model-input').value,
-                interactive_search: document.getElementById('interactive-search-input').checked
+                interactive_search: document.getElementById('interactive-search-input').checked,
+                hedged_search: document.getElementById('hedged-search-input').checked
             };
             
             if (await API.saveSettingsAPI(newSettings)) {
@@ -341,6 +371,7 @@ document.addEventListener('DOMContentLoaded', async () => {
                 document.getElementById('base-url-input').value = defaults.base_url || '';
                 document.getElementById('model-input').value = defaults.model_id || '';
                 document.getElementById('interactive-search-input').checked = defaults.interactive_search !== undefined ? defaults.interactive_search : true;
+                document.getElementById('hedged-search-input').checked = defaults.hedged_search !== undefined ? defaults.hedged_search : false;
                 showToast('已恢复默认设置', 'success');
             } else {
                 showToast('加载默认设置失败', 'error');
@@ -122,7 +122,8 @@ export async function streamChat(query, callbacks) {
                 search_engine: state.settings.search_engine,
                 max_results: state.settings.max_results,
                 max_iterations: state.settings.max_iterations,
-                interactive_search: state.settings.interactive_search
+                interactive_search: state.settings.interactive_search,
+                hedged_search: state.settings.hedged_search
             }),
             signal: signal
         });
@@ -0,0 +1,84 @@
+"""
+Times AnswerStreamParser against the full-buffer parsing generate_answer used before it.
+
+    python -m backend.tests.bench_answer_parser [answer_kb] [chunk_chars]
+"""
+import sys
+import time
+from backend.app.answer_parser import AnswerStreamParser
+
+def old_parse(chunks, stream_callback):
+    """The previous loop: re-splits the growing header buffer on every chunk."""
+    full_content = ""
+    status = "sufficient"
+    parsing_header = True
+    header_buffer = ""
+    answer_started = False
+    for content in chunks:
+        full_content += content
+        if parsing_header:
+            header_buffer += content
+            if "Status:" in header_buffer and "\n" in header_buffer.split("Status:")[1]:
+                status_line = [line for line in header_buffer.split("\n") if "Status:" in line][0]
+                if "insufficient" in status_line.lower():
+                    status = "insufficient"
+            if "Answer:" in header_buffer:
+                parts = header_buffer.split("Answer:", 1)
+                if len(parts) > 1:
+                    answer_chunk = parts[1]
+                    parsing_header = False
+                    answer_started = True
+                    if status == "sufficient" and answer_chunk:
+                        stream_callback(answer_chunk)
+            if len(header_buffer) > 500 and not answer_started:
+                parsing_header = False
+                stream_callback(header_buffer)
+        elif status == "sufficient":
+            stream_callback(content)
+
+    final_answer = full_content
+    if "Answer:" in full_content:
+        final_answer = full_content.split("Answer:", 1)[1].strip()
+    elif "Status:" in full_content:
+        lines = full_content.split("\n")
+        final_answer = "\n".join([l for l in lines if not l.startswith("Status:") and not l.startswith("Missing_Info:")])
+    return {"status": status, "answer": final_answer.strip()}
+
+def new_parse(chunks, stream_callback):
+    parser = AnswerStreamParser()
+    for content in chunks:
+        for event, value in parser.feed(content):
+            if event == "answer" and parser.status == "sufficient":
+                stream_callback(value)
+    return {"status": parser.status, "answer": parser.answer()}
+
+def make_chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+def bench(name, parse, chunks, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = parse(chunks, lambda _: None)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:>12}: {best * 1000:8.2f} ms")
+    return result
+
+def main():
+    answer_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    chunk_chars = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    body = ("Python 3.13 adds an experimental JIT compiler [1]. " * (answer_kb * 1024 // 52 + 1))[:answer_kb * 1024]
+    cases = {
+        "header": "Status: Sufficient\nMissing_Info: none\nAnswer: " + body,
+        # Worst case for the old parser: the header buffer grows to the 500-char limit one chunk at a time
+        "no header": body,
+    }
+    for label, text in cases.items():
+        chunks = make_chunks(text, chunk_chars)
+        print(f"{label}: {len(text) // 1024} KB in {len(chunks)} chunks of {chunk_chars} chars")
+        old = bench("full-buffer", old_parse, chunks)
+        new = bench("incremental", new_parse, chunks)
+        assert old == new, "parsers disagree"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import random
+from backend.app.answer_parser import HEADER_LIMIT, AnswerStreamParser
+
+SUFFICIENT = "Status: Sufficient\nAnswer: Python 3.13 was released in October 2024 [1].\n\nIt adds a JIT [2]."
+INSUFFICIENT = "Status: Insufficient\nMissing_Info: release date\n  and changelog\nAnswer: Not enough sources yet."
+NO_HEADER = "Python 3.13 was released in October 2024.\nIt adds an experimental JIT."
+STATUS_ONLY = "Status: Sufficient\nMissing_Info: none\nThe answer without its marker."
+LONG_NO_HEADER = "word " * (HEADER_LIMIT // 2) + "\nend of answer"
+DOCUMENTS = [SUFFICIENT, INSUFFICIENT, NO_HEADER, STATUS_ONLY, LONG_NO_HEADER]
+
+def run(chunks):
+    parser = AnswerStreamParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    streamed = "".join(value for event, value in events if event == "answer")
+    statuses = [value for event, value in events if event == "status"]
+    return parser.status, parser.missing_info, parser.answer(), streamed, statuses
+
+def random_chunks(text, rng):
+    chunks, start = [], 0
+    while start < len(text):
+        size = rng.randint(1, 12)
+        chunks.append(text[start:start + size])
+        start += size
+    return chunks
+
+def test_result_does_not_depend_on_chunking():
+    rng = random.Random(0)
+    for text in DOCUMENTS:
+        expected = run([text])
+        assert run(list(text)) == expected
+        for _ in range(200):
+            assert run(random_chunks(text, rng)) == expected
+
+def test_header_split_at_every_position():
+    expected = run([SUFFICIENT])
+    for i in range(len(SUFFICIENT) + 1):
+        assert run([SUFFICIENT[:i], SUFFICIENT[i:]]) == expected
+
+def test_markers_split_across_chunks():
+    status, missing, answer, streamed, _ = run(["Sta", "tus: Insuff", "icient\nMissing_", "Info: release date\nAns", "wer", ": Not yet."])
+    assert status == "insufficient"
+    assert missing == "release date"
+    assert answer == "Not yet."
+    assert streamed == " Not yet."
+
+def test_protocol_fields():
+    status, missing, answer, _, statuses = run([INSUFFICIENT])
+    assert (status, statuses) == ("insufficient", ["insufficient"])
+    assert missing == "release date\nand changelog"
+    assert answer == "Not enough sources yet."
+    assert run([SUFFICIENT])[2] == "Python 3.13 was released in October 2024 [1].\n\nIt adds a JIT [2]."
+
+def test_missing_header_is_all_answer():
+    status, missing, answer, streamed, statuses = run(random_chunks(NO_HEADER, random.Random(1)))
+    assert (status, missing, statuses) == ("sufficient", None, [])
+    # Short output never reaches the header limit, so nothing streams, but the final answer is complete
+    assert streamed == ""
+    assert answer == NO_HEADER
+
+    status, _, answer, streamed, _ = run(random_chunks(LONG_NO_HEADER, random.Random(2)))
+    assert status == "sufficient"
+    assert streamed == LONG_NO_HEADER
+    assert answer == LONG_NO_HEADER.strip()
+
+def test_status_without_answer_marker_drops_header_lines():
+    assert run(random_chunks(STATUS_ONLY, random.Random(3)))[2] == "The answer without its marker."
@@ -0,0 +1,64 @@
+import asyncio
+import httpx
+from openai import RateLimitError
+from backend.app import llm_client
+from backend.app.llm_client import LLMClient
+
+def rate_limited(retry_after: str) -> RateLimitError:
+    request = httpx.Request("POST", "http://llm.test/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": retry_after}, request=request)
+    return RateLimitError("rate limited", response=response, body=None)
+
+class FakeClient:
+    """Stands in for AsyncOpenAI: fails with the queued errors, then succeeds."""
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.keys = []
+        self.chat = self
+        self.completions = self
+
+    def bind(self, api_key, base_url):
+        self.keys.append(api_key)
+        return self
+
+    async def create(self, **kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+def run_create(monkeypatch, api_keys, base_url, errors):
+    fake = FakeClient(errors)
+    sleeps = []
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+    monkeypatch.setattr(llm_client, "get_openai_client", fake.bind)
+    monkeypatch.setattr(llm_client.asyncio, "sleep", fake_sleep)
+
+    async def main():
+        client = LLMClient(api_keys, base_url=base_url)
+        response, lease = await client._create(model="m", messages=[])
+        lease.release()
+        return client, response
+
+    client, response = asyncio.run(main())
+    return client, response, fake.keys[1:], sleeps
+
+def test_single_key_waits_out_retry_after(monkeypatch):
+    client, response, keys, sleeps = run_create(monkeypatch, "only-key-0001", "http://single.test/v1", [rate_limited("3"), rate_limited("5")])
+    assert response == "ok"
+    assert keys == ["only-key-0001"] * 3
+    assert sleeps == [3.0, 5.0]
+    # The only key is never benched, it is waited on
+    assert not client.keys.states[0].cooling
+
+def test_single_key_without_retry_after_backs_off(monkeypatch):
+    _, response, _, sleeps = run_create(monkeypatch, "only-key-0002", "http://backoff.test/v1", [rate_limited("soon")])
+    assert response == "ok"
+    assert sleeps == [2.0]
+
+def test_other_key_takes_over_without_waiting(monkeypatch):
+    client, response, keys, sleeps = run_create(monkeypatch, "first-key-0001,second-key-0002", "http://multi.test/v1", [rate_limited("30")])
+    assert response == "ok"
+    assert keys == ["first-key-0001", "second-key-0002"]
+    assert sleeps == []
+    assert client.keys.states[0].cooling
@@ -0,0 +1,32 @@
+import asyncio
+from backend.app.browser_manager import _cached_content
+from backend.app.crawl_cache import CrawlCache
+from backend.app.document_extractor import MAX_SOURCE_PAGES, render_document
+
+PAGES = ["Title and abstract"] + [f"filler page {i}" for i in range(20)] + ["transformer attention heads", "reinforcement learning reward"]
+
+def test_cached_document_pages_follow_each_query(tmp_path):
+    cache = CrawlCache(str(tmp_path), 10 * 1024 * 1024)
+    url = "https://arxiv.org/pdf/1234.5678"
+
+    async def main():
+        await cache.put(url, render_document(PAGES, "pdf"), document={"kind": "pdf", "pages": PAGES})
+        return await cache.get(url)
+
+    entry = asyncio.run(main())
+    attention = _cached_content(entry, "attention heads")
+    reward = _cached_content(entry, "reward learning")
+    assert "transformer attention heads" in attention and "reinforcement learning reward" not in attention
+    assert "reinforcement learning reward" in reward and "transformer attention heads" not in reward
+    # Without a query the first pages are shown, as before
+    assert _cached_content(entry) == entry["content"]
+    assert f"showing {MAX_SOURCE_PAGES} first" in entry["content"]
+
+def test_html_entries_are_returned_as_stored(tmp_path):
+    cache = CrawlCache(str(tmp_path), 10 * 1024 * 1024)
+
+    async def main():
+        await cache.put("https://example.com/a", "page text")
+        return await cache.get("https://example.com/a")
+
+    assert _cached_content(asyncio.run(main()), "anything") == "page text"
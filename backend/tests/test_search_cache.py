@@ -0,0 +1,16 @@
+from backend.app.search_cache import SearchCache, normalize_query
+
+def test_symbols_inside_queries_are_kept():
+    # Regression: punctuation folding made these share a cache entry
+    assert normalize_query("C# tutorial") != normalize_query("C tutorial")
+    assert normalize_query("C++ tutorial") != normalize_query("C tutorial")
+    assert normalize_query("F# async") == "f# async"
+    assert normalize_query(".NET") == ".net"
+
+def test_case_width_whitespace_and_trailing_punctuation_fold():
+    assert normalize_query("  Python   Asyncio?  ") == "python asyncio"
+    assert normalize_query("ＰＹＴＨＯＮ！") == "python"
+    assert normalize_query("什么是量子计算？") == "什么是量子计算"
+
+def test_cache_keys_differ_for_c_and_c_sharp():
+    assert SearchCache.make_key("duckduckgo", "C# tutorial", 8) != SearchCache.make_key("duckduckgo", "C tutorial", 8)
@@ -0,0 +1,13 @@
+from backend.app.url_normalizer import canonicalize_url, url_key
+
+def test_amp_path_segments_are_real_pages():
+    # Regression: a generic "/amp" suffix rule merged these into their parent pages
+    assert canonicalize_url("https://example.com/tags/amp") == "https://example.com/tags/amp"
+    assert canonicalize_url("https://pypi.org/project/amp/") == "https://pypi.org/project/amp"
+    assert url_key("https://example.com/tags/amp") != url_key("https://example.com/tags")
+    assert url_key("https://pypi.org/project/amp/") != url_key("https://pypi.org/project/")
+
+def test_amp_cache_and_amp_params_are_unwrapped():
+    assert canonicalize_url("https://example-com.cdn.ampproject.org/c/s/example.com/news/story") == "https://example.com/news/story"
+    assert canonicalize_url("https://example.com/news/story?amp=1") == "https://example.com/news/story"
+    assert canonicalize_url("https://example.com/news/story?outputType=amp&id=7") == "https://example.com/news/story?id=7"
@@ -22,8 +22,8 @@ async def main():
     print("\n[JustSearch] 正在启动浏览器登录助手...")
     print(f"项目根目录: {project_root}")
     
-    # 强制非 Headless 模式启动
-    await init_global_browser(headless_override=False)
+    # 强制非 Headless 模式启动，并直接使用主 user_data（不启用多进程浏览器集群）
+    await init_global_browser(headless_override=False, fleet_size=1)
     
     # 获取全局上下文
     from backend.app.browser_manager import _GLOBAL_CONTEXT